@@ -0,0 +1,118 @@
+import threading
+
+import numpy as np
+
+# Asignador de IDs únicos sin colisiones: el i-ésimo ID entregado es low + P(i),
+# donde P es una permutación con clave (red de Feistel con cycle-walking) del
+# espacio [0, high - low]. No guarda los IDs entregados, solo una posición, y
+# rangos de posiciones disjuntos producen IDs disjuntos entre procesos.
+
+feistel_rounds = 4
+mask64 = (1 << 64) - 1
+golden_gamma = 0x9E3779B97F4A7C15
+
+
+def round_keys(key):
+    # splitmix64 para derivar una subclave por ronda a partir de la clave
+    keys = []
+    state = key & mask64
+    for _ in range(feistel_rounds):
+        state = (state + golden_gamma) & mask64
+        value = state
+        value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & mask64
+        value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & mask64
+        keys.append(value ^ (value >> 31))
+    return keys
+
+
+class IdAllocator:
+
+    def __init__(self, low, high, key, start=0, stop=None):
+        self.low = low
+        self.high = high
+        self.size = high - low + 1
+        self.key = key
+        self.start = start
+        self.stop = self.size if stop is None else stop
+        self.position = start
+        self.lock = threading.Lock()
+
+        if not 0 <= self.start <= self.stop <= self.size:
+            raise ValueError(f"Invalid allocator range [{start}, {stop}) for an ID space of {self.size}")
+
+        self.half_bits = max(1, ((self.size - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        self.round_keys = round_keys(key)
+
+    def remaining(self):
+        return self.stop - self.position
+
+    def ensure_capacity(self, count, label='IDs'):
+        if count > self.remaining():
+            raise ValueError(f"Requested {count} {label} but only {self.remaining()} remain "
+                             f"in the ID space [{self.low}, {self.high}]")
+
+    def _round(self, value, round_key):
+        return ((((value ^ round_key) * golden_gamma) & mask64) >> 32) & self.half_mask
+
+    def permute(self, index):
+        value = index
+        while True:
+            left, right = value >> self.half_bits, value & self.half_mask
+            for round_key in self.round_keys:
+                left, right = right, left ^ self._round(right, round_key)
+            value = (left << self.half_bits) | right
+            # cycle-walking: se vuelve a cifrar hasta caer dentro del espacio
+            if value < self.size:
+                return value
+
+    def permute_many(self, indices):
+        values = np.asarray(indices, dtype=np.uint64).copy()
+        half_bits = np.uint64(self.half_bits)
+        half_mask = np.uint64(self.half_mask)
+        pending = np.ones(len(values), dtype=bool)
+        while pending.any():
+            value = values[pending]
+            left, right = value >> half_bits, value & half_mask
+            for round_key in self.round_keys:
+                mixed = ((right ^ np.uint64(round_key)) * np.uint64(golden_gamma)) >> np.uint64(32)
+                left, right = right, left ^ (mixed & half_mask)
+            values[pending] = (left << half_bits) | right
+            pending[pending] = values[pending] >= self.size
+        return values.astype(np.int64)
+
+    def next(self):
+        with self.lock:
+            self.ensure_capacity(1)
+            index = self.position
+            self.position += 1
+        return self.low + self.permute(index)
+
+    def take(self, count):
+        with self.lock:
+            self.ensure_capacity(count)
+            start = self.position
+            self.position += count
+        return self.low + self.permute_many(np.arange(start, start + count, dtype=np.uint64))
+
+    def reserve(self, count):
+        # Sub-asignador con las próximas `count` posiciones, sobre la misma permutación
+        with self.lock:
+            self.ensure_capacity(count)
+            start = self.position
+            self.position += count
+        return IdAllocator(self.low, self.high, self.key, start, start + count)
+
+    def split(self, sizes):
+        # Sub-asignadores disjuntos, uno por tamaño, p. ej. uno por shard
+        return [self.reserve(size) for size in sizes]
+
+    def state(self):
+        return {'low': self.low, 'high': self.high, 'key': self.key, 'start': self.start,
+                'stop': self.stop, 'position': self.position}
+
+    @classmethod
+    def from_state(cls, state):
+        allocator = cls(state['low'], state['high'], state['key'], state['start'], state['stop'])
+        allocator.position = state['position']
+        return allocator
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import data
+
+# Benchmark de generación: corre data.py con varios factores de escala sobre una
+# base vacía (MySQL o SQLite como reemplazo local) y guarda en JSON, por tabla,
+# filas/s, memoria residente máxima y tiempos.
+
+data_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data.py')
+
+
+def prepare_database(backend, sqlite_file):
+    if backend == 'sqlite':
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(sqlite_file + suffix):
+                os.remove(sqlite_file + suffix)
+        data.create_sqlite_schema(sqlite_file)
+        return
+
+    # MySQL: se vacían las tablas de la base configurada en el .env
+    connection = data.connect()
+    cursor = connection.cursor()
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    for table in reversed(data.topological_order(data.load_table_dependencies())):
+        if table != 'schema_migrations':
+            cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.execute("SET SESSION foreign_key_checks = 1")
+    cursor.close()
+    connection.close()
+
+
+def run_scale_factor(scale_factor, args, workdir):
+    sqlite_file = os.path.join(workdir, 'bench.sqlite')
+    prepare_database(args.backend, sqlite_file)
+
+    metrics_path = os.path.join(workdir, f'metrics-{scale_factor}.json')
+    command = [sys.executable, data_script, '--scale-factor', str(scale_factor), '--mode', args.mode,
+               '--workers', str(args.workers), '--writers', str(args.writers), '--shards', str(args.shards), '--seed', str(args.seed),
+               '--metrics-json', metrics_path]
+    env = dict(os.environ, DB_BACKEND=args.backend, SQLITE_PATH=sqlite_file)
+
+    # Cada corrida es un proceso aparte, así la memoria máxima no se arrastra entre factores
+    print(f"Running scale factor {scale_factor}...")
+    completed = subprocess.run(command, env=env, stdout=subprocess.DEVNULL if not args.verbose else None)
+    with open(metrics_path, 'r') as file:
+        metrics = json.load(file)
+    metrics['exit_code'] = completed.returncode
+    return metrics
+
+
+def find_regressions(runs, baseline, tolerance):
+    # Compara filas/s por tabla contra una corrida previa con el mismo factor de escala
+    previous = {(run['scale_factor'], run['mode'], run['backend']): run for run in baseline['runs']}
+    regressions = []
+    for run in runs:
+        reference = previous.get((run['scale_factor'], run['mode'], run['backend']))
+        if reference is None:
+            continue
+        for table, metrics in run['tables'].items():
+            before = reference['tables'].get(table, {}).get('rows_per_second')
+            after = metrics['rows_per_second']
+            if before and after is not None and after < before * (1 - tolerance):
+                regressions.append({'scale_factor': run['scale_factor'], 'table': table,
+                                    'baseline_rows_per_second': before, 'rows_per_second': after,
+                                    'change': round(after / before - 1, 4)})
+    return regressions
+
+
+def print_summary(runs):
+    for run in runs:
+        print(f"\nScale factor {run['scale_factor']} ({run['mode']}, {run['backend']}): "
+              f"{run['wall_seconds']:.2f}s, peak RSS {run['peak_rss_kb']} KB")
+        for table, metrics in sorted(run['tables'].items()):
+            rows = sum(metrics['rows'].values())
+            print(f"  {table}: {rows} rows, {metrics['wall_seconds']:.2f}s, "
+                  f"{metrics['rows_per_second'] or 0:,.0f} rows/s, peak RSS +{metrics['peak_rss_growth_kb']} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de generación de datos por factor de escala")
+    parser.add_argument('--scale-factors', type=float, nargs='+', default=[0.1, 0.5, 1.0])
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--mode', choices=['row', 'columnar'], default='row')
+    parser.add_argument('--workers', type=int, default=data.generation_workers)
+    parser.add_argument('--writers', type=int, default=data.generation_writers)
+    parser.add_argument('--shards', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="caída de filas/s tolerada (0.2 = 20%%)")
+    parser.add_argument('--verbose', action='store_true', help="mostrar la salida de data.py")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = [run_scale_factor(scale_factor, args, workdir) for scale_factor in args.scale_factors]
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'runs': runs,
+    }
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            results['regressions'] = find_regressions(runs, json.load(file), args.tolerance)
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+
+    print_summary(runs)
+    for regression in results.get('regressions', []):
+        print(f"Regression in {regression['table']} at scale factor {regression['scale_factor']}: "
+              f"{regression['baseline_rows_per_second']:,.0f} -> {regression['rows_per_second']:,.0f} rows/s")
+    print(f"\nResults written to {args.output}")
+
+    failed = any(run['exit_code'] != 0 for run in runs) or results.get('regressions')
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# Checkpoints de data.py: una entrada por tabla con su estado ('running' o 'done'),
+# las unidades ya generadas (filas o lotes de la tabla padre), las filas escritas
+# y el estado de sus flujos aleatorios y de su asignador de IDs. La entrada
+# '_run' guarda la configuración de la corrida (semilla, volúmenes, fecha de
+# referencia) para que `data.py --resume` la repita tal cual.
+
+run_entry = '_run'
+
+
+def encode_state(state):
+    return json.dumps(state, default=lambda value: value.isoformat() if isinstance(value, datetime) else list(value))
+
+
+def decode_state(text):
+    return json.loads(text) if text else None
+
+
+class DatabaseCheckpoint:
+    # Tabla generation_checkpoint en la misma base que los datos. El avance de cada
+    # lote se guarda con el cursor del writer, dentro de la transacción del lote,
+    # así que el checkpoint nunca queda adelante ni atrás de las filas confirmadas.
+
+    chunk_level = True
+
+    def __init__(self, connect, placeholder='%s'):
+        self.connect = connect
+        self.placeholder = placeholder
+
+    def _execute(self, statements):
+        connection = self.connect()
+        cursor = connection.cursor()
+        try:
+            results = []
+            for statement, params in statements:
+                cursor.execute(statement, params)
+                results.append(cursor.fetchall() if cursor.description else None)
+            connection.commit()
+            return results
+        finally:
+            cursor.close()
+            connection.close()
+
+    def ensure_table(self):
+        self._execute([("""
+        CREATE TABLE IF NOT EXISTS generation_checkpoint (
+            name VARCHAR(64) PRIMARY KEY,
+            status VARCHAR(16),
+            units BIGINT,
+            rows_written BIGINT,
+            state MEDIUMTEXT,
+            updated DATETIME
+        )
+        """, ())])
+
+    def load(self):
+        self.ensure_table()
+        rows = self._execute([("SELECT name, status, units, rows_written, state FROM generation_checkpoint", ())])[0]
+        return {name: {'status': status, 'units': units, 'rows': rows_written, 'state': decode_state(state)}
+                for name, status, units, rows_written, state in rows}
+
+    def reset(self):
+        self.ensure_table()
+        self._execute([("DELETE FROM generation_checkpoint", ())])
+
+    def save(self, name, status, units=0, rows=0, state=None, cursor=None):
+        # REPLACE INTO existe tanto en MySQL como en SQLite
+        placeholders = ', '.join([self.placeholder] * 6)
+        statement = (f"REPLACE INTO generation_checkpoint (name, status, units, rows_written, state, updated) "
+                     f"VALUES ({placeholders})")
+        params = (name, status, units, rows, encode_state(state) if state is not None else None,
+                  datetime.now().replace(microsecond=0))
+        if cursor is not None:
+            cursor.execute(statement, params)
+        else:
+            self._execute([(statement, params)])
+
+    def clear_rows(self, tables):
+        # Borra las filas de una tabla que se regenera completa (hijas primero)
+        self._execute([(f"DELETE FROM {table}", ()) for table in tables])
+
+
+class FileCheckpoint:
+    # checkpoint.json en el directorio de salida. Los archivos de una tabla solo
+    # quedan completos al cerrarse, así que se reanuda por tabla: las terminadas
+    # se conservan y la interrumpida se vuelve a escribir desde el principio.
+
+    chunk_level = False
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, 'checkpoint.json')
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def load(self):
+        with self.lock:
+            if self.entries is None:
+                if os.path.exists(self.path):
+                    with open(self.path, 'r') as file:
+                        self.entries = json.load(file)
+                else:
+                    self.entries = {}
+            return dict(self.entries)
+
+    def reset(self):
+        with self.lock:
+            self.entries = {}
+            self._write()
+
+    def save(self, name, status, units=0, rows=0, state=None, cursor=None):
+        with self.lock:
+            if self.entries is None:
+                self.entries = {}
+            self.entries[name] = {'status': status, 'units': units, 'rows': rows,
+                                  'state': decode_state(encode_state(state)) if state is not None else None}
+            self._write()
+
+    def clear_rows(self, tables):
+        # FileWriter vuelve a crear los archivos de la tabla al escribir su primer lote
+        pass
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        staging = f'{self.path}.tmp'
+        with open(staging, 'w') as file:
+            json.dump(self.entries, file, indent=2)
+        os.replace(staging, self.path)
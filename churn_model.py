@@ -0,0 +1,288 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import GridSearchCV, StratifiedKFold
+
+import eda
+from features import FeatureStore, feature_store_dir, mix_shares
+
+# Modelo de churn entrenado sobre la matriz de features de features.py. La etiqueta
+# se define en el tiempo: con las transacciones hasta una fecha de corte, ¿el
+# cliente compró en los `horizonte` días siguientes? Así el modelo no aprende la
+# regla de eda.py sino a anticiparla. El puntaje nocturno recorre la matriz por
+# partes y escribe las probabilidades en churn_scores (o en un Parquet sobre archivos).
+
+churn_model_path = os.getenv('CHURN_MODEL_PATH', 'churn_model.joblib')
+churn_horizon_days = int(os.getenv('CHURN_HORIZON_DAYS', eda.churn_params['dias_sin_compra']))
+score_chunk_rows = int(os.getenv('CHURN_SCORE_CHUNK_ROWS', 100000))
+score_writers = int(os.getenv('CHURN_SCORE_WRITERS', eda.pool_size))
+
+# Grilla de hiperparámetros; cada combinación y partición se entrena en su propio proceso
+param_grid = {
+    'learning_rate': [0.05, 0.1],
+    'max_leaf_nodes': [15, 31, 63],
+    'l2_regularization': [0.0, 1.0],
+}
+
+# Columnas del almacén que se recalculan a la fecha de corte (o de referencia al puntuar).
+# Las proporciones de productos y programas también: en el almacén incluyen las
+# compras posteriores al corte, que son justamente las que definen la etiqueta.
+rfm_columns = ['primera_compra', 'ultima_compra', 'frecuencia', 'monto_total', 'monto_promedio']
+
+training_queries = {
+    'last_purchase': """
+    SELECT MAX(col_i11) as ultima_compra FROM table_i
+    """,
+    'labels': """
+    SELECT col_i2 as cuenta_id,
+           MIN(col_i11) as primera_compra,
+           MAX(CASE WHEN col_i11 <= {p} THEN col_i11 END) as ultima_compra,
+           SUM(CASE WHEN col_i11 <= {p} THEN 1 ELSE 0 END) as frecuencia,
+           SUM(CASE WHEN col_i11 <= {p} THEN col_i10 ELSE 0 END) as monto_total,
+           SUM(CASE WHEN col_i11 > {p} THEN 1 ELSE 0 END) as compras_posteriores
+    FROM table_i
+    GROUP BY col_i2
+    HAVING MIN(col_i11) <= {p}
+    """,
+    'products': """
+    SELECT i.col_i2 as cuenta_id, j.col_j6 as valor, SUM(j.col_j4) as cantidad
+    FROM table_j j
+    JOIN table_i i ON i.col_i1 = j.col_j1
+    WHERE i.col_i11 <= {p}
+    GROUP BY i.col_i2, j.col_j6
+    """,
+    'loyalty': """
+    SELECT i.col_i2 as cuenta_id, j.col_j7 as valor, COUNT(*) as cantidad
+    FROM table_j j
+    JOIN table_i i ON i.col_i1 = j.col_j1
+    WHERE i.col_i11 <= {p}
+    GROUP BY i.col_i2, j.col_j7
+    """,
+}
+
+upsert_scores = """
+INSERT INTO churn_scores (cuenta_id, probabilidad, modelo, puntuado)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    probabilidad = VALUES(probabilidad),
+    modelo = VALUES(modelo),
+    puntuado = VALUES(puntuado)
+"""
+
+
+def peak_memory():
+    # Para los mensajes: ru_maxrss está en KB en Linux; el módulo resource no existe en Windows
+    try:
+        import resource
+    except ImportError:
+        return 'n/a'
+    return f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+
+
+def read(name, params=None, use_cache=True):
+    # La fecha de corte va como parámetro; sobre archivos la base es SQLite
+    placeholder = '?' if eda.data_dir else '%s'
+    return eda.run_query(training_queries[name].format(p=placeholder), params, use_cache=use_cache)
+
+
+def static_columns(store):
+    return [column for column in store.meta['columns'] if column not in rfm_columns]
+
+
+def static_at_cutoff(store, cuenta_ids, cutoff):
+    # Estado de la cuenta desde el almacén (no tiene historia) y proporciones de
+    # productos y programas solo con las líneas de transacciones hasta el corte
+    index = pd.Index(cuenta_ids, name='cuenta_id')
+    vocabulary = store.meta['vocabulary']
+    mixes = pd.concat([
+        mix_shares(read('products', (cutoff,)), vocabulary['producto'], 'producto', index),
+        mix_shares(read('loyalty', (cutoff,)), vocabulary['programa'], 'programa', index),
+    ], axis=1)
+    columns = static_columns(store)
+    status = store.rows(cuenta_ids, [column for column in columns if column not in mixes.columns])
+    return pd.concat([status, mixes], axis=1)[columns].to_numpy(dtype=np.float32)
+
+
+def feature_matrix(primera_compra, ultima_compra, frecuencia, monto_total, static, reference):
+    # Recencia y antigüedad en días respecto de `reference`; sin compras quedan en NaN,
+    # que HistGradientBoostingClassifier trata como un valor más
+    reference = np.datetime64(reference, 's')
+    day = np.timedelta64(1, 'D')
+    frecuencia = np.asarray(frecuencia, dtype=np.float32)
+    monto_total = np.asarray(monto_total, dtype=np.float32)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        monto_promedio = np.where(frecuencia > 0, monto_total / frecuencia, 0.0)
+    columns = [
+        (reference - ultima_compra) / day,
+        (reference - primera_compra) / day,
+        frecuencia,
+        monto_total,
+        monto_promedio,
+    ]
+    return np.column_stack([np.asarray(column, dtype=np.float32) for column in columns] + [static])
+
+
+def feature_names(store):
+    return ['recencia_dias', 'antiguedad_dias', 'frecuencia', 'monto_total', 'monto_promedio'] + static_columns(store)
+
+
+def fetch_training_set(store, horizon_days=churn_horizon_days):
+    last_purchase = pd.Timestamp(read('last_purchase', use_cache=False).iloc[0, 0])
+    cutoff = (last_purchase - timedelta(days=horizon_days)).strftime('%Y-%m-%d %H:%M:%S')
+    labels = read('labels', (cutoff,) * 5)
+    labels = labels[np.isin(labels['cuenta_id'].to_numpy(dtype=np.int64), store.ids)]
+
+    static = static_at_cutoff(store, labels['cuenta_id'].to_numpy(dtype=np.int64), cutoff)
+    X = feature_matrix(pd.to_datetime(labels['primera_compra'], format='ISO8601').to_numpy(dtype='datetime64[s]'),
+                       pd.to_datetime(labels['ultima_compra'], format='ISO8601').to_numpy(dtype='datetime64[s]'),
+                       labels['frecuencia'], labels['monto_total'].astype(float), static, cutoff)
+    y = (labels['compras_posteriores'].to_numpy() == 0).astype(np.int8)
+    return X, y, cutoff
+
+
+def train(store_path=feature_store_dir, horizon_days=churn_horizon_days, folds=5, n_jobs=-1,
+          model_path=churn_model_path):
+    started = time.perf_counter()
+    store = FeatureStore(store_path)
+    X, y, cutoff = fetch_training_set(store, horizon_days)
+    if len(np.unique(y)) < 2:
+        raise ValueError(f"Only one class in the training labels (cutoff {cutoff}); try another --horizon")
+    print(f"Training set: {len(y)} customers, {y.mean():.2%} churned within {horizon_days} days of {cutoff} "
+          f"({time.perf_counter() - started:.2f}s)")
+
+    # n_jobs=-1 reparte las combinaciones × particiones entre todos los núcleos;
+    # joblib limita los hilos internos de cada proceso para no sobresuscribir la CPU
+    search = GridSearchCV(
+        HistGradientBoostingClassifier(max_iter=200, early_stopping=True, random_state=0),
+        param_grid,
+        scoring='roc_auc',
+        cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=0),
+        n_jobs=n_jobs,
+        refit=True,
+    )
+    fit_started = time.perf_counter()
+    search.fit(X, y)
+    fit_seconds = time.perf_counter() - fit_started
+
+    candidates = len(search.cv_results_['params'])
+    print(f"Grid search: {candidates} candidates × {folds} folds in {fit_seconds:.2f}s")
+    print(f"Best ROC AUC {search.best_score_:.4f} with {search.best_params_}")
+    print(f"Training ROC AUC {roc_auc_score(y, search.predict_proba(X)[:, 1]):.4f}")
+
+    bundle = {
+        'model': search.best_estimator_,
+        'features': feature_names(store),
+        'version': datetime.now().strftime('%Y%m%d%H%M%S'),
+        'horizon_days': horizon_days,
+        'cutoff': cutoff,
+        'cv_roc_auc': float(search.best_score_),
+        'params': search.best_params_,
+    }
+    joblib.dump(bundle, model_path)
+    print(f"Model {bundle['version']} written to {model_path} "
+          f"(total {time.perf_counter() - started:.2f}s, peak memory {peak_memory()})")
+    return bundle
+
+
+def score_chunks(store, model, chunk_rows):
+    # Las columnas son memmaps: cada parte se lee del disco solo al armar su matriz
+    ultima_compra = store['ultima_compra']
+    reference = np.asarray(ultima_compra)[~np.isnat(ultima_compra)].max() + np.timedelta64(1, 'D')
+    static = static_columns(store)
+    for start in range(0, len(store), chunk_rows):
+        end = min(start + chunk_rows, len(store))
+        X = feature_matrix(store['primera_compra'][start:end], store['ultima_compra'][start:end],
+                           store['frecuencia'][start:end], store['monto_total'][start:end],
+                           np.column_stack([np.asarray(store[column][start:end], dtype=np.float32)
+                                            for column in static]), reference)
+        yield np.asarray(store.ids[start:end]), model.predict_proba(X)[:, 1]
+
+
+def write_scores(ids, scores, version, scored_at):
+    rows = list(zip(ids.tolist(), scores.astype(float).tolist(), [version] * len(ids), [scored_at] * len(ids)))
+    with eda.pool_slots:
+        conn = eda.get_connection_pool().get_connection()
+        cursor = conn.cursor()
+        try:
+            # executemany convierte el INSERT en una sola sentencia de varias filas
+            cursor.executemany(upsert_scores, rows)
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+    return len(rows)
+
+
+def score(store_path=feature_store_dir, model_path=churn_model_path, chunk_rows=score_chunk_rows,
+          writers=score_writers, output=None):
+    started = time.perf_counter()
+    bundle = joblib.load(model_path)
+    store = FeatureStore(store_path)
+    if feature_names(store) != bundle['features']:
+        raise ValueError("The feature store columns differ from the model's; retrain with --train")
+    scored_at = datetime.now()
+    scored = 0
+
+    if eda.data_dir or output:
+        # Sobre archivos no hay tabla donde escribir: los puntajes van a un Parquet
+        output = output or 'churn_scores.parquet'
+        schema = pa.schema([('cuenta_id', pa.int64()), ('probabilidad', pa.float64()),
+                            ('modelo', pa.string()), ('puntuado', pa.timestamp('us'))])
+        with pq.ParquetWriter(output, schema) as writer:
+            for ids, scores in score_chunks(store, bundle['model'], chunk_rows):
+                writer.write_table(pa.table({
+                    'cuenta_id': ids, 'probabilidad': scores.astype(np.float64),
+                    'modelo': [bundle['version']] * len(ids), 'puntuado': [scored_at] * len(ids),
+                }, schema=schema))
+                scored += len(ids)
+        destination = output
+    else:
+        # Mientras los escritores insertan una parte, el hilo principal puntúa la
+        # siguiente; como mucho `writers` partes quedan esperando en memoria
+        with ThreadPoolExecutor(max_workers=writers) as executor:
+            pending = []
+            for ids, scores in score_chunks(store, bundle['model'], chunk_rows):
+                if len(pending) >= writers:
+                    scored += pending.pop(0).result()
+                pending.append(executor.submit(write_scores, ids, scores, bundle['version'], scored_at))
+            for future in pending:
+                scored += future.result()
+        destination = 'churn_scores'
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {scored} customers with model {bundle['version']} into {destination} in {elapsed:.2f}s "
+          f"({scored / elapsed if elapsed else 0:.0f} customers/s, peak memory {peak_memory()})")
+    return scored
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena el modelo de churn y puntúa a todos los clientes")
+    parser.add_argument('--train', action='store_true', help="entrenar el modelo con búsqueda de hiperparámetros")
+    parser.add_argument('--score', action='store_true', help="puntuar todos los clientes con el modelo guardado")
+    parser.add_argument('--store', default=feature_store_dir, help="directorio de la matriz de features")
+    parser.add_argument('--model', default=churn_model_path)
+    parser.add_argument('--horizon', type=int, default=churn_horizon_days,
+                        help="días sin compras después del corte que definen el churn")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=-1, help="procesos de la validación cruzada (-1 = todos)")
+    parser.add_argument('--chunk-rows', type=int, default=score_chunk_rows)
+    parser.add_argument('--writers', type=int, default=score_writers, help="conexiones que escriben los puntajes")
+    parser.add_argument('--output', help="escribir los puntajes en este Parquet en vez de en churn_scores")
+    args = parser.parse_args()
+
+    if not args.train and not args.score:
+        parser.error("use --train, --score or both")
+    if args.train:
+        train(args.store, args.horizon, args.folds, args.jobs, args.model)
+    if args.score:
+        score(args.store, args.model, args.chunk_rows, args.writers, args.output)
@@ -0,0 +1,104 @@
+import numpy as np
+
+# Generación columnar de table_i y table_j: cada lote se arma como arreglos de
+# NumPy en lugar de fila por fila, manteniendo las distribuciones de data.py
+
+document_types = np.array(['Type X', 'Type Y', 'Type Z'])
+products = np.array(['Product A', 'Product B', 'Product C', 'Product D', 'Product E'])
+loyalty_programs = np.array(['Normal', 'Discount', 'Promotion'])
+
+# Posiciones de los 32 dígitos hexadecimales dentro de un UUID con guiones
+uuid_hex_positions = np.r_[0:8, 9:13, 14:18, 19:23, 24:36]
+hex_digits = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+
+def random_uuid4(rng, size):
+    # UUID versión 4 a partir de bytes aleatorios en bloque, formateados sin
+    # pasar por uuid.UUID fila por fila
+    raw = np.frombuffer(rng.bytes(16 * size), dtype=np.uint8).reshape(size, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+
+    nibbles = np.empty((size, 32), dtype=np.uint8)
+    nibbles[:, 0::2] = hex_digits[raw >> 4]
+    nibbles[:, 1::2] = hex_digits[raw & 0x0F]
+
+    text = np.full((size, 36), ord('-'), dtype=np.uint8)
+    text[:, uuid_hex_positions] = nibbles
+    return text.view('S36').ravel().astype(str)
+
+
+def build_vocab_pool(fake, size=1000):
+    # Muestra previa de palabras de Faker; las columnas de texto libre se eligen
+    # de este pool en vez de llamar a fake.word() por fila
+    return np.array([fake.word() for _ in range(size)])
+
+
+def build_table_i_columns(rng, col_i1, col_e, col_f1, start_date, vocab_pool):
+    size = len(col_i1)
+
+    picked_users = col_e[rng.integers(0, len(col_e), size)]
+    col_i3 = picked_users[:, 0]
+    col_i2 = picked_users[:, 1]
+    col_i4 = rng.integers(1, 11, size)
+    col_i5 = random_uuid4(rng, size)
+    col_i6 = random_uuid4(rng, size)
+
+    # Montos: base uniforme con variabilidad del ±20% y total del ±5%
+    base_amount = rng.integers(1000, 500001, size)
+    col_i7 = (base_amount * rng.uniform(0.8, 1.2, size)).astype(np.int64)
+    col_i8 = document_types[rng.integers(0, len(document_types), size)]
+    col_i9 = rng.integers(1, 6, size)
+    col_i10 = (col_i7 * rng.uniform(0.95, 1.05, size)).astype(np.int64)
+
+    # Fechas: hasta 2 años de offset, 0-60 minutos hasta la creación y 1-30 hasta el procesamiento
+    days_offset = rng.integers(0, 731, size).astype('timedelta64[D]')
+    col_i11 = np.datetime64(start_date, 'us') + days_offset
+    col_i12 = col_i11 + rng.integers(0, 61, size).astype('timedelta64[m]')
+    col_i13 = col_i12 + rng.integers(1, 31, size).astype('timedelta64[m]')
+
+    col_i14 = vocab_pool[rng.integers(0, len(vocab_pool), size)]
+    col_i15 = vocab_pool[rng.integers(0, len(vocab_pool), size)]
+    col_i16 = col_f1[rng.integers(0, len(col_f1), size)]
+
+    # 5% de montos extremos, mitad muy altos y mitad muy bajos, con total igual al pagado
+    extreme = rng.random(size) < 0.05
+    high = rng.random(size) < 0.5
+    col_i7 = np.where(extreme & high, rng.integers(500000, 1000001, size), col_i7)
+    col_i7 = np.where(extreme & ~high, rng.integers(100, 1000, size), col_i7)
+    col_i10 = np.where(extreme, col_i7, col_i10)
+
+    return {
+        'col_i1': np.asarray(col_i1, dtype=np.int64), 'col_i2': col_i2, 'col_i3': col_i3, 'col_i4': col_i4,
+        'col_i5': col_i5, 'col_i6': col_i6, 'col_i7': col_i7, 'col_i8': col_i8, 'col_i9': col_i9,
+        'col_i10': col_i10, 'col_i11': col_i11, 'col_i12': col_i12, 'col_i13': col_i13, 'col_i14': col_i14,
+        'col_i15': col_i15, 'col_i16': col_i16,
+    }
+
+
+def build_table_j_columns(rng, col_i1, col_i12):
+    # Entre 1 y 3 líneas por transacción; col_j2 numera las líneas desde 1
+    num_products = rng.integers(1, 4, len(col_i1))
+    total = int(num_products.sum())
+    first_line = np.repeat(np.cumsum(num_products) - num_products, num_products)
+
+    col_j1 = np.repeat(np.asarray(col_i1, dtype=np.int64), num_products)
+    col_j2 = np.arange(total) - first_line + 1
+    col_j3 = rng.integers(1, len(products) + 1, total)
+    col_j4 = rng.integers(1, 51, total)
+    col_j5 = rng.integers(1000, 50001, total)
+    col_j6 = products[col_j3 - 1]
+    col_j7 = loyalty_programs[rng.integers(0, len(loyalty_programs), total)]
+    col_j12 = np.repeat(np.asarray(col_i12, dtype='datetime64[us]'), num_products)
+    col_j9 = rng.integers(0, 1001, total)
+
+    return {
+        'col_j1': col_j1, 'col_j2': col_j2, 'col_j3': col_j3, 'col_j4': col_j4, 'col_j5': col_j5,
+        'col_j6': col_j6, 'col_j7': col_j7, 'col_j8': col_j12, 'col_j9': col_j9,
+        'col_j10': col_j5 // col_j4, 'col_j11': col_j9 // col_j4, 'col_j12': col_j12,
+    }
+
+
+def iter_rows(columns, names):
+    # tolist() convierte a tipos de Python (int, str, datetime) aptos para el driver
+    return zip(*(columns[name].tolist() for name in names))
@@ -1,12 +1,36 @@
+import argparse
+import csv
+import glob
+import hashlib
+import multiprocessing
 import os
+import json
+import queue
 import random
-import string
-from datetime import timedelta
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from itertools import islice
 
 import mysql.connector
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
 from faker import Faker
 
+import columnar
+import instrumentation
+from allocator import IdAllocator
+from checkpoint import DatabaseCheckpoint, FileCheckpoint, run_entry
+from registry import (KeyRegistry, decode_asset_id, decode_asset_ids, decode_timestamp, encode_asset_id,
+                      encode_timestamp)
+
 # Lista de regiones de Chile
 regiones_chile = [
     "Arica y Parinacota", "Tarapacá", "Antofagasta", "Atacama", "Coquimbo",
@@ -27,339 +51,1475 @@ db_config = {
     'collation': 'utf8mb4_unicode_ci'
 }
 
-# Crear una única conexión para todo el script
-conn = mysql.connector.connect(**db_config)
-cursor = conn.cursor()
+# 'mysql' o 'sqlite'; SQLite (archivo SQLITE_PATH) sirve como base local de pruebas y de benchmarks
+db_backend = os.getenv('DB_BACKEND', 'mysql')
+sqlite_path = os.getenv('SQLITE_PATH', 'dinoco_anon.sqlite')
+
+# Volúmenes con factor de escala 1; --scale-factor los multiplica a todos por igual.
+# Los usuarios por cuenta son una proporción y no se escalan.
+base_volumes = {
+    'num_accounts': 1000,
+    'num_stations': 50,
+    'num_users_per_account': 3,
+    'num_vehicles': 5000,
+    'num_transactions': 100000,
+}
 
+# Filas por lote: cada lote se envía con un único executemany y un único commit
+chunk_size = int(os.getenv('DB_CHUNK_SIZE', 5000))
+
+# 'columnar' genera table_i y table_j por lotes de arreglos NumPy en vez de fila por fila
+generation_mode = os.getenv('GENERATION_MODE', 'row')
+
+# Columnas insertadas por tabla, en el orden en que los generadores arman cada fila
+table_columns = {
+    'table_a': ('col_a1', 'col_a2', 'col_a3', 'col_a4', 'col_a5'),
+    'table_b': ('col_b1', 'col_b2', 'col_b3', 'col_b4', 'col_b5'),
+    'table_c': ('col_c1', 'col_c2', 'col_c3', 'col_c4', 'col_c5', 'col_c6', 'col_c7', 'col_c8', 'col_c9', 'col_c10'),
+    'table_d': ('col_d1', 'col_d2', 'col_d3', 'col_d4', 'col_d5'),
+    'table_e': ('col_e1', 'col_e2', 'col_e3', 'col_e4', 'col_e5'),
+    'table_f': ('col_f1', 'col_f2'),
+    'table_g': ('col_g1', 'col_g2', 'col_g3', 'col_g4', 'col_g5', 'col_g6', 'col_g7', 'col_g8', 'col_g9', 'col_g10'),
+    'table_h': ('col_h1', 'col_h2', 'col_h3', 'col_h4', 'col_h5'),
+    'table_i': ('col_i1', 'col_i2', 'col_i3', 'col_i4', 'col_i5', 'col_i6', 'col_i7', 'col_i8', 'col_i9', 'col_i10',
+                'col_i11', 'col_i12', 'col_i13', 'col_i14', 'col_i15', 'col_i16'),
+    'table_j': ('col_j1', 'col_j2', 'col_j3', 'col_j4', 'col_j5', 'col_j6', 'col_j7', 'col_j8', 'col_j9', 'col_j10',
+                'col_j11', 'col_j12'),
+}
 
-def run_query(query, params=None):
-    try:
-        if params:
-            cursor.execute(query, params)
+# Shards (procesos) para table_i/table_j; 0 o 1 las genera en el proceso principal.
+# Con GENERATION_SEED fijo el resultado se puede reproducir exactamente.
+transaction_shards = int(os.getenv('TRANSACTION_SHARDS', 0))
+generation_seed = int(os.environ['GENERATION_SEED']) if os.getenv('GENERATION_SEED') else None
+
+# Fecha de referencia ("ahora") de las corridas con semilla, para que se puedan
+# reproducir; sin semilla se usa la hora de inicio de la corrida
+seeded_reference_date = datetime(2024, 10, 1)
+
+# Conexiones simultáneas del planificador de tablas
+generation_workers = int(os.getenv('GENERATION_WORKERS', 4))
+
+# Conexiones que escriben los lotes de cada tabla mientras su generador arma los
+# siguientes (0 = generar y escribir en el mismo hilo). En SQLite y con archivos
+# se usa una sola, porque no admiten escritores concurrentes sobre la misma tabla.
+generation_writers = int(os.getenv('GENERATION_WRITERS', 2))
+# Lotes que pueden esperar en la cola de cada tabla; 0 = dos por conexión
+pipeline_queue_chunks = int(os.getenv('GENERATION_QUEUE_CHUNKS', 0))
+
+schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+# Claves primarias que las tablas hijas toman del registro en memoria, y cómo se
+# codifican como enteros las que no lo son
+registry_columns = {
+    'table_a': ('col_a1',),
+    'table_d': ('col_d1',),
+    'table_e': ('col_e1', 'col_e2'),
+    'table_f': ('col_f1',),
+    'table_g': ('col_g1', 'col_g2'),
+    'table_i': ('col_i1', 'col_i12'),
+}
+registry_encoders = {'col_f1': encode_asset_id, 'col_i12': encode_timestamp}
+
+key_registry = KeyRegistry()
+registry_load_lock = threading.Lock()
+
+# Espacios de IDs: enteros de 8 dígitos compartidos por todas las tablas, y los
+# 26 * 26 * 10000 códigos 'AB1234' de col_f1
+id_space = (10_000_000, 99_999_999)
+asset_id_space = (0, 26 * 26 * 10_000 - 1)
+
+
+def derive_seed(master_seed, *labels):
+    # Semilla de 64 bits estable entre ejecuciones y procesos (a diferencia de hash())
+    digest = hashlib.blake2b(repr((master_seed,) + labels).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def reset_id_allocators(master_seed=None):
+    # Con semilla maestra, la permutación de IDs (y por lo tanto los IDs) es reproducible
+    global id_allocator, asset_id_allocator
+    key = random.getrandbits(64) if master_seed is None else derive_seed(master_seed, 'ids')
+    id_allocator = IdAllocator(*id_space, key)
+    asset_id_allocator = IdAllocator(*asset_id_space, derive_seed(key, 'asset_ids'))
+
+
+reset_id_allocators()
+
+
+def connect(**options):
+    # Cada tabla generada en paralelo usa su propia conexión
+    if db_backend == 'sqlite':
+        return sqlite3.connect(sqlite_path, timeout=60, check_same_thread=False)
+    return mysql.connector.connect(**db_config, **options)
+
+
+def create_sqlite_schema(path, schema=schema_path):
+    # Solo los CREATE TABLE de schema.sql, que SQLite acepta tal cual
+    with open(schema, 'r') as file:
+        statements = re.findall(r'CREATE TABLE .*?\n\);', file.read(), re.S)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    for statement in statements:
+        connection.execute(statement)
+    connection.commit()
+    connection.close()
+
+
+def build_insert_query(table, ignore_duplicates=False):
+    columns = table_columns[table]
+    if db_backend == 'sqlite':
+        verb = "INSERT OR IGNORE" if ignore_duplicates else "INSERT"
+        placeholder = '?'
+    else:
+        verb = "INSERT IGNORE" if ignore_duplicates else "INSERT"
+        placeholder = '%s'
+    return (f"{verb} INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join([placeholder] * len(columns))})")
+
+
+def load_column_types(path=schema_path):
+    # Tipo SQL de cada columna según schema.sql (los nombres de columna son únicos entre tablas)
+    with open(path, 'r') as file:
+        schema = file.read()
+    return dict(re.findall(r'^\s+(col_\w+) (\w+)', schema, re.M))
+
+
+column_types = load_column_types()
+
+
+class TableWriter:
+    # Acumula filas por tabla y las escribe en lotes de `chunk_size` filas.
+    # Las subclases definen el destino en `_insert_chunk` y, si es transaccional,
+    # cómo se confirma o descarta un lote en `_commit_chunk` y `rollback`.
+
+    def __init__(self, chunk_size=chunk_size):
+        self.chunk_size = chunk_size
+        self.pending = {}
+        self.stats = {}
+        # Con auto_flush en False el lote lo cierra quien genera (TableProgress), al
+        # terminar una unidad. on_chunk(table, rows) se llama al cerrar cada lote y
+        # devuelve una función save(cursor) que corre en su transacción, antes del commit.
+        self.auto_flush = True
+        self.on_chunk = None
+        # Métricas de las colas de escritura (PipelinedWriter), propias o de los shards
+        self.pipelines = []
+        # Tiempo del hilo generador dentro del writer (escribiendo, esperando lugar
+        # en la cola o leyendo claves); el resto de la generación es Faker/random
+        self.wait_seconds = 0.0
+
+    def set_ignore_duplicates(self, table):
+        pass
+
+    def add(self, table, row):
+        rows = self.pending.get(table)
+        if rows is None:
+            rows = self.pending[table] = []
+            self.stats.setdefault(table, {'rows': 0, 'chunks': 0, 'write_seconds': 0.0,
+                                          'started': time.perf_counter(), 'finished': None})
+        rows.append(row)
+        if self.auto_flush and len(rows) >= self.chunk_size:
+            self.flush(table)
+
+    def add_many(self, table, rows):
+        for row in rows:
+            self.add(table, row)
+
+    def flush(self, table=None):
+        tables = [table] if table is not None else list(self.pending)
+        for name in tables:
+            rows = self.pending.get(name)
+            if rows:
+                started = time.perf_counter()
+                self._write_chunk(name, rows)
+                elapsed = time.perf_counter() - started
+                stats = self.stats[name]
+                stats['rows'] += len(rows)
+                stats['chunks'] += 1
+                stats['write_seconds'] += elapsed
+                self.wait_seconds += elapsed
+                rows.clear()
+            if name in self.stats:
+                self.stats[name]['finished'] = time.perf_counter()
+
+    def _write_chunk(self, table, rows):
+        save = self.on_chunk(table, len(rows)) if self.on_chunk is not None else None
+        self._insert_chunk(table, rows)
+        self._commit_chunk(table, save)
+
+    def _commit_chunk(self, table, save=None):
+        pass
+
+    def rollback(self):
+        pass
+
+    def merge_stats(self, other_stats, other_pipelines=()):
+        self.pipelines.extend(other_pipelines)
+        for table, other in other_stats.items():
+            stats = self.stats.setdefault(table, {'rows': 0, 'chunks': 0, 'write_seconds': 0.0,
+                                                  'started': time.perf_counter(), 'finished': None})
+            stats['rows'] += other['rows']
+            stats['chunks'] += other['chunks']
+            stats['write_seconds'] += other['write_seconds']
+            stats['finished'] = time.perf_counter()
+
+    def report(self):
+        print("\nWrite throughput per table:")
+        for table, stats in self.stats.items():
+            elapsed = (stats['finished'] or time.perf_counter()) - stats['started']
+            rows_per_sec = stats['rows'] / elapsed if elapsed > 0 else 0.0
+            write_rows_per_sec = stats['rows'] / stats['write_seconds'] if stats['write_seconds'] > 0 else 0.0
+            print(f"  {table}: {stats['rows']} rows in {stats['chunks']} chunks, "
+                  f"{elapsed:.2f}s ({rows_per_sec:,.0f} rows/s), "
+                  f"write {stats['write_seconds']:.2f}s ({write_rows_per_sec:,.0f} rows/s)")
+        for pipeline in self.pipelines:
+            if pipeline['chunks']:
+                utilization = '/'.join(f"{value:.0%}" for value in pipeline['utilization'])
+                print(f"  pipeline: {pipeline['lanes']} writers busy {utilization}, queue depth max "
+                      f"{pipeline['max_queue_depth']}/{pipeline['queue_capacity']} "
+                      f"(mean {pipeline['mean_queue_depth']:.1f}), "
+                      f"generator blocked {pipeline['producer_blocked_seconds']:.2f}s")
+
+    def close(self):
+        pass
+
+
+class BatchWriter(TableWriter):
+    # Escribe cada lote con un único executemany y un único commit.
+    # mysql-connector reescribe el executemany de un INSERT como un único
+    # INSERT multi-fila, así que cada lote es un round-trip.
+
+    def __init__(self, connection, chunk_size=chunk_size, close_connection=False):
+        super().__init__(chunk_size)
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.close_connection = close_connection
+        self.queries = {}
+
+    def read_keys(self, table, columns):
+        with instrumentation.timer('db_execute', table=table):
+            self.cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        with instrumentation.timer('db_fetch', table=table):
+            rows = self.cursor.fetchall()
+        instrumentation.count('db_round_trips', table=table)
+        instrumentation.count('db_rows', len(rows), table=table, direction='read')
+        if len(columns) == 1:
+            return [row[0] for row in rows]
+        return rows
+
+    def read_max(self, table, column):
+        with instrumentation.timer('db_execute', table=table):
+            self.cursor.execute(f"SELECT MAX({column}) FROM {table}")
+        with instrumentation.timer('db_fetch', table=table):
+            value = self.cursor.fetchone()[0]
+        instrumentation.count('db_round_trips', table=table)
+        # SQLite devuelve las fechas como texto
+        if isinstance(value, str) and column_types.get(column) == 'DATETIME':
+            value = datetime.fromisoformat(value)
+        return value
+
+    def set_ignore_duplicates(self, table):
+        self.queries[table] = build_insert_query(table, ignore_duplicates=True)
+
+    def _write_chunk(self, table, rows):
+        try:
+            super()._write_chunk(table, rows)
+        except (mysql.connector.Error, sqlite3.Error) as err:
+            print(f"Error writing {len(rows)} rows into {table}: {err}")
+            self.rollback()
+            raise
+
+    def _insert_chunk(self, table, rows):
+        query = self.queries.get(table) or self.queries.setdefault(table, build_insert_query(table))
+        with instrumentation.timer('db_execute', table=table):
+            self.cursor.executemany(query, rows)
+        instrumentation.count('db_round_trips', table=table)
+        instrumentation.count('db_rows', len(rows), table=table, direction='write')
+
+    def _commit_chunk(self, table, save=None):
+        if save is not None:
+            with instrumentation.timer('checkpoint_save', table=table):
+                save(self.cursor)
+            instrumentation.count('db_round_trips', table=table)
+        with instrumentation.timer('db_commit', table=table):
+            self.connection.commit()
+        instrumentation.count('db_round_trips', table=table)
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.cursor.close()
+        if self.close_connection:
+            self.connection.close()
+
+
+def arrow_type(column):
+    sql_type = column_types[column]
+    if sql_type == 'BIGINT':
+        return pa.int64()
+    if sql_type == 'DATETIME':
+        return pa.timestamp('us')
+    if sql_type == 'DOUBLE':
+        return pa.float64()
+    if sql_type == 'BOOLEAN':
+        return pa.bool_()
+    return pa.string()
+
+
+def parse_csv_value(column, value):
+    if value == '\\N':
+        return None
+    sql_type = column_types[column]
+    if sql_type in ('BIGINT', 'BOOLEAN'):
+        return int(value)
+    if sql_type == 'DATETIME':
+        return datetime.fromisoformat(value)
+    if sql_type == 'DOUBLE':
+        return float(value)
+    return value
+
+
+def table_files(directory, table, file_format):
+    # Un archivo por tabla, o uno por shard (table_i.part-000.csv, ...)
+    single = os.path.join(directory, f"{table}.{file_format}")
+    parts = sorted(glob.glob(os.path.join(directory, f"{table}.part-*.{file_format}")))
+    return ([single] if os.path.exists(single) else []) + parts
+
+
+class FileWriter(TableWriter):
+    # Escribe cada tabla como un archivo CSV o Parquet que crece lote a lote.
+    # Los CSV usan el formato que espera LOAD DATA: NULL como \N y booleanos como 0/1.
+
+    def __init__(self, directory, file_format='csv', chunk_size=chunk_size, part=None):
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unsupported file format: {file_format}")
+        super().__init__(chunk_size)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.file_format = file_format
+        self.part = part
+        self.files = {}
+
+    def path_for(self, table):
+        suffix = f".part-{self.part:03d}" if self.part is not None else ""
+        return os.path.join(self.directory, f"{table}{suffix}.{self.file_format}")
+
+    def read_keys(self, table, columns):
+        values = {column: [] for column in columns}
+        for path in table_files(self.directory, table, self.file_format):
+            if self.file_format == 'csv':
+                with open(path, 'r', newline='', encoding='utf-8') as file:
+                    for record in csv.DictReader(file):
+                        for column in columns:
+                            values[column].append(parse_csv_value(column, record[column]))
+            else:
+                data = pq.read_table(path, columns=list(columns)).to_pydict()
+                for column in columns:
+                    values[column].extend(data[column])
+
+        if len(columns) == 1:
+            return values[columns[0]]
+        return list(zip(*(values[column] for column in columns)))
+
+    def read_max(self, table, column):
+        values = [value for value in self.read_keys(table, [column]) if value is not None]
+        return max(values) if values else None
+
+    def _open(self, table):
+        path = self.path_for(table)
+        columns = table_columns[table]
+        if self.file_format == 'csv':
+            file = open(path, 'w', newline='', encoding='utf-8')
+            writer = csv.writer(file, lineterminator='\n')
+            writer.writerow(columns)
+            self.files[table] = (file, writer)
+        else:
+            schema = pa.schema([(column, arrow_type(column)) for column in columns])
+            self.files[table] = (pq.ParquetWriter(path, schema), schema)
+        return self.files[table]
+
+    def _insert_chunk(self, table, rows):
+        with instrumentation.timer('file_write', table=table):
+            self._append(table, rows)
+        instrumentation.count('file_rows', len(rows), table=table)
+
+    def _append(self, table, rows):
+        handle, writer = self.files.get(table) or self._open(table)
+        if self.file_format == 'csv':
+            writer.writerows(
+                ['\\N' if value is None else int(value) if isinstance(value, bool) else value for value in row]
+                for row in rows)
         else:
-            cursor.execute(query)
-        conn.commit()
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-        conn.rollback()
-        raise
-
-
-def generate_unique_id():
-    return fake.unique.random_number(digits=8)
-
-
-def generate_table_a(num_records):
-    for _ in range(num_records):
-        col_a1 = generate_unique_id()
-        col_a2 = fake.uuid4()
-        col_a3 = fake.random_int(min=1, max=100)
-        col_a4 = fake.random_int(min=1, max=50)
-        col_a5 = fake.date_time_between(start_date='-5y', end_date='now')
-
-        query = """
-        INSERT INTO table_a (col_a1, col_a2, col_a3, col_a4, col_a5)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        run_query(query, (col_a1, col_a2, col_a3, col_a4, col_a5))
-
-
-def generate_table_b():
-    query = "SELECT col_a1 FROM table_a"
-    cursor.execute(query)
-    col_a1_list = [row[0] for row in cursor.fetchall()]
-
-    for col_a1 in col_a1_list:
-        col_b1 = fake.uuid4()
-        col_b3 = fake.company_suffix()
-        col_b4 = fake.job()
-        col_b5 = fake.city()
-
-        query = """
-        INSERT INTO table_b (col_b1, col_b2, col_b3, col_b4, col_b5)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        run_query(query, (col_b1, col_a1, col_b3, col_b4, col_b5))
-
-
-def generate_table_c(num_records):
-    for _ in range(num_records):
-        col_c1 = generate_unique_id()
-        col_c2 = fake.street_address()
-        col_c3 = fake.city()
-        col_c4 = fake.word()
-        col_c5 = random.choice(regiones_chile)
-        col_c6 = random.choice(['Type A', 'Type B', 'Type C'])
-        col_c7 = random.choice([True, False])
-        col_c8 = fake.date_time_this_decade() if not col_c7 else None
-        col_c9 = float(fake.latitude())
-        col_c10 = float(fake.longitude())
-
-        query = """
-        INSERT INTO table_c (col_c1, col_c2, col_c3, col_c4, col_c5, col_c6, col_c7, col_c8, col_c9, col_c10)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        run_query(query, (col_c1, col_c2, col_c3, col_c4, col_c5, col_c6, col_c7, col_c8, col_c9, col_c10))
-
-
-def generate_table_d():
-    query = "SELECT col_a1 FROM table_a"
-    cursor.execute(query)
-    col_a1_list = [row[0] for row in cursor.fetchall()]
-
-    for col_d1 in col_a1_list:
-        col_d2 = random.randint(1, 5)
-        col_d3 = fake.date_time_this_year()
-        col_d4 = fake.date_time_between(start_date='-5y', end_date=col_d3)
-        col_d5 = random.randint(1, 3)
-
-        query = """
-        INSERT INTO table_d (col_d1, col_d2, col_d3, col_d4, col_d5)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        run_query(query, (col_d1, col_d2, col_d3, col_d4, col_d5))
-
-
-def generate_table_e(num_users_per_account):
-    query = "SELECT col_d1 FROM table_d"
-    cursor.execute(query)
-    col_d1_list = [row[0] for row in cursor.fetchall()]
-
-    for col_e2 in col_d1_list:
+            schema = writer
+            arrays = []
+            for field, values in zip(schema, zip(*rows)):
+                if field.type == pa.string():
+                    values = [None if value is None else str(value) for value in values]
+                arrays.append(pa.array(values, type=field.type))
+            handle.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    def close(self):
+        for handle, _ in self.files.values():
+            handle.close()
+        self.files.clear()
+
+
+class PipelinedWriter(TableWriter):
+    # Separa la generación de la escritura: flush deja el lote en una cola acotada y
+    # vuelve al generador, mientras un hilo por writer de `lanes` (cada uno con su
+    # conexión) lo inserta. Los lotes se insertan en paralelo pero se confirman en
+    # el orden en que se cerraron, así que el checkpoint guardado con cada lote sigue
+    # correspondiendo a las filas confirmadas. Con la cola llena el generador espera:
+    # la tabla avanza al ritmo de la etapa más lenta, no de la suma de las dos.
+
+    def __init__(self, lanes, queue_chunks=0):
+        super().__init__(lanes[0].chunk_size)
+        self.lanes = lanes
+        self.chunks = queue.Queue(maxsize=queue_chunks or 2 * len(lanes))
+        self.turn = threading.Condition()
+        self.stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.committed = 0
+        self.error = None
+        self.started = time.perf_counter()
+        self.metrics = {'lanes': len(lanes), 'queue_capacity': self.chunks.maxsize, 'chunks': 0,
+                        'max_queue_depth': 0, 'mean_queue_depth': 0.0, 'producer_blocked_seconds': 0.0,
+                        'busy_seconds': [0.0] * len(lanes), 'utilization': [0.0] * len(lanes)}
+        self.pipelines.append(self.metrics)
+        self.threads = [threading.Thread(target=self._drain, args=(index,), daemon=True)
+                        for index in range(len(lanes))]
+        for thread in self.threads:
+            thread.start()
+
+    def set_ignore_duplicates(self, table):
+        for lane in self.lanes:
+            lane.set_ignore_duplicates(table)
+
+    def read_keys(self, table, columns):
+        # La conexión del primer writer queda libre una vez vacía la cola
+        self.join()
+        return self.lanes[0].read_keys(table, columns)
+
+    def read_max(self, table, column):
+        self.join()
+        return self.lanes[0].read_max(table, column)
+
+    def flush(self, table=None):
+        tables = [table] if table is not None else list(self.pending)
+        for name in tables:
+            rows = self.pending.get(name)
+            if not rows:
+                continue
+            self._raise_error()
+            started = time.perf_counter()
+            save = self.on_chunk(name, len(rows)) if self.on_chunk is not None else None
+            depth = self.chunks.qsize()
+            queued = time.perf_counter()
+            self.chunks.put((self.enqueued, name, rows, save))
+            blocked = time.perf_counter() - queued
+            self.enqueued += 1
+            self.pending[name] = []
+            self.wait_seconds += time.perf_counter() - started
+
+            metrics = self.metrics
+            metrics['mean_queue_depth'] += (depth - metrics['mean_queue_depth']) / (metrics['chunks'] + 1)
+            metrics['chunks'] += 1
+            metrics['max_queue_depth'] = max(metrics['max_queue_depth'], min(depth + 1, self.chunks.maxsize))
+            metrics['producer_blocked_seconds'] += blocked
+
+    def _drain(self, index):
+        lane = self.lanes[index]
+        while True:
+            item = self.chunks.get()
+            if item is None:
+                self.chunks.task_done()
+                return
+            sequence, table, rows, save = item
+            error = None
+            started = time.perf_counter()
+            if self.error is None:
+                try:
+                    lane._insert_chunk(table, rows)
+                except Exception as err:
+                    error = err
+            busy = time.perf_counter() - started
+
+            with self.turn:
+                self.turn.wait_for(lambda: self.committed == sequence)
+                started = time.perf_counter()
+                try:
+                    if error is None and self.error is None:
+                        lane._commit_chunk(table, save)
+                except Exception as err:
+                    error = err
+                if error is not None or self.error is not None:
+                    # Los lotes posteriores a uno fallido se descartan para no dejar huecos
+                    try:
+                        lane.rollback()
+                    except Exception as err:
+                        error = error or err
+                if error is not None and self.error is None:
+                    print(f"Error writing {len(rows)} rows into {table}: {error}")
+                    self.error = error
+                busy += time.perf_counter() - started
+                self.committed += 1
+                self.turn.notify_all()
+
+            with self.stats_lock:
+                self.metrics['busy_seconds'][index] += busy
+                if error is None and self.error is None:
+                    stats = self.stats[table]
+                    stats['rows'] += len(rows)
+                    stats['chunks'] += 1
+                    stats['write_seconds'] += busy
+                    stats['finished'] = time.perf_counter()
+            self.chunks.task_done()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError(f"A writer failed: {self.error}") from self.error
+
+    def join(self):
+        self.chunks.join()
+        self._raise_error()
+
+    def close(self):
+        for _ in self.threads:
+            self.chunks.put(None)
+        for thread in self.threads:
+            thread.join()
+        for lane in self.lanes:
+            lane.close()
+        elapsed = time.perf_counter() - self.started
+        metrics = self.metrics
+        metrics['utilization'] = [round(busy / elapsed, 4) if elapsed > 0 else 0.0 for busy in metrics['busy_seconds']]
+        metrics['busy_seconds'] = [round(busy, 4) for busy in metrics['busy_seconds']]
+        metrics['mean_queue_depth'] = round(metrics['mean_queue_depth'], 2)
+        metrics['producer_blocked_seconds'] = round(metrics['producer_blocked_seconds'], 4)
+        self._raise_error()
+
+
+def open_writer(output=None, batch_size=chunk_size, part=None, writers=0):
+    # output es None para escribir en la base, o (directorio, formato) para archivos.
+    # Con writers > 0 la escritura pasa por un PipelinedWriter con esa cantidad de conexiones.
+    if writers > 0:
+        lanes = writers if output is None and db_backend == 'mysql' else 1
+        return PipelinedWriter([open_writer(output, batch_size, part) for _ in range(lanes)], pipeline_queue_chunks)
+    if output is None:
+        return BatchWriter(connect(), batch_size, close_connection=True)
+    directory, file_format = output
+    return FileWriter(directory, file_format, batch_size, part)
+
+
+def load_keys(writer, table):
+    columns = registry_columns[table]
+    encoders = [registry_encoders.get(column, int) for column in columns]
+    started = time.perf_counter()
+    keys = writer.read_keys(table, columns)
+    writer.wait_seconds += time.perf_counter() - started
+    for key in keys:
+        key = key if len(columns) > 1 else (key,)
+        key_registry.add(table, *(encode(value) for encode, value in zip(encoders, key)))
+
+
+def parent_keys(writer, table):
+    # Las tablas generadas en esta ejecución ya están en el registro; si no
+    # (por ejemplo, una tabla padre generada en una corrida anterior), sus
+    # claves se leen una sola vez desde el destino del writer
+    with registry_load_lock:
+        if table not in key_registry:
+            key_registry.register(table, len(registry_columns[table]))
+            load_keys(writer, table)
+            key_registry.sort(table)
+
+
+class TableStreams:
+    # Flujos aleatorios, asignador de IDs y fecha de referencia propios de una tabla.
+    # Derivados de la semilla maestra, la tabla sale igual sin importar qué otras
+    # tablas se generan en paralelo, y su estado completo cabe en un checkpoint.
+
+    def __init__(self, master_seed, table, ids=None, now=None):
+        self.master_seed = master_seed
+        self.table = table
+        self.random = random.Random(derive_seed(master_seed, table, 'random'))
+        self.fake = Faker('es_CL')
+        self.fake.seed_instance(derive_seed(master_seed, table, 'faker'))
+        self.numpy = np.random.default_rng(derive_seed(master_seed, table, 'numpy'))
+        self.ids = ids
+        self.now = now or datetime.now().replace(microsecond=0)
+
+    def years_ago(self, years):
+        # Como '-5y' en Faker, pero relativo a la fecha de referencia y no a la hora actual
+        return self.now - timedelta(days=365.24 * years)
+
+    def date_time_this_year(self):
+        return self.fake.date_time_between_dates(datetime(self.now.year, 1, 1), self.now)
+
+    def date_time_this_decade(self):
+        return self.fake.date_time_between_dates(datetime(self.now.year - self.now.year % 10, 1, 1), self.now)
+
+    def vocab_pool(self):
+        # Con su propio Faker, para que el pool sea el mismo al reanudar a mitad de la tabla
+        faker = Faker('es_CL')
+        faker.seed_instance(derive_seed(self.master_seed, self.table, 'vocab'))
+        return columnar.build_vocab_pool(faker)
+
+    def state(self):
+        return {'random': self.random.getstate(), 'faker': self.fake.random.getstate(),
+                'numpy': self.numpy.bit_generator.state, 'ids': self.ids.state() if self.ids else None}
+
+    def restore(self, state):
+        version, internal, gauss = state['random']
+        self.random.setstate((version, tuple(internal), gauss))
+        version, internal, gauss = state['faker']
+        self.fake.random.setstate((version, tuple(internal), gauss))
+        self.numpy.bit_generator.state = state['numpy']
+        if state['ids'] is not None:
+            self.ids = IdAllocator.from_state(state['ids'])
+
+
+class TableProgress:
+    # Avance de una tabla en unidades (sus propias filas, o las claves de la tabla
+    # padre que recorre). Con un checkpoint por lote, el lote se cierra solo al
+    # terminar una unidad: el estado de los flujos guardado junto con el lote
+    # corresponde exactamente a las filas confirmadas, y al reanudar se restaura
+    # y se sigue desde la unidad siguiente.
+
+    def __init__(self, table, writer, streams, checkpoint=None, resume=None):
+        self.table = table
+        self.writer = writer
+        self.streams = streams
+        self.checkpoint = checkpoint
+        self.start = 0
+        self.units = 0
+        self.rows = 0
+        if checkpoint is not None and checkpoint.chunk_level:
+            writer.auto_flush = False
+            writer.on_chunk = self.save
+            if resume and resume['state']:
+                streams.restore(resume['state'])
+                self.start = self.units = resume['units']
+                self.rows = resume['rows']
+
+    def register_keys(self, width=1):
+        key_registry.register(self.table, width)
+        if self.start:
+            # Claves que ya confirmó la corrida interrumpida
+            load_keys(self.writer, self.table)
+
+    def iterate(self, count):
+        if self.start:
+            print(f"Resuming {self.table} at unit {self.start} of {count} ({self.rows} rows already written)")
+        for unit in range(self.start, count):
+            yield unit
+            self.units = unit + 1
+            pending = self.writer.pending.get(self.table)
+            if pending and len(pending) >= self.writer.chunk_size:
+                self.writer.flush(self.table)
+
+    def save(self, table, rows):
+        # Se llama al cerrar el lote, así que el estado es el de sus filas; se guarda
+        # dentro de la transacción del lote, que puede confirmarse en otro hilo
+        if table != self.table:
+            return None
+        self.rows += rows
+        entry = (self.table, 'running', self.units, self.rows, self.streams.state())
+        return lambda cursor: self.checkpoint.save(*entry, cursor=cursor)
+
+
+def generate_table_a(writer, num_records, progress):
+    streams = progress.streams
+    faker = streams.fake
+    progress.register_keys()
+
+    for _ in progress.iterate(num_records):
+        col_a1 = streams.ids.next()
+        col_a2 = faker.uuid4()
+        col_a3 = faker.random_int(min=1, max=100)
+        col_a4 = faker.random_int(min=1, max=50)
+        col_a5 = faker.date_time_between(start_date=streams.years_ago(5), end_date=streams.now)
+
+        writer.add('table_a', (col_a1, col_a2, col_a3, col_a4, col_a5))
+        key_registry.add('table_a', col_a1)
+
+
+def generate_table_b(writer, progress):
+    parent_keys(writer, 'table_a')
+    customers = key_registry.array('table_a')
+    faker = progress.streams.fake
+
+    for unit in progress.iterate(len(customers)):
+        col_a1 = int(customers[unit])
+        col_b1 = faker.uuid4()
+        col_b3 = faker.company_suffix()
+        col_b4 = faker.job()
+        col_b5 = faker.city()
+
+        writer.add('table_b', (col_b1, col_a1, col_b3, col_b4, col_b5))
+
+
+def generate_table_c(writer, num_records, progress):
+    streams = progress.streams
+    rng, faker = streams.random, streams.fake
+
+    for _ in progress.iterate(num_records):
+        col_c1 = streams.ids.next()
+        col_c2 = faker.street_address()
+        col_c3 = faker.city()
+        col_c4 = faker.word()
+        col_c5 = rng.choice(regiones_chile)
+        col_c6 = rng.choice(['Type A', 'Type B', 'Type C'])
+        col_c7 = rng.choice([True, False])
+        col_c8 = streams.date_time_this_decade() if not col_c7 else None
+        col_c9 = float(faker.latitude())
+        col_c10 = float(faker.longitude())
+
+        writer.add('table_c', (col_c1, col_c2, col_c3, col_c4, col_c5, col_c6, col_c7, col_c8, col_c9, col_c10))
+
+
+def generate_table_d(writer, progress):
+    parent_keys(writer, 'table_a')
+    customers = key_registry.array('table_a')
+    streams = progress.streams
+    rng, faker = streams.random, streams.fake
+    progress.register_keys()
+
+    for unit in progress.iterate(len(customers)):
+        col_d1 = int(customers[unit])
+        col_d2 = rng.randint(1, 5)
+        col_d3 = streams.date_time_this_year()
+        col_d4 = faker.date_time_between(start_date=streams.years_ago(5), end_date=col_d3)
+        col_d5 = rng.randint(1, 3)
+
+        writer.add('table_d', (col_d1, col_d2, col_d3, col_d4, col_d5))
+        key_registry.add('table_d', col_d1)
+
+
+def generate_table_e(writer, num_users_per_account, progress):
+    parent_keys(writer, 'table_d')
+    accounts = key_registry.array('table_d')
+    streams = progress.streams
+    rng, faker = streams.random, streams.fake
+    progress.register_keys(2)
+
+    for unit in progress.iterate(len(accounts)):
+        col_e2 = int(accounts[unit])
         for _ in range(num_users_per_account):
-            col_e1 = generate_unique_id()
-            col_e3 = random.randint(1, 5)
-            col_e4 = fake.date_time_between(start_date='-2y', end_date='now')
-            col_e5 = fake.date_time_between(start_date=col_e4, end_date='now')
+            col_e1 = streams.ids.next()
+            col_e3 = rng.randint(1, 5)
+            col_e4 = faker.date_time_between(start_date=streams.years_ago(2), end_date=streams.now)
+            col_e5 = faker.date_time_between(start_date=col_e4, end_date=streams.now)
 
-            query = """
-            INSERT INTO table_e (col_e1, col_e2, col_e3, col_e4, col_e5)
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            run_query(query, (col_e1, col_e2, col_e3, col_e4, col_e5))
+            writer.add('table_e', (col_e1, col_e2, col_e3, col_e4, col_e5))
+            key_registry.add('table_e', col_e1, col_e2)
 
 
-def generate_unique_col_f1():
-    letters = ''.join(random.choices(string.ascii_uppercase, k=2))
-    numbers = ''.join(random.choices(string.digits, k=4))
-    return f"{letters}{numbers}"
+def generate_table_f(writer, num_records, progress):
+    streams = progress.streams
+    streams.ids.ensure_capacity(num_records - progress.start, 'asset IDs')
 
+    # Las claves ya existentes en la base se omiten con INSERT IGNORE en vez de
+    # capturar el error 1062 fila por fila, que no es posible dentro de un lote
+    writer.set_ignore_duplicates('table_f')
+    progress.register_keys()
 
-def generate_table_f(num_records):
-    generated_col_f1 = set()
+    for _ in progress.iterate(num_records):
+        col_f1 = decode_asset_id(streams.ids.next())
+        col_f2 = streams.random.randint(1, 5)
 
-    for _ in range(num_records):
-        while True:
-            col_f1 = generate_unique_col_f1()
-            if col_f1 not in generated_col_f1:
-                generated_col_f1.add(col_f1)
-                break
+        writer.add('table_f', (col_f1, col_f2))
+        key_registry.add('table_f', encode_asset_id(col_f1))
 
-        col_f2 = random.randint(1, 5)
+    print(f"Successfully generated {num_records} unique records for table_f.")
 
-        query = """
-        INSERT INTO table_f (col_f1, col_f2)
-        VALUES (%s, %s)
-        """
-        try:
-            run_query(query, (col_f1, col_f2))
-        except mysql.connector.IntegrityError as e:
-            if e.errno == 1062:  # Código de error para entrada duplicada
-                print(f"Duplicate entry found: {col_f1}. Skipping and generating a new one.")
-                continue
-            else:
-                raise
 
-    print(f"Successfully generated {len(generated_col_f1)} unique records for table_f.")
+def generate_table_g(writer, progress):
+    parent_keys(writer, 'table_d')
+    parent_keys(writer, 'table_f')
+    accounts = key_registry.array('table_d')
+    streams = progress.streams
+    rng, faker = streams.random, streams.fake
+    progress.register_keys(2)
 
+    for unit in progress.iterate(len(accounts)):
+        col_g1 = int(accounts[unit])
+        num_vehicles = rng.randint(1, 3)
+        for _ in range(num_vehicles):
+            col_g2 = streams.ids.next()
+            col_g3 = faker.random_letter()
+            col_g4 = rng.randint(1, 5)
+            col_g5 = faker.company()
+            col_g6 = rng.randint(1, 3)
+            col_g7 = faker.word()
+            col_g8 = faker.date_time_between(start_date=streams.years_ago(3), end_date=streams.now)
+            col_g9 = faker.date_time_between(start_date=col_g8, end_date=streams.now)
+            col_g10 = decode_asset_id(key_registry.choice('table_f', rng))
+
+            writer.add('table_g', (col_g1, col_g2, col_g3, col_g4, col_g5, col_g6, col_g7, col_g8, col_g9, col_g10))
+            key_registry.add('table_g', col_g1, col_g2)
+
+
+def generate_table_h(writer, progress):
+    parent_keys(writer, 'table_e')
+    parent_keys(writer, 'table_g')
+    users = key_registry.array('table_e')
+    streams = progress.streams
+
+    # Índice cliente -> activos construido una sola vez, en vez de recorrer
+    # todo table_g por cada usuario
+    assets_by_customer = defaultdict(list)
+    for col_g1, col_g2 in key_registry.rows('table_g'):
+        assets_by_customer[col_g1].append(col_g2)
+
+    for unit in progress.iterate(len(users)):
+        col_h1, col_h2 = users[unit].tolist()
+        for col_h3 in assets_by_customer.get(col_h2, ()):
+            col_h4 = streams.random.choice([0, 1])
+            col_h5 = streams.fake.date_time_between(start_date=streams.years_ago(1), end_date=streams.now)
+
+            writer.add('table_h', (col_h1, col_h2, col_h3, col_h4, col_h5))
+
+
+def build_table_i_row(col_i1, users, assets, start_date, rng=random, faker=fake):
+    # users: arreglo (col_e1, col_e2) de table_e; assets: col_f1 codificados de table_f
+    col_i3, col_i2 = users[rng.randrange(len(users))].tolist()
+    col_i4 = rng.randint(1, 10)  # Ampliado el rango de formas de pago
+    col_i5 = faker.uuid4()
+    col_i6 = faker.uuid4()
+
+    # Generar montos con mayor variabilidad
+    base_amount = rng.randint(1000, 500000)  # Ampliado el rango
+    col_i7 = int(base_amount * rng.uniform(0.8, 1.2))  # Añadir variabilidad
+
+    col_i8 = rng.choice(['Type X', 'Type Y', 'Type Z'])  # Añadido un tipo más
+    col_i9 = rng.randint(1, 5)  # Ampliado el rango
+
+    # Añadir variabilidad al monto total
+    col_i10 = int(col_i7 * rng.uniform(0.95, 1.05))
+
+    # Generar fechas con mayor variabilidad
+    days_offset = rng.randint(0, 730)  # Hasta 2 años de offset
+    col_i11 = start_date + timedelta(days=days_offset)
+
+    # Añadir variabilidad entre fechas
+    time_diff = timedelta(minutes=rng.randint(0, 60))
+    col_i12 = col_i11 + time_diff
+    col_i13 = col_i12 + timedelta(minutes=rng.randint(1, 30))
+
+    col_i14 = faker.word()
+    col_i15 = faker.word()
+    col_i16 = decode_asset_id(assets[rng.randrange(len(assets))])
+
+    # Ocasionalmente, generar transacciones con montos muy altos o muy bajos
+    if rng.random() < 0.05:  # 5% de las transacciones
+        if rng.choice([True, False]):
+            col_i7 = rng.randint(500000, 1000000)  # Monto muy alto
+        else:
+            col_i7 = rng.randint(100, 999)  # Monto muy bajo
+        col_i10 = col_i7  # Igualar el monto total al monto pagado en estos casos especiales
 
-def generate_table_g():
-    query = "SELECT col_d1 FROM table_d"
-    cursor.execute(query)
-    col_d1_list = [row[0] for row in cursor.fetchall()]
+    return (col_i1, col_i2, col_i3, col_i4, col_i5, col_i6, col_i7, col_i8, col_i9, col_i10,
+            col_i11, col_i12, col_i13, col_i14, col_i15, col_i16)
 
-    query = "SELECT col_f1 FROM table_f"
-    cursor.execute(query)
-    col_f1_list = [row[0] for row in cursor.fetchall()]
 
-    for col_g1 in col_d1_list:
-        num_vehicles = random.randint(1, 3)
-        for _ in range(num_vehicles):
-            col_g2 = generate_unique_id()
-            col_g3 = fake.random_letter()
-            col_g4 = random.randint(1, 5)
-            col_g5 = fake.company()
-            col_g6 = random.randint(1, 3)
-            col_g7 = fake.word()
-            col_g8 = fake.date_time_between(start_date='-3y', end_date='now')
-            col_g9 = fake.date_time_between(start_date=col_g8, end_date='now')
-            col_g10 = random.choice(col_f1_list)
-
-            query = """
-            INSERT INTO table_g (col_g1, col_g2, col_g3, col_g4, col_g5, col_g6, col_g7, col_g8, col_g9, col_g10)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            run_query(query, (col_g1, col_g2, col_g3, col_g4, col_g5, col_g6, col_g7, col_g8, col_g9, col_g10))
-
-
-def generate_table_h():
-    query = "SELECT col_e1, col_e2 FROM table_e"
-    cursor.execute(query)
-    col_e_list = cursor.fetchall()
-
-    query = "SELECT col_g1, col_g2 FROM table_g"
-    cursor.execute(query)
-    col_g_list = cursor.fetchall()
-
-    for col_h1, col_h2 in col_e_list:
-        for col_g1, col_h3 in col_g_list:
-            if col_h2 == col_g1:
-                col_h4 = random.choice([0, 1])
-                col_h5 = fake.date_time_between(start_date='-1y', end_date='now')
-
-                query = """
-                INSERT INTO table_h (col_h1, col_h2, col_h3, col_h4, col_h5)
-                VALUES (%s, %s, %s, %s, %s)
-                """
-                run_query(query, (col_h1, col_h2, col_h3, col_h4, col_h5))
-
-
-def generate_table_i(num_transactions):
-    query = "SELECT col_e1, col_e2 FROM table_e"
-    cursor.execute(query)
-    col_e_list = cursor.fetchall()
-
-    query = "SELECT col_f1 FROM table_f"
-    cursor.execute(query)
-    col_f1_list = [row[0] for row in cursor.fetchall()]
+def iter_table_i_rows(num_transactions, users, assets, start_date, ids=None, rng=random, faker=fake):
+    ids = ids or id_allocator
+    for _ in range(num_transactions):
+        yield build_table_i_row(ids.next(), users, assets, start_date, rng, faker)
 
-    # Definir una fecha de inicio para las transacciones
-    start_date = fake.date_time_between(start_date='-2y', end_date='now')
 
-    for _ in range(num_transactions):
-        col_i1 = generate_unique_id()
-        col_i3, col_i2 = random.choice(col_e_list)
-        col_i4 = random.randint(1, 10)  # Ampliado el rango de formas de pago
-        col_i5 = fake.uuid4()
-        col_i6 = fake.uuid4()
-
-        # Generar montos con mayor variabilidad
-        base_amount = random.randint(1000, 500000)  # Ampliado el rango
-        col_i7 = int(base_amount * random.uniform(0.8, 1.2))  # Añadir variabilidad
-
-        col_i8 = random.choice(['Type X', 'Type Y', 'Type Z'])  # Añadido un tipo más
-        col_i9 = random.randint(1, 5)  # Ampliado el rango
-
-        # Añadir variabilidad al monto total
-        col_i10 = int(col_i7 * random.uniform(0.95, 1.05))
-
-        # Generar fechas con mayor variabilidad
-        days_offset = random.randint(0, 730)  # Hasta 2 años de offset
-        col_i11 = start_date + timedelta(days=days_offset)
-
-        # Añadir variabilidad entre fechas
-        time_diff = timedelta(minutes=random.randint(0, 60))
-        col_i12 = col_i11 + time_diff
-        col_i13 = col_i12 + timedelta(minutes=random.randint(1, 30))
-
-        col_i14 = fake.word()
-        col_i15 = fake.word()
-        col_i16 = random.choice(col_f1_list)
-
-        # Ocasionalmente, generar transacciones con montos muy altos o muy bajos
-        if random.random() < 0.05:  # 5% de las transacciones
-            if random.choice([True, False]):
-                col_i7 = random.randint(500000, 1000000)  # Monto muy alto
-            else:
-                col_i7 = random.randint(100, 999)  # Monto muy bajo
-            col_i10 = col_i7  # Igualar el monto total al monto pagado en estos casos especiales
+def iter_table_i_rows_columnar(rng, num_transactions, users, assets, start_date, ids=None, batch_size=chunk_size):
+    ids = ids or id_allocator
+    col_e = np.asarray(users, dtype=np.int64)
+    col_f1 = decode_asset_ids(assets)
+    vocab_pool = columnar.build_vocab_pool(fake)
+
+    for batch_start in range(0, num_transactions, batch_size):
+        size = min(batch_size, num_transactions - batch_start)
+        col_i1 = ids.take(size)
+        columns = columnar.build_table_i_columns(rng, col_i1, col_e, col_f1, start_date, vocab_pool)
+        yield from columnar.iter_rows(columns, table_columns['table_i'])
 
-        query = """
-        INSERT INTO table_i (col_i1, col_i2, col_i3, col_i4, col_i5, col_i6, col_i7, col_i8, col_i9, col_i10,
-                             col_i11, col_i12, col_i13, col_i14, col_i15, col_i16)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        run_query(query, (col_i1, col_i2, col_i3, col_i4, col_i5, col_i6, col_i7, col_i8, col_i9, col_i10,
-                          col_i11, col_i12, col_i13, col_i14, col_i15, col_i16))
+
+def transaction_start_date(master_seed, now):
+    # Fecha de inicio de las transacciones, derivada de la semilla y relativa a la fecha de referencia
+    start_rng = random.Random(derive_seed(master_seed, 'start_date'))
+    return now - timedelta(days=start_rng.randint(0, 730), seconds=start_rng.randint(0, 86399))
+
+
+def generate_table_i(writer, num_transactions, progress, vectorized=False):
+    parent_keys(writer, 'table_e')
+    parent_keys(writer, 'table_f')
+    users = key_registry.array('table_e')
+    assets = key_registry.array('table_f')
+    streams = progress.streams
+    progress.register_keys(2)
+
+    # Definir una fecha de inicio para las transacciones
+    start_date = transaction_start_date(streams.master_seed, streams.now)
+    col_i12_index = table_columns['table_i'].index('col_i12')
+
+    if vectorized:
+        # Cada unidad es un lote de transacciones generado con NumPy
+        batch_size = writer.chunk_size
+        col_e = np.asarray(users, dtype=np.int64)
+        col_f1 = decode_asset_ids(assets)
+        vocab_pool = streams.vocab_pool()
+        for batch in progress.iterate(-(-num_transactions // batch_size)):
+            size = min(batch_size, num_transactions - batch * batch_size)
+            columns = columnar.build_table_i_columns(streams.numpy, streams.ids.take(size), col_e, col_f1,
+                                                     start_date, vocab_pool)
+            for row in columnar.iter_rows(columns, table_columns['table_i']):
+                writer.add('table_i', row)
+                key_registry.add('table_i', row[0], encode_timestamp(row[col_i12_index]))
+    else:
+        for _ in progress.iterate(num_transactions):
+            row = build_table_i_row(streams.ids.next(), users, assets, start_date, streams.random, streams.fake)
+            writer.add('table_i', row)
+            key_registry.add('table_i', row[0], encode_timestamp(row[col_i12_index]))
 
     print(f"Generated {num_transactions} records for table_i")
 
 
-def generate_table_j():
+def iter_table_j_rows(col_i_list, rng=random):
     products = ['Product A', 'Product B', 'Product C', 'Product D', 'Product E']
 
-    query = "SELECT col_i1, col_i12 FROM table_i"
-    cursor.execute(query)
-    col_i_list = cursor.fetchall()
-
     for col_j1, col_j12 in col_i_list:
-        num_products = random.randint(1, 3)
+        num_products = rng.randint(1, 3)
         for col_j2 in range(1, num_products + 1):
-            col_j3 = random.randint(1, len(products))
-            col_j4 = random.randint(1, 50)
-            col_j5 = random.randint(1000, 50000)
+            col_j3 = rng.randint(1, len(products))
+            col_j4 = rng.randint(1, 50)
+            col_j5 = rng.randint(1000, 50000)
             col_j6 = products[col_j3 - 1]
-            col_j7 = random.choice(['Normal', 'Discount', 'Promotion'])
+            col_j7 = rng.choice(['Normal', 'Discount', 'Promotion'])
             col_j8 = col_j12
-            col_j9 = random.randint(0, 1000)
+            col_j9 = rng.randint(0, 1000)
             col_j10 = col_j5 // col_j4
             col_j11 = col_j9 // col_j4
 
-            query = """
-            INSERT INTO table_j (col_j1, col_j2, col_j3, col_j4, col_j5, col_j6, col_j7, col_j8, col_j9, col_j10, col_j11, col_j12)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            run_query(query, (
-                col_j1, col_j2, col_j3, col_j4, col_j5, col_j6, col_j7, col_j8, col_j9, col_j10, col_j11, col_j12))
-
-
-def generate_all_data():
-    print("Starting data generation...")
-
-    num_accounts = 1000
-    num_stations = 50
-    num_users_per_account = 3
-    num_vehicles = 5000
-    num_transactions = 100000
-
+            yield (col_j1, col_j2, col_j3, col_j4, col_j5, col_j6, col_j7, col_j8, col_j9, col_j10, col_j11, col_j12)
+
+
+def iter_table_j_rows_columnar(rng, col_i1, col_i12, batch_size=chunk_size):
+    # Se procesan las transacciones por lotes para acotar la memoria de los arreglos
+    for batch_start in range(0, len(col_i1), batch_size):
+        batch = slice(batch_start, batch_start + batch_size)
+        columns = columnar.build_table_j_columns(rng, col_i1[batch], col_i12[batch])
+        yield from columnar.iter_rows(columns, table_columns['table_j'])
+
+
+def generate_table_j(writer, progress, vectorized=False):
+    parent_keys(writer, 'table_i')
+    transactions = key_registry.array('table_i')
+    streams = progress.streams
+
+    if vectorized:
+        # Cada unidad es un lote de transacciones; sus líneas se generan con NumPy
+        batch_size = writer.chunk_size
+        col_i12 = transactions[:, 1].view('datetime64[us]')
+        for batch in progress.iterate(-(-len(transactions) // batch_size)):
+            batch = slice(batch * batch_size, (batch + 1) * batch_size)
+            columns = columnar.build_table_j_columns(streams.numpy, transactions[batch, 0], col_i12[batch])
+            writer.add_many('table_j', columnar.iter_rows(columns, table_columns['table_j']))
+    else:
+        for unit in progress.iterate(len(transactions)):
+            col_i1, col_i12 = transactions[unit].tolist()
+            writer.add_many('table_j', iter_table_j_rows([(col_i1, decode_timestamp(col_i12))], streams.random))
+
+
+def shard_sizes(total, shard_count):
+    base, remainder = divmod(total, shard_count)
+    return [base + (1 if shard < remainder else 0) for shard in range(shard_count)]
+
+
+def generate_transaction_shard(shard, shard_count, num_transactions, master_seed, users, assets,
+                               start_date, vectorized, batch_size, output=None, ids_state=None, writers=0):
+    # Corre en un proceso del pool: genera su parte de table_i y, lote a lote,
+    # las líneas de table_j de esas mismas transacciones, sin releer table_i.
+    # table_i y table_j usan flujos aleatorios separados, así que el resultado
+    # depende solo de la semilla maestra y del número de shards.
+    # El registro de instrumentación vuelve al proceso principal con el resultado
+    instrumentation.registry.reset()
+    started = time.perf_counter()
+    seed_i = derive_seed(master_seed, shard_count, shard, 'table_i')
+    seed_j = derive_seed(master_seed, shard_count, shard, 'table_j')
+    random.seed(seed_i)
+    fake.seed_instance(seed_i)
+    rng_j = random.Random(seed_j)
+
+    # Cada shard toma IDs de su propio rango de posiciones del asignador
+    ids = IdAllocator.from_state(ids_state)
+
+    if vectorized:
+        rows_i = iter_table_i_rows_columnar(np.random.default_rng(seed_i), num_transactions, users,
+                                            assets, start_date, ids, batch_size)
+    else:
+        rows_i = iter_table_i_rows(num_transactions, users, assets, start_date, ids)
+    rng_j_columnar = np.random.default_rng(seed_j)
+    col_i12_index = table_columns['table_i'].index('col_i12')
+
+    writer = open_writer(output, batch_size, part=shard, writers=writers)
     try:
-        print("Generating table_a...")
-        generate_table_a(num_accounts)
-
-        print("Generating table_b...")
-        generate_table_b()
-
-        print("Generating table_c...")
-        generate_table_c(num_stations)
-
-        print("Generating table_d...")
-        generate_table_d()
-
-        print("Generating table_e...")
-        generate_table_e(num_users_per_account)
-
-        print("Generating table_f...")
-        generate_table_f(num_vehicles)
-
-        print("Generating table_g...")
-        generate_table_g()
-
-        print("Generating table_h...")
-        generate_table_h()
-
-        print("Generating table_i...")
-        generate_table_i(num_transactions)
-
-        print("Generating table_j...")
-        generate_table_j()
+        while True:
+            chunk = list(islice(rows_i, batch_size))
+            if not chunk:
+                break
+            writer.add_many('table_i', chunk)
+            writer.flush('table_i')
+
+            col_i_list = [(row[0], row[col_i12_index]) for row in chunk]
+            if vectorized:
+                col_i1 = np.array([row[0] for row in col_i_list], dtype=np.int64)
+                col_i12 = np.array([row[1] for row in col_i_list], dtype='datetime64[us]')
+                rows_j = iter_table_j_rows_columnar(rng_j_columnar, col_i1, col_i12, batch_size)
+            else:
+                rows_j = iter_table_j_rows(col_i_list, rng_j)
+            writer.add_many('table_j', rows_j)
+        writer.flush()
+    finally:
+        writer.close()
+
+    # Faker/random de este shard, que el proceso principal suma a los de table_i
+    instrumentation.registry.observe('generate_compute', time.perf_counter() - started - writer.wait_seconds,
+                                     table='table_i')
+    return writer.stats, writer.pipelines, instrumentation.registry.snapshot()
+
+
+def generate_transactions_sharded(writer, num_transactions, shard_count, master_seed=None, vectorized=False,
+                                  output=None, reference_date=seeded_reference_date, writers=0):
+    # Genera table_i y table_j juntas en un pool de procesos, cada uno con su
+    # propia semilla derivada y su propia conexión
+    if master_seed is None:
+        master_seed = random.getrandbits(32)
+    print(f"Generating table_i/table_j in {shard_count} shards with master seed {master_seed}")
+
+    parent_keys(writer, 'table_e')
+    parent_keys(writer, 'table_f')
+    users = key_registry.array('table_e')
+    assets = key_registry.array('table_f')
+
+    # Fecha de inicio derivada de la semilla, relativa a la fecha de referencia para ser reproducible
+    start_date = transaction_start_date(master_seed, reference_date)
+
+    # Los IDs de table_i salen de una permutación propia derivada de la semilla maestra,
+    # para no depender de cuántos IDs consumieron antes las otras tablas; cada shard
+    # recibe un rango de posiciones disjunto
+    sizes = shard_sizes(num_transactions, shard_count)
+    transaction_ids = IdAllocator(*id_space, derive_seed(master_seed, 'table_i'))
+    transaction_ids.ensure_capacity(num_transactions, 'transaction IDs')
+    ids_states = [allocator.state() for allocator in transaction_ids.split(sizes)]
+
+    context = multiprocessing.get_context('spawn')
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=shard_count, mp_context=context) as executor:
+        futures = [
+            executor.submit(generate_transaction_shard, shard, shard_count, size, master_seed, users,
+                            assets, start_date, vectorized, writer.chunk_size, output, ids_states[shard], writers)
+            for shard, size in enumerate(sizes)
+        ]
+        for future in futures:
+            stats, pipelines, metrics = future.result()
+            writer.merge_stats(stats, pipelines)
+            instrumentation.registry.merge(metrics)
+    # La generación y la escritura ocurren en los shards; este hilo solo espera
+    writer.wait_seconds += time.perf_counter() - started
+
+    print(f"Generated {writer.stats.get('table_i', {}).get('rows', 0)} records for table_i")
+
+
+def load_table_dependencies(path=schema_path):
+    # Grafo de claves foráneas de schema.sql: tabla -> tablas que referencia
+    with open(path, 'r') as file:
+        schema = file.read()
+
+    dependencies = {}
+    for table, body in re.findall(r'CREATE TABLE (\w+) \((.*?)\n\);', schema, re.S):
+        dependencies[table] = set(re.findall(r'REFERENCES (\w+)\(', body)) - {table}
+    return dependencies
+
+
+def peak_rss_kb():
+    # Máximo de memoria residente del proceso y de sus procesos hijos (shards).
+    # ru_maxrss está en KB en Linux; el módulo resource no existe en Windows.
+    try:
+        import resource
+    except ImportError:
+        return None
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def run_table(table, generate, origin, output=None, master_seed=None, reference_date=None, ids=None,
+              checkpoint=None, resume=None, writers=0):
+    writer = open_writer(output, writers=writers)
+    progress = TableProgress(table, writer, TableStreams(master_seed, table, ids, reference_date), checkpoint, resume)
+    start = time.perf_counter() - origin
+    rss_before = peak_rss_kb()
+    print(f"Generating {table}...")
+    try:
+        generate(writer, progress)
+        writer.flush()
+        generated = time.perf_counter() - origin
+    finally:
+        writer.close()
+
+    # El tiempo del generador fuera del writer es el de Faker/random
+    instrumentation.registry.observe('generate', generated - start, table=table)
+    instrumentation.registry.observe('writer_wait', writer.wait_seconds, table=table)
+    instrumentation.registry.observe('generate_compute', generated - start - writer.wait_seconds, table=table)
+
+    if table in key_registry:
+        key_registry.sort(table)
+    if checkpoint is not None:
+        checkpoint.save(table, 'done', progress.units,
+                        progress.rows or writer.stats.get(table, {}).get('rows', 0))
+
+    # ru_maxrss es el máximo de todo el proceso: por tabla solo se informa cuánto subió
+    # mientras corría. Con tablas en paralelo, la subida se cuenta en las que estaban
+    # corriendo cuando se alcanzó el nuevo máximo.
+    rss_after = peak_rss_kb()
+    return {'start': start, 'end': time.perf_counter() - origin, 'rows': writer.stats.get(table, {}).get('rows', 0),
+            'peak_rss_growth_kb': rss_after - rss_before if rss_after is not None else None, 'writer': writer}
+
+
+def run_schedule(tasks, dependencies, max_workers=generation_workers, output=None, table_options=None):
+    # Ejecuta cada tabla apenas terminan todas sus tablas padre. Las dependencias
+    # hacia tablas fuera de `tasks` se consideran ya satisfechas. table_options
+    # tiene los argumentos extra de run_table de cada tabla.
+    origin = time.perf_counter()
+    pending = {table: dependencies.get(table, set()) & set(tasks) for table in tasks}
+    running = {}
+    done = set()
+    failed = set()
+    timeline = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for table, parents in list(pending.items()):
+                if parents & failed:
+                    print(f"Skipping {table}: parent table failed ({', '.join(sorted(parents & failed))})")
+                    failed.add(table)
+                    del pending[table]
+                elif parents <= done:
+                    options = (table_options or {}).get(table, {})
+                    running[executor.submit(run_table, table, tasks[table], origin, output, **options)] = table
+                    del pending[table]
+
+            if not running:
+                if not pending:
+                    break
+                raise RuntimeError(f"Unsatisfiable table dependencies: {sorted(pending)}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                try:
+                    timeline[table] = future.result()
+                    done.add(table)
+                except Exception as e:
+                    print(f"An error occurred while generating {table}: {e}")
+                    failed.add(table)
+
+    return timeline, failed
+
+
+def topological_order(dependencies):
+    order = []
+    done = set()
+    while len(order) < len(dependencies):
+        ready = sorted(table for table, parents in dependencies.items() if table not in done and parents <= done)
+        if not ready:
+            raise RuntimeError(f"Cyclic table dependencies: {sorted(set(dependencies) - done)}")
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+
+def iter_file_rows(path, table, file_format):
+    columns = table_columns[table]
+    if file_format == 'csv':
+        with open(path, 'r', newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            next(reader)
+            for record in reader:
+                yield tuple(parse_csv_value(column, value) for column, value in zip(columns, record))
+    else:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def load_directory(directory, file_format='csv'):
+    # Carga en orden de claves foráneas los archivos escritos por FileWriter.
+    # En MySQL los CSV van con LOAD DATA LOCAL INFILE; los Parquet, que MySQL
+    # no lee directamente (y todo en SQLite), se insertan por lotes con BatchWriter.
+    use_load_data = db_backend == 'mysql' and file_format == 'csv'
+    connection = connect(allow_local_infile=True)
+    cursor = connection.cursor()
+    if db_backend == 'mysql':
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.execute("SET SESSION unique_checks = 0")
+    try:
+        for table in topological_order(load_table_dependencies()):
+            paths = table_files(directory, table, file_format)
+            if not paths:
+                continue
 
-        print("Data generation completed.")
-    except Exception as e:
-        print(f"An error occurred during data generation: {e}")
+            started = time.perf_counter()
+            rows = 0
+            if use_load_data:
+                for path in paths:
+                    cursor.execute(
+                        f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+                        f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+                        f"LINES TERMINATED BY '\\n' IGNORE 1 LINES ({', '.join(table_columns[table])})",
+                        (os.path.abspath(path),))
+                    rows += cursor.rowcount
+                connection.commit()
+            else:
+                writer = BatchWriter(connection)
+                for path in paths:
+                    writer.add_many(table, iter_file_rows(path, table, file_format))
+                writer.flush()
+                writer.close()
+                rows = writer.stats[table]['rows']
+            elapsed = time.perf_counter() - started
+            print(f"Loaded {rows} rows into {table} in {elapsed:.2f}s")
     finally:
+        if db_backend == 'mysql':
+            cursor.execute("SET SESSION unique_checks = 1")
+            cursor.execute("SET SESSION foreign_key_checks = 1")
         cursor.close()
-        conn.close()
+        connection.close()
+
+
+def print_timeline(timeline):
+    print("\nGeneration timeline:")
+    for table, entry in sorted(timeline.items(), key=lambda item: item[1]['start']):
+        print(f"  {table}: start {entry['start']:8.2f}s  end {entry['end']:8.2f}s  "
+              f"({entry['end'] - entry['start']:.2f}s)  {entry['rows']} rows")
+
+
+def scaled_volumes(scale_factor=1.0):
+    volumes = {name: max(1, round(value * scale_factor)) for name, value in base_volumes.items()}
+    volumes['num_users_per_account'] = base_volumes['num_users_per_account']
+    return volumes
+
+
+def timeline_metrics(timeline):
+    metrics = {}
+    for table, entry in timeline.items():
+        stats = entry['writer'].stats
+        seconds = entry['end'] - entry['start']
+        metrics[table] = {
+            'start_seconds': round(entry['start'], 4),
+            'wall_seconds': round(seconds, 4),
+            'rows': {name: table_stats['rows'] for name, table_stats in stats.items()},
+            'rows_per_second': round(sum(table_stats['rows'] for table_stats in stats.values()) / seconds, 1)
+            if seconds > 0 else None,
+            'write_seconds': round(sum(table_stats['write_seconds'] for table_stats in stats.values()), 4),
+            'peak_rss_growth_kb': entry['peak_rss_growth_kb'],
+            'pipelines': [pipeline for pipeline in entry['writer'].pipelines if pipeline['chunks']],
+        }
+    return metrics
+
+
+def time_breakdown():
+    # Por tabla, según el registro de instrumentación: el generador se divide en
+    # Faker/random y espera al writer, y la escritura en driver, commits y checkpoints.
+    # Con shards, Faker/random de table_i suma el tiempo de todos los procesos.
+    registry = instrumentation.registry
+    breakdown = {}
+    for table in table_columns:
+        entry = {
+            'generate_seconds': registry.seconds('generate', table=table),
+            'faker_random_seconds': registry.seconds('generate_compute', table=table),
+            'writer_wait_seconds': registry.seconds('writer_wait', table=table),
+            'driver_seconds': (registry.seconds('db_execute', table=table) + registry.seconds('db_fetch', table=table)
+                               + registry.seconds('file_write', table=table)),
+            'commit_seconds': registry.seconds('db_commit', table=table),
+            'checkpoint_seconds': registry.seconds('checkpoint_save', table=table),
+        }
+        entry = {name: round(value, 4) for name, value in entry.items()}
+        entry['round_trips'] = registry.total('db_round_trips', table=table)
+        entry['rows_written'] = (registry.total('db_rows', table=table, direction='write')
+                                 + registry.total('file_rows', table=table))
+        if entry['generate_seconds'] or entry['rows_written']:
+            breakdown[table] = entry
+    return breakdown
+
+
+def print_time_breakdown(breakdown):
+    print("\nTime breakdown per table (seconds):")
+    print(f"  {'table':<8} {'generate':>9} {'faker':>9} {'wait':>9} {'driver':>9} {'commit':>9} "
+          f"{'ckpt':>7} {'trips':>7}")
+    for table, entry in breakdown.items():
+        print(f"  {table:<8} {entry['generate_seconds']:9.2f} {entry['faker_random_seconds']:9.2f} "
+              f"{entry['writer_wait_seconds']:9.2f} {entry['driver_seconds']:9.2f} {entry['commit_seconds']:9.2f} "
+              f"{entry['checkpoint_seconds']:7.2f} {entry['round_trips']:7d}")
+
+
+def open_checkpoint(output=None):
+    # En la base, junto a los datos; con archivos, un checkpoint.json en el directorio de salida
+    if output is not None:
+        return FileCheckpoint(output[0])
+    return DatabaseCheckpoint(connect, '?' if db_backend == 'sqlite' else '%s')
+
+
+def generate_all_data(vectorized=generation_mode == 'columnar', max_workers=generation_workers,
+                      shards=transaction_shards, master_seed=generation_seed, output=None, scale_factor=1.0,
+                      resume=False, writers=generation_writers):
+    checkpoint = open_checkpoint(output)
+    entries = checkpoint.load() if resume else {}
+    if resume:
+        # Se repite la configuración guardada, no la de la línea de comandos
+        run = entries.get(run_entry)
+        if run is None:
+            print("No checkpoint to resume; start a new run without --resume.")
+            return {}, {run_entry}
+        config = run['state']
+        if config['chunk_size'] != chunk_size:
+            print(f"The checkpoint was written with DB_CHUNK_SIZE={config['chunk_size']}; set it again to resume.")
+            return {}, {run_entry}
+        vectorized, shards, master_seed = config['vectorized'], config['shards'], config['master_seed']
+        scale_factor = config['scale_factor']
+        reference_date = datetime.fromisoformat(config['reference_date'])
+        print(f"Resuming data generation with master seed {master_seed}...")
+    else:
+        # Sin semilla se elige una y se guarda, para poder reanudar con los mismos flujos
+        reference_date = seeded_reference_date if master_seed is not None else datetime.now().replace(microsecond=0)
+        master_seed = random.getrandbits(32) if master_seed is None else master_seed
+        config = {'master_seed': master_seed, 'scale_factor': scale_factor, 'vectorized': vectorized,
+                  'shards': shards, 'chunk_size': chunk_size, 'reference_date': reference_date}
+
+    print(f"Starting data generation (scale factor {scale_factor}, master seed {master_seed})...")
+
+    volumes = scaled_volumes(scale_factor)
+    num_accounts = volumes['num_accounts']
+    num_stations = volumes['num_stations']
+    num_users_per_account = volumes['num_users_per_account']
+    num_vehicles = volumes['num_vehicles']
+    num_transactions = volumes['num_transactions']
+    tasks = {
+        'table_a': lambda writer, progress: generate_table_a(writer, num_accounts, progress),
+        'table_b': generate_table_b,
+        'table_c': lambda writer, progress: generate_table_c(writer, num_stations, progress),
+        'table_d': generate_table_d,
+        'table_e': lambda writer, progress: generate_table_e(writer, num_users_per_account, progress),
+        'table_f': lambda writer, progress: generate_table_f(writer, num_vehicles, progress),
+        'table_g': generate_table_g,
+        'table_h': generate_table_h,
+        'table_i': lambda writer, progress: generate_table_i(writer, num_transactions, progress, vectorized),
+        'table_j': lambda writer, progress: generate_table_j(writer, progress, vectorized),
+    }
+
+    # Tablas que se reanudan completas (no por lote), y las que se borran antes de regenerarlas
+    restart_tables = {}
+    if shards > 1:
+        # Cada shard escribe table_j junto con su parte de table_i
+        tasks['table_i'] = lambda writer, progress: generate_transactions_sharded(
+            writer, num_transactions, shards, master_seed, vectorized, output, reference_date, writers)
+        del tasks['table_j']
+        restart_tables['table_i'] = ['table_j', 'table_i']
+
+    # Falla antes de empezar si los volúmenes no caben en los espacios de IDs
+    reset_id_allocators(master_seed)
+    id_allocator.ensure_capacity(num_accounts + num_stations + num_accounts * num_users_per_account
+                                 + num_accounts * 3 + num_transactions, 'unique IDs')
+    asset_id_allocator.ensure_capacity(num_vehicles, 'asset IDs')
+
+    # Cada tabla toma IDs de su propio rango de posiciones, reservado siempre en el
+    # mismo orden: los IDs no dependen de qué tablas corren en paralelo
+    table_ids = {
+        'table_a': id_allocator.reserve(num_accounts),
+        'table_c': id_allocator.reserve(num_stations),
+        'table_e': id_allocator.reserve(num_accounts * num_users_per_account),
+        'table_g': id_allocator.reserve(num_accounts * 3),
+        'table_f': asset_id_allocator,
+    }
+    if shards <= 1:
+        table_ids['table_i'] = id_allocator.reserve(num_transactions)
+
+    if resume:
+        done = [table for table in tasks if entries.get(table, {}).get('status') == 'done']
+        for table in done:
+            del tasks[table]
+        if done:
+            print(f"Skipping completed tables: {', '.join(sorted(done))}")
+        for table in tasks:
+            if table in restart_tables or not checkpoint.chunk_level:
+                checkpoint.clear_rows(restart_tables.get(table, [table]))
+    else:
+        checkpoint.reset()
+        checkpoint.save(run_entry, 'running', state=config)
+
+    table_options = {table: {'master_seed': master_seed, 'reference_date': reference_date,
+                             'ids': table_ids.get(table), 'checkpoint': checkpoint,
+                             'resume': None if table in restart_tables else entries.get(table), 'writers': writers}
+                     for table in tasks}
+
+    key_registry.clear()
+    try:
+        timeline, failed = run_schedule(tasks, load_table_dependencies(), max_workers, output, table_options)
+    except Exception as e:
+        print(f"An error occurred during data generation: {e}")
+        return {}, set(tasks)
+
+    for entry in timeline.values():
+        entry['writer'].report()
+    print_timeline(timeline)
+    print_time_breakdown(time_breakdown())
+
+    if failed:
+        print(f"Data generation finished with errors in: {', '.join(sorted(failed))}")
+        print("Run again with --resume to continue from the last committed chunk.")
+    else:
+        checkpoint.save(run_entry, 'done', state=config)
+        print("Data generation completed.")
+    return timeline, failed
 
 
 if __name__ == "__main__":
-    generate_all_data()
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para las tablas de schema.sql")
+    parser.add_argument('--output-dir', help="escribir cada tabla como archivo en este directorio en vez de en la base")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="formato de los archivos")
+    parser.add_argument('--load-dir', help="cargar en la base los archivos de este directorio y terminar")
+    parser.add_argument('--scale-factor', type=float, default=1.0,
+                        help="multiplica los volúmenes de todas las tablas (1 = 1000 cuentas, 100000 transacciones)")
+    parser.add_argument('--mode', choices=['row', 'columnar'], default=generation_mode,
+                        help="generación de table_i/table_j fila por fila o columnar")
+    parser.add_argument('--workers', type=int, default=generation_workers, help="tablas generadas en paralelo")
+    parser.add_argument('--shards', type=int, default=transaction_shards, help="procesos para table_i/table_j")
+    parser.add_argument('--writers', type=int, default=generation_writers,
+                        help="conexiones que escriben los lotes de cada tabla mientras se generan los siguientes")
+    parser.add_argument('--seed', type=int, default=generation_seed, help="semilla maestra")
+    parser.add_argument('--metrics-json', help="guardar las métricas por tabla (filas/s, RSS, tiempos) en este JSON")
+    parser.add_argument('--resume', action='store_true',
+                        help="continuar la última corrida desde su checkpoint, con su misma configuración")
+    parser.add_argument('--prometheus', help="escribir las métricas de instrumentación en este textfile de Prometheus")
+    parser.add_argument('--profile', help="perfilar por muestreo y guardar las pilas (formato folded) en este archivo")
+    args = parser.parse_args()
+
+    if args.load_dir:
+        load_directory(args.load_dir, args.format)
+        sys.exit(0)
+
+    profiler = instrumentation.SamplingProfiler().start() if args.profile else None
+    started = time.perf_counter()
+    timeline, failed = generate_all_data(vectorized=args.mode == 'columnar', max_workers=args.workers,
+                                         shards=args.shards, master_seed=args.seed,
+                                         output=(args.output_dir, args.format) if args.output_dir else None,
+                                         scale_factor=args.scale_factor, resume=args.resume, writers=args.writers)
+    if profiler is not None:
+        profiler.stop()
+        print(f"Profile with {profiler.samples} samples written to {profiler.write_folded(args.profile)}")
+    if args.prometheus:
+        instrumentation.write_prometheus(args.prometheus, script='data')
+    if args.metrics_json:
+        with open(args.metrics_json, 'w') as file:
+            json.dump({'scale_factor': args.scale_factor, 'mode': args.mode, 'workers': args.workers,
+                       'writers': args.writers, 'shards': args.shards, 'backend': 'files' if args.output_dir else db_backend,
+                       'wall_seconds': round(time.perf_counter() - started, 4), 'peak_rss_kb': peak_rss_kb(),
+                       'failed': sorted(failed), 'tables': timeline_metrics(timeline),
+                       'time_breakdown': time_breakdown(), 'instrumentation': instrumentation.registry.snapshot(),
+                       'profile': profiler.summary() if profiler is not None else None}, file, indent=2)
+    sys.exit(1 if failed else 0)
@@ -1,12 +1,31 @@
+import argparse
+import glob
+import hashlib
+import html
+import io
+import json
+import multiprocessing
 import os
+import re
+import sqlite3
+import threading
+import time
 import yaml
-from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from functools import lru_cache
 
 import matplotlib.pyplot as plt
-import mysql.connector
+from matplotlib.colors import LogNorm
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import seaborn as sns
 from dotenv import load_dotenv
+from mysql.connector import pooling
+
+import instrumentation
 
 load_dotenv()
 
@@ -20,6 +39,72 @@ db_config = {
     'collation': 'utf8mb4_unicode_ci'
 }
 
+# Directorio con archivos generados por `data.py --output-dir`; si se define,
+# las consultas se ejecutan sobre esos archivos en vez de sobre MySQL
+data_dir = os.getenv('EDA_DATA_DIR')
+# Reentrante: una lectura por partes puede lanzar otras consultas mientras itera
+data_dir_lock = threading.RLock()
+
+# Pool de conexiones compartido entre consultas; las consultas del reporte se
+# ejecutan en paralelo con hasta EDA_WORKERS hilos (1 = secuencial)
+pool_size = int(os.getenv('EDA_POOL_SIZE', 4))
+eda_workers = int(os.getenv('EDA_WORKERS', pool_size))
+connection_pool = None
+connection_pool_lock = threading.Lock()
+# MySQLConnectionPool falla en vez de esperar si no quedan conexiones libres
+pool_slots = threading.BoundedSemaphore(pool_size)
+
+# Caché persistente de resultados: cada consulta se guarda en Parquet dentro de
+# EDA_CACHE_DIR (vacío = sin caché) junto con una huella de las tablas que lee
+cache_dir = os.getenv('EDA_CACHE_DIR', '.eda_cache')
+cache_max_bytes = int(float(os.getenv('EDA_CACHE_MAX_MB', 512)) * 1024 * 1024)
+cache_lock = threading.Lock()
+
+# Huella de cada tabla: COUNT(*) más el máximo de su clave y de su fecha principal.
+# Se reutiliza durante EDA_FINGERPRINT_TTL segundos para no repetirla en cada consulta
+fingerprint_columns = {
+    'table_a': ['col_a1', 'col_a5'],
+    'table_b': ['col_b2'],
+    'table_c': ['col_c1', 'col_c8'],
+    'table_d': ['col_d1', 'col_d4'],
+    'table_e': ['col_e1', 'col_e5'],
+    'table_f': ['col_f1'],
+    'table_g': ['col_g2', 'col_g9'],
+    'table_h': ['col_h3', 'col_h5'],
+    'table_i': ['col_i1', 'col_i12'],
+    'table_j': ['col_j1', 'col_j12'],
+    'customer_summary': ['cuenta_id', 'actualizado'],
+    'rollup_daily_documents': ['dia', 'actualizado'],
+    'rollup_payments': ['tipo_documento', 'actualizado'],
+    'rollup_daily_products': ['dia', 'actualizado'],
+}
+fingerprint_ttl = float(os.getenv('EDA_FINGERPRINT_TTL', 30))
+fingerprint_memo = {}
+fingerprint_lock = threading.Lock()
+
+# Reporte sin ventanas: con un directorio de salida, cada figura se guarda en los
+# formatos pedidos (png, svg, html) en vez de mostrarse, y las figuras de los
+# distintos análisis se dibujan en paralelo en EDA_RENDER_WORKERS procesos
+report_dir = os.getenv('EDA_REPORT_DIR')
+report_formats = os.getenv('EDA_REPORT_FORMATS', 'png').split(',')
+render_workers = int(os.getenv('EDA_RENDER_WORKERS', os.cpu_count() or 1))
+report_output = None
+figures_written = []
+
+# Gráficos agrupados: histogramas y dispersiones se dibujan como grillas de
+# EDA_PLOT_BINS intervalos en lugar de un punto por cliente
+binned_plots = os.getenv('EDA_BINNED_PLOTS', '0') == '1'
+plot_bins = int(os.getenv('EDA_PLOT_BINS', 50))
+
+# Cubos de rollup: conteos y sumas por día y tipo de documento (col_i8), por forma
+# de pago (col_i14) y por día y producto (col_j6), que refresh_rollups mantiene al
+# día de forma incremental. EDA_USE_ROLLUPS=0 vuelve a agregar las tablas crudas.
+use_rollups = os.getenv('EDA_USE_ROLLUPS', '1') == '1'
+
+# Con EDA_USE_FEATURE_STORE=1 el análisis de churn lee recencia, frecuencia y monto
+# de la matriz de features.py (FEATURE_STORE_DIR), que se refresca antes de leer
+use_feature_store = os.getenv('EDA_USE_FEATURE_STORE', '0') == '1'
+
 # Parámetros de churn
 churn_params = {
     'dias_sin_compra': 10,
@@ -31,24 +116,517 @@ churn_params = {
 with open('column_mapping.yaml', 'r') as file:
     column_mapping = yaml.safe_load(file)
 
+# Lecturas por partes: las filas se traen del servidor sin buffer, de a
+# EDA_STREAM_CHUNK_ROWS (0 = todo de una vez con pd.read_sql_query)
+stream_chunk_rows = int(os.getenv('EDA_STREAM_CHUNK_ROWS', 50000))
+
+# Tipos compactos según el significado de cada columna en column_mapping.yaml
+semantic_dtypes = {
+    'region': 'category',
+    'city': 'category',
+    'service_point_type': 'category',
+    'industry_sector': 'category',
+    'document_type': 'category',
+    'payment_method_name': 'category',
+    'payment_subtype': 'category',
+    'product_name': 'category',
+    'loyalty_program': 'category',
+    'active_status': 'int8',
+    'primary_asset_flag': 'int8',
+    'payment_method_id': 'int16',
+    'payment_type_id': 'int16',
+    'product_id': 'int16',
+    'line_item_id': 'int16',
+    'quantity': 'int16',
+}
+datetime_suffixes = ('_date', '_timestamp', '_update')
+
+
+def mapped_dtypes(mapping=None):
+    # columna -> dtype, p. ej. col_i14 (payment_method_name) -> category
+    dtypes = {}
+    for columns in (mapping or column_mapping).values():
+        for column, meaning in columns.items():
+            if meaning in semantic_dtypes:
+                dtypes[column] = semantic_dtypes[meaning]
+            elif meaning.endswith(datetime_suffixes):
+                dtypes[column] = 'datetime64[ns]'
+    return dtypes
+
+
+column_dtypes = mapped_dtypes()
+
 
-def run_query(query):
-    conn = mysql.connector.connect(**db_config)
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+def apply_dtypes(df, dtypes=None):
+    for column, dtype in (column_dtypes if dtypes is None else dtypes).items():
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if dtype.startswith('datetime64'):
+            df[column] = pd.to_datetime(values)
+        elif dtype == 'category':
+            df[column] = values.astype('category')
+        else:
+            # Enteros angostos solo si todos los valores caben; con nulos, el tipo entero nullable
+            values = pd.to_numeric(values)
+            limits = np.iinfo(dtype)
+            if values.dropna().between(limits.min, limits.max).all():
+                df[column] = values.astype(dtype if not values.isna().any() else dtype.capitalize())
     return df
 
 
-def analyze_transactions_over_time():
-    query = """
+def concat_chunks(chunks):
+    # Une las partes manteniendo las columnas categóricas (con la unión de sus categorías)
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+    categorical = [column for column in chunks[0].columns
+                   if isinstance(chunks[0][column].dtype, pd.CategoricalDtype)]
+    for column in categorical:
+        merged = pd.api.types.union_categoricals([chunk[column] for chunk in chunks])
+        for chunk in chunks:
+            chunk[column] = pd.Categorical(chunk[column], categories=merged.categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+@lru_cache(maxsize=None)
+def data_dir_connection(directory):
+    # Carga los archivos CSV/Parquet de cada tabla en una base SQLite en memoria,
+    # sobre la que corren las mismas consultas SQL del análisis
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    for path in sorted(glob.glob(os.path.join(directory, 'table_*.*'))):
+        table = os.path.basename(path).split('.')[0]
+        if path.endswith('.csv'):
+            df = pd.read_csv(path, na_values=['\\N'], keep_default_na=False)
+        elif path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            continue
+        df.to_sql(table, conn, if_exists='append', index=False)
+    return conn
+
+
+def get_connection_pool():
+    global connection_pool
+    with connection_pool_lock:
+        if connection_pool is None:
+            connection_pool = pooling.MySQLConnectionPool(pool_name='eda', pool_size=pool_size, **db_config)
+    return connection_pool
+
+
+def iter_query_chunks(query, params=None, chunk_rows=None, dtypes=None):
+    # DataFrames de a `chunk_rows` filas, con los tipos de column_mapping.yaml.
+    # En MySQL el cursor es sin buffer: el resultado queda en el servidor y se
+    # lee a medida que se consume, así la memoria no depende del tamaño de la tabla.
+    chunk_rows = chunk_rows or stream_chunk_rows or 50000
+    if data_dir:
+        with data_dir_lock:
+            with instrumentation.timer('db_execute', source='files'):
+                cursor = data_dir_connection(data_dir).execute(query, params or ())
+            instrumentation.count('db_round_trips', source='files')
+            yield from iter_cursor_chunks(cursor, chunk_rows, dtypes, 'files')
+        return
+
+    with pool_slots:
+        conn = get_connection_pool().get_connection()
+        cursor = conn.cursor(buffered=False)
+        try:
+            with instrumentation.timer('db_execute', source='mysql'):
+                cursor.execute(query, params)
+            instrumentation.count('db_round_trips', source='mysql')
+            yield from iter_cursor_chunks(cursor, chunk_rows, dtypes, 'mysql')
+        finally:
+            # Si se dejó de iterar antes del final, hay que descartar el resto del resultado
+            if conn.unread_result:
+                conn.consume_results()
+            cursor.close()
+            conn.close()
+
+
+def iter_cursor_chunks(cursor, chunk_rows, dtypes=None, source='mysql'):
+    columns = [description[0] for description in cursor.description]
+    empty = True
+    while True:
+        # Sin buffer, cada fetchmany de MySQL es una ida y vuelta al servidor
+        with instrumentation.timer('db_fetch', source=source):
+            rows = cursor.fetchmany(chunk_rows)
+        if source == 'mysql':
+            instrumentation.count('db_round_trips', source=source)
+        instrumentation.count('db_rows', len(rows), source=source, direction='read')
+        if not rows:
+            break
+        empty = False
+        # Los SUM/AVG de MySQL llegan como Decimal: se pasan a float, como hace read_sql_query
+        yield apply_dtypes(pd.DataFrame.from_records(rows, columns=columns, coerce_float=True), dtypes)
+    if empty:
+        yield apply_dtypes(pd.DataFrame(columns=columns), dtypes)
+
+
+def execute_query(query, params=None):
+    if stream_chunk_rows:
+        # El resultado completo queda en memoria: las partes acotan el buffer del
+        # driver y la conversión de tipos, no el tamaño del DataFrame final
+        return concat_chunks(iter_query_chunks(query, params))
+
+    if data_dir:
+        # Una sola conexión SQLite en memoria: las consultas sobre archivos se serializan
+        with data_dir_lock:
+            # read_sql_query ejecuta y trae todo el resultado de una vez
+            with instrumentation.timer('db_execute', source='files'):
+                df = pd.read_sql_query(query, data_dir_connection(data_dir), params=params)
+            instrumentation.count('db_round_trips', source='files')
+            instrumentation.count('db_rows', len(df), source='files', direction='read')
+            return df
+
+    with pool_slots:
+        conn = get_connection_pool().get_connection()
+        try:
+            with instrumentation.timer('db_execute', source='mysql'):
+                df = pd.read_sql_query(query, conn, params=params)
+            instrumentation.count('db_round_trips', source='mysql')
+            instrumentation.count('db_rows', len(df), source='mysql', direction='read')
+            return df
+        finally:
+            # close() devuelve la conexión al pool
+            conn.close()
+
+
+def normalize_query(query):
+    return ' '.join(query.split())
+
+
+def query_tables(query):
+    return [table for table in fingerprint_columns if re.search(rf'\b{table}\b', query)]
+
+
+def cache_key(query, params=None):
+    payload = json.dumps([normalize_query(query), params], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def table_fingerprint(table):
+    now = time.monotonic()
+    with fingerprint_lock:
+        memo = fingerprint_memo.get(table)
+        if memo and now - memo[0] < fingerprint_ttl:
+            return memo[1]
+
+    if data_dir:
+        # Sobre archivos basta con el tamaño y la fecha de modificación de cada parte
+        fingerprint = [[os.path.basename(path), os.path.getsize(path), os.path.getmtime(path)]
+                       for path in sorted(glob.glob(os.path.join(data_dir, f'{table}.*')))]
+    else:
+        columns = ', '.join(f'MAX({column})' for column in fingerprint_columns[table])
+        row = execute_query(f"SELECT COUNT(*), {columns} FROM {table}").iloc[0]
+        fingerprint = [str(value) for value in row.tolist()]
+
+    with fingerprint_lock:
+        fingerprint_memo[table] = (now, fingerprint)
+    return fingerprint
+
+
+def cache_paths(key):
+    return os.path.join(cache_dir, f'{key}.parquet'), os.path.join(cache_dir, f'{key}.json')
+
+
+def read_cached_result(key, fingerprint):
+    data_path, meta_path = cache_paths(key)
+    try:
+        with open(meta_path, 'r') as file:
+            meta = json.load(file)
+        if meta['fingerprint'] != fingerprint:
+            return None
+        df = pd.read_parquet(data_path)
+        # La fecha de modificación marca el último uso para el desalojo LRU
+        os.utime(data_path)
+        return df
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def store_cached_result(key, query, fingerprint, df):
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, meta_path = cache_paths(key)
+    suffix = f'.{os.getpid()}-{threading.get_ident()}.tmp'
+    try:
+        df.to_parquet(data_path + suffix)
+    except (ValueError, TypeError, pa.ArrowException):
+        # Tipos que Parquet no puede guardar: el resultado simplemente no se cachea
+        if os.path.exists(data_path + suffix):
+            os.remove(data_path + suffix)
+        return
+    with open(meta_path + suffix, 'w') as file:
+        json.dump({'query': normalize_query(query), 'fingerprint': fingerprint, 'created': time.time()}, file)
+    os.replace(data_path + suffix, data_path)
+    os.replace(meta_path + suffix, meta_path)
+    evict_cache()
+
+
+def evict_cache(max_bytes=None):
+    max_bytes = cache_max_bytes if max_bytes is None else max_bytes
+    with cache_lock:
+        entries = []
+        for path in glob.glob(os.path.join(cache_dir, '*.parquet')):
+            try:
+                entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        # Se borran primero las entradas usadas hace más tiempo
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            for stale in (path, path[:-len('.parquet')] + '.json'):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            total -= size
+
+
+def clear_query_cache():
+    with fingerprint_lock:
+        fingerprint_memo.clear()
+    if cache_dir and os.path.isdir(cache_dir):
+        evict_cache(max_bytes=0)
+
+
+query_names = None
+
+
+def query_name(query):
+    # Nombre de la consulta en `queries` o `rollup_queries` (con sufijo _rollup),
+    # para etiquetar sus métricas; las demás quedan como 'other'
+    global query_names
+    if query_names is None:
+        names = {normalize_query(text): name for name, text in queries.items()}
+        names.update({normalize_query(text): f'{name}_rollup' for name, text in rollup_queries.items()})
+        query_names = names
+    return query_names.get(normalize_query(query), 'other')
+
+
+def run_query(query, params=None, use_cache=True):
+    started = time.perf_counter()
+    if not cache_dir or not use_cache:
+        df, cache = execute_query(query, params), 'off'
+    else:
+        key = cache_key(query, params)
+        fingerprint = {table: table_fingerprint(table) for table in query_tables(query)}
+        df, cache = read_cached_result(key, fingerprint), 'hit'
+        if df is None:
+            df, cache = execute_query(query, params), 'miss'
+            store_cached_result(key, query, fingerprint, df)
+    name = query_name(query)
+    instrumentation.registry.observe('eda_query', time.perf_counter() - started, query=name, cache=cache)
+    instrumentation.count('eda_rows', len(df), query=name)
+    return df
+
+
+# Consultas SQL de cada análisis, por nombre (también las usa query_plans.py)
+queries = {
+    'transactions_over_time': """
     SELECT DATE(col_i11) as fecha, COUNT(*) as num_transacciones, SUM(col_i10) as monto_total
     FROM table_i
     GROUP BY DATE(col_i11)
     ORDER BY fecha
-    """
-    df = run_query(query)
+    """,
+    'top_products': """
+    SELECT col_j6 as producto_nombre, SUM(col_j4) as cantidad_total, SUM(col_j5) as monto_total
+    FROM table_j
+    GROUP BY col_j6
+    ORDER BY cantidad_total DESC
+    LIMIT 10
+    """,
+    'customer_frequency': """
+    SELECT col_i2 as cuenta_id, COUNT(*) as num_transacciones
+    FROM table_i
+    GROUP BY col_i2
+    ORDER BY num_transacciones DESC
+    LIMIT 20
+    """,
+    'payment_methods': """
+    SELECT col_i14 as tipo_forma_pago_nombre, COUNT(*) as num_transacciones
+    FROM table_i
+    GROUP BY col_i14
+    """,
+    'customer_churn': """
+    SELECT cuenta_id,
+           ultima_compra,
+           num_transacciones,
+           monto_total / num_transacciones as monto_promedio
+    FROM customer_summary
+    """,
+    'customer_churn_raw': """
+    SELECT c.col_i2 as cuenta_id, 
+           MAX(c.col_i11) as ultima_compra,
+           COUNT(*) as num_transacciones,
+           AVG(c.col_i10) as monto_promedio
+    FROM table_i c
+    GROUP BY c.col_i2
+    """,
+    'customer_profile': """
+    SELECT *
+    FROM table_a
+    LIMIT 1000
+    """,
+    # Sin LIMIT a propósito: ya agrupado en la base, es una fila por día sobre todos
+    # los clientes, no la muestra de 1000 filas de customer_profile
+    'customer_profile_binned': """
+    SELECT DATE(col_a5) as dia, COUNT(*) as clientes
+    FROM table_a
+    WHERE col_a5 IS NOT NULL
+    GROUP BY DATE(col_a5)
+    ORDER BY dia
+    """,
+    'service_points': """
+    SELECT col_c1, col_c5, col_c7
+    FROM table_c
+    """,
+    'asset_types': """
+    SELECT f.col_f2 as asset_type, COUNT(*) as count
+    FROM table_f f
+    JOIN table_g g ON f.col_f1 = g.col_g10
+    GROUP BY f.col_f2
+    ORDER BY count DESC
+    """,
+    'transaction_details': """
+    SELECT 
+        i.col_i8 as document_type,
+        i.col_i14 as payment_method,
+        AVG(i.col_i10) as avg_transaction_value,
+        COUNT(*) as transaction_count
+    FROM table_i i
+    GROUP BY i.col_i8, i.col_i14
+    ORDER BY transaction_count DESC
+    """,
+}
+
+
+# Las mismas consultas respondidas desde los cubos de rollup. Las agrupaciones que
+# ningún cubo cubre (por cliente, por ejemplo) solo están en `queries`.
+rollup_queries = {
+    'transactions_over_time': """
+    SELECT dia as fecha, CAST(SUM(num_transacciones) AS SIGNED) as num_transacciones, SUM(monto_total) as monto_total
+    FROM rollup_daily_documents
+    GROUP BY dia
+    ORDER BY fecha
+    """,
+    'top_products': """
+    SELECT producto as producto_nombre, SUM(cantidad_total) as cantidad_total, SUM(monto_total) as monto_total
+    FROM rollup_daily_products
+    GROUP BY producto
+    ORDER BY cantidad_total DESC
+    LIMIT 10
+    """,
+    'payment_methods': """
+    SELECT forma_pago as tipo_forma_pago_nombre, CAST(SUM(num_transacciones) AS SIGNED) as num_transacciones
+    FROM rollup_payments
+    GROUP BY forma_pago
+    """,
+    'transaction_details': """
+    SELECT
+        tipo_documento as document_type,
+        forma_pago as payment_method,
+        SUM(monto_total) / SUM(num_transacciones) as avg_transaction_value,
+        CAST(SUM(num_transacciones) AS SIGNED) as transaction_count
+    FROM rollup_payments
+    GROUP BY tipo_documento, forma_pago
+    ORDER BY transaction_count DESC
+    """,
+}
+
+# Agregación de las filas nuevas de cada cubo. Los cubos de table_i cuentan
+# transacciones y el de table_j líneas, así que un producto no cuenta dos veces
+# una transacción. El día es siempre el de la transacción (col_i11). El cubo de
+# formas de pago no lleva día: col_i14 tiene unos mil valores y ninguna consulta
+# de formas de pago agrupa por fecha.
+rollup_refresh = {
+    'rollup_daily_documents': """
+    INSERT INTO rollup_daily_documents (dia, tipo_documento, num_transacciones, monto_total, actualizado)
+    SELECT DATE(col_i11), col_i8, COUNT(*), SUM(col_i10), NOW(6)
+    FROM table_i
+    WHERE col_i12 > %s AND col_i12 <= %s
+    GROUP BY DATE(col_i11), col_i8
+    ON DUPLICATE KEY UPDATE
+        num_transacciones = num_transacciones + VALUES(num_transacciones),
+        monto_total = monto_total + VALUES(monto_total),
+        actualizado = VALUES(actualizado)
+    """,
+    'rollup_payments': """
+    INSERT INTO rollup_payments (tipo_documento, forma_pago, num_transacciones, monto_total, actualizado)
+    SELECT col_i8, col_i14, COUNT(*), SUM(col_i10), NOW(6)
+    FROM table_i
+    WHERE col_i12 > %s AND col_i12 <= %s
+    GROUP BY col_i8, col_i14
+    ON DUPLICATE KEY UPDATE
+        num_transacciones = num_transacciones + VALUES(num_transacciones),
+        monto_total = monto_total + VALUES(monto_total),
+        actualizado = VALUES(actualizado)
+    """,
+    'rollup_daily_products': """
+    INSERT INTO rollup_daily_products (dia, producto, num_lineas, cantidad_total, monto_total, actualizado)
+    SELECT DATE(i.col_i11), j.col_j6, COUNT(*), SUM(j.col_j4), SUM(j.col_j5), NOW(6)
+    FROM table_j j
+    JOIN table_i i ON i.col_i1 = j.col_j1
+    WHERE j.col_j12 > %s AND j.col_j12 <= %s
+    GROUP BY DATE(i.col_i11), j.col_j6
+    ON DUPLICATE KEY UPDATE
+        num_lineas = num_lineas + VALUES(num_lineas),
+        cantidad_total = cantidad_total + VALUES(cantidad_total),
+        monto_total = monto_total + VALUES(monto_total),
+        actualizado = VALUES(actualizado)
+    """,
+}
+
+# Marca de agua inicial: el menor valor de DATETIME en MySQL
+rollup_start = datetime(1000, 1, 1)
+
+
+def set_report_output(directory, formats):
+    global report_output
+    plt.switch_backend('Agg')
+    os.makedirs(directory, exist_ok=True)
+    report_output = {'directory': directory, 'formats': list(formats)}
+
+
+def show_figure(name):
+    if report_output is None:
+        plt.show()
+        return
+
+    figure = plt.gcf()
+    for file_format in report_output['formats']:
+        path = os.path.join(report_output['directory'], f'{name}.{file_format}')
+        if file_format == 'html':
+            # Página independiente con la figura en SVG incrustado
+            buffer = io.StringIO()
+            figure.savefig(buffer, format='svg')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{name}</title></head>'
+                           f'<body>{buffer.getvalue()}</body></html>\n')
+        else:
+            figure.savefig(path, format=file_format, dpi=100)
+        figures_written.append(os.path.basename(path))
+    plt.close(figure)
+
+
+# Cada análisis se separa en fetch_* (consulta, sin gráficos) y plot_* (salida),
+# para poder traer todos los datos en paralelo y después graficar en el hilo principal
+
+def run_rollup_query(name):
+    # Desde los cubos si alguno cubre la agrupación; sobre archivos, o con
+    # EDA_USE_ROLLUPS=0, se agregan las tablas crudas
+    if use_rollups and not data_dir and name in rollup_queries:
+        refresh_rollups()
+        return run_query(rollup_queries[name])
+    return run_query(queries[name])
+
+
+def fetch_transactions_over_time():
+    df = run_rollup_query('transactions_over_time')
     df['fecha'] = pd.to_datetime(df['fecha'])
+    return df
+
 
+def plot_transactions_over_time(df):
     plt.figure(figsize=(12, 6))
     plt.plot(df['fecha'], df['num_transacciones'])
     plt.title('Número de Transacciones por Día')
@@ -56,7 +634,7 @@ def analyze_transactions_over_time():
     plt.ylabel('Número de Transacciones')
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.show()
+    show_figure('transacciones_por_dia')
 
     plt.figure(figsize=(12, 6))
     plt.plot(df['fecha'], df['monto_total'])
@@ -65,73 +643,245 @@ def analyze_transactions_over_time():
     plt.ylabel('Monto Total')
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.show()
+    show_figure('monto_por_dia')
 
 
-def analyze_top_products():
-    query = """
-    SELECT col_j6 as producto_nombre, SUM(col_j4) as cantidad_total, SUM(col_j5) as monto_total
-    FROM table_j
-    GROUP BY col_j6
-    ORDER BY cantidad_total DESC
-    LIMIT 10
-    """
-    df = run_query(query)
+def analyze_transactions_over_time():
+    plot_transactions_over_time(fetch_transactions_over_time())
+
+
+def fetch_top_products():
+    return run_rollup_query('top_products')
+
 
+def plot_top_products(df):
     plt.figure(figsize=(12, 6))
     sns.barplot(x='cantidad_total', y='producto_nombre', data=df)
     plt.title('Top 10 Productos más Vendidos')
     plt.xlabel('Cantidad Total')
     plt.ylabel('Producto')
     plt.tight_layout()
-    plt.show()
+    show_figure('top_productos')
 
 
-def analyze_customer_frequency():
-    query = """
-    SELECT col_i2 as cuenta_id, COUNT(*) as num_transacciones
-    FROM table_i
-    GROUP BY col_i2
-    ORDER BY num_transacciones DESC
-    LIMIT 20
-    """
-    df = run_query(query)
+def analyze_top_products():
+    plot_top_products(fetch_top_products())
+
+
+def fetch_customer_frequency():
+    return run_query(queries['customer_frequency'])
 
+
+def plot_customer_frequency(df):
     plt.figure(figsize=(12, 6))
     sns.barplot(x='num_transacciones', y='cuenta_id', data=df)
     plt.title('Top 20 Clientes por Frecuencia de Compra')
     plt.xlabel('Número de Transacciones')
     plt.ylabel('ID de Cuenta')
     plt.tight_layout()
-    plt.show()
+    show_figure('top_clientes_frecuencia')
 
 
-def analyze_payment_methods():
-    query = """
-    SELECT col_i14 as tipo_forma_pago_nombre, COUNT(*) as num_transacciones
-    FROM table_i
-    GROUP BY col_i14
-    """
-    df = run_query(query)
+def analyze_customer_frequency():
+    plot_customer_frequency(fetch_customer_frequency())
+
+
+def fetch_payment_methods():
+    return run_rollup_query('payment_methods')
 
+
+def plot_payment_methods(df):
     plt.figure(figsize=(10, 10))
     plt.pie(df['num_transacciones'], labels=df['tipo_forma_pago_nombre'], autopct='%1.1f%%')
     plt.title('Distribución de Formas de Pago')
     plt.axis('equal')
-    plt.show()
+    show_figure('formas_de_pago')
 
 
-def analyze_customer_churn(churn_params_x):
-    query = """
-    SELECT c.col_i2 as cuenta_id, 
-           MAX(c.col_i11) as ultima_compra,
-           COUNT(*) as num_transacciones,
-           AVG(c.col_i10) as monto_promedio
-    FROM table_i c
-    GROUP BY c.col_i2
-    """
-    df = run_query(query)
+def analyze_payment_methods():
+    plot_payment_methods(fetch_payment_methods())
+
+
+def replay_safe_point(cursor):
+    # replay.py con varios escritores confirma lotes fuera de orden: mientras corre,
+    # publica cada medio segundo en generation_checkpoint el col_i12 hasta el que todo
+    # está confirmado. Una entrada sin actualizar es de una repetición que terminó mal
+    # y ya no confirmará nada más, así que se ignora
+    cursor.execute("SELECT state, updated FROM generation_checkpoint WHERE name = '_replay' AND status = 'running'")
+    rows = cursor.fetchall()
+    if not rows or not rows[0][0] or datetime.now() - rows[0][1] > timedelta(minutes=1):
+        return None
+    return datetime.fromisoformat(json.loads(rows[0][0])['safe_col_i12'])
+
+
+def cap_watermark(cursor, new_watermark, name):
+    # Una marca más allá de la posición segura dejaría atrás, para siempre, las filas
+    # que se confirmen después con un col_i12 menor
+    safe_point = replay_safe_point(cursor)
+    if new_watermark is not None and safe_point is not None and new_watermark > safe_point:
+        print(f"replay.py is running: {name} watermark held at {safe_point}, "
+              f"later rows wait for the next refresh")
+        return safe_point
+    return new_watermark
+
+
+def refresh_customer_summary(rebuild=False):
+    # Suma a customer_summary solo las transacciones con col_i12 posterior a la
+    # marca de agua guardada, en la misma transacción que avanza la marca. Supone
+    # que table_i recibe filas en orden de col_i12; si no, usar rebuild=True.
+    with pool_slots:
+        conn = get_connection_pool().get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT IGNORE INTO summary_watermark (name, watermark) VALUES ('customer_summary', NULL)")
+            conn.commit()
+
+            conn.start_transaction()
+            # FOR UPDATE serializa refrescos concurrentes, que si no contarían dos veces
+            cursor.execute("SELECT watermark FROM summary_watermark WHERE name = 'customer_summary' FOR UPDATE")
+            watermark = None if rebuild else cursor.fetchone()[0]
+            if rebuild:
+                cursor.execute("DELETE FROM customer_summary")
 
+            cursor.execute("SELECT MAX(col_i12) FROM table_i")
+            new_watermark = cap_watermark(cursor, cursor.fetchone()[0], 'customer_summary')
+            if new_watermark is None or (watermark is not None and new_watermark <= watermark):
+                conn.commit()
+                return 0
+
+            lower_bound = "" if watermark is None else "col_i12 > %s AND "
+            params = (new_watermark,) if watermark is None else (watermark, new_watermark)
+            # rowcount del upsert cuenta dos veces cada fila actualizada: los clientes
+            # del delta se cuentan aparte
+            cursor.execute(f"SELECT COUNT(DISTINCT col_i2) FROM table_i WHERE {lower_bound}col_i12 <= %s", params)
+            customers = cursor.fetchone()[0]
+            cursor.execute(f"""
+            INSERT INTO customer_summary (cuenta_id, ultima_compra, num_transacciones, monto_total, actualizado)
+            SELECT col_i2, MAX(col_i11), COUNT(*), SUM(col_i10), NOW(6)
+            FROM table_i
+            WHERE {lower_bound}col_i12 <= %s
+            GROUP BY col_i2
+            ON DUPLICATE KEY UPDATE
+                ultima_compra = GREATEST(ultima_compra, VALUES(ultima_compra)),
+                num_transacciones = num_transacciones + VALUES(num_transacciones),
+                monto_total = monto_total + VALUES(monto_total),
+                actualizado = VALUES(actualizado)
+            """, params)
+            cursor.execute("UPDATE summary_watermark SET watermark = %s WHERE name = 'customer_summary'",
+                           (new_watermark,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    with fingerprint_lock:
+        fingerprint_memo.pop('customer_summary', None)
+    return customers
+
+
+def refresh_rollups(rebuild=False):
+    # Como refresh_customer_summary: suma a los cubos solo las filas con col_i12 (o
+    # col_j12, que repite el col_i12 de su transacción) posterior a la marca de agua,
+    # en la misma transacción que la avanza. La nueva marca es el menor de los dos
+    # máximos, para no dejar atrás líneas que se escriben después de su transacción.
+    with pool_slots:
+        conn = get_connection_pool().get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT IGNORE INTO summary_watermark (name, watermark) VALUES ('rollups', NULL)")
+            conn.commit()
+
+            conn.start_transaction()
+            cursor.execute("SELECT watermark FROM summary_watermark WHERE name = 'rollups' FOR UPDATE")
+            watermark = None if rebuild else cursor.fetchone()[0]
+            if rebuild:
+                for table in rollup_refresh:
+                    cursor.execute(f"DELETE FROM {table}")
+
+            cursor.execute("SELECT (SELECT MAX(col_i12) FROM table_i), (SELECT MAX(col_j12) FROM table_j)")
+            max_i, max_j = cursor.fetchone()
+            # Sin líneas en table_j el menor de los dos sería NULL: vale el máximo de table_i
+            new_watermark = min(max_i, max_j) if max_i is not None and max_j is not None else max_i
+            new_watermark = cap_watermark(cursor, new_watermark, 'rollups')
+            if new_watermark is None or (watermark is not None and new_watermark <= watermark):
+                conn.commit()
+                return None
+
+            for statement in rollup_refresh.values():
+                cursor.execute(statement, (watermark or rollup_start, new_watermark))
+            cursor.execute("UPDATE summary_watermark SET watermark = %s WHERE name = 'rollups'", (new_watermark,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    with fingerprint_lock:
+        for table in rollup_refresh:
+            fingerprint_memo.pop(table, None)
+    return new_watermark
+
+
+def fetch_customer_churn_from_store():
+    # features.py importa eda, por eso se importa aquí
+    import features
+    path = features.feature_store_dir
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        features.refresh_feature_store(path)
+    else:
+        features.build_feature_store(path)
+    store = features.FeatureStore(path)
+    try:
+        # Como customer_summary, solo los clientes con alguna transacción
+        active = np.asarray(store['frecuencia']) > 0
+        return pd.DataFrame({
+            'cuenta_id': store.ids[active],
+            'ultima_compra': store['ultima_compra'][active],
+            'num_transacciones': store['frecuencia'][active],
+            'monto_promedio': store['monto_promedio'][active],
+        })
+    finally:
+        store.close()
+
+
+def fetch_customer_churn():
+    if use_feature_store:
+        return fetch_customer_churn_from_store()
+    if data_dir:
+        # Sobre archivos no hay tabla resumen: se agrega table_i completa
+        return run_query(queries['customer_churn_raw'])
+
+    refresh_customer_summary()
+    return run_query(queries['customer_churn'])
+
+
+def plot_binned_histogram(values, groups=None, bins=None, labels=None):
+    # Histograma en una sola pasada de NumPy: solo se dibujan los conteos por intervalo
+    edges = np.histogram_bin_edges(values, bins=bins or plot_bins)
+    if groups is None:
+        counts, _ = np.histogram(values, bins=edges)
+        plt.stairs(counts, edges, fill=True)
+        return
+    for group in np.unique(groups):
+        counts, _ = np.histogram(values[groups == group], bins=edges)
+        plt.stairs(counts, edges, fill=True, alpha=0.5, label=labels[group] if labels else str(group))
+
+
+def plot_density_grid(x, y, bins=None):
+    # Dispersión como grilla 2D de conteos (escala logarítmica), con costo fijo por intervalo
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins or plot_bins)
+    mesh = plt.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), norm=LogNorm(), cmap='viridis')
+    plt.colorbar(mesh, label='Número de Clientes')
+
+
+def plot_customer_churn(df, churn_params_x, binned=None):
+    binned = binned_plots if binned is None else binned
+    df = df.copy()
     columnas_originales = df.columns.tolist()
 
     df['ultima_compra'] = pd.to_datetime(df['ultima_compra'])
@@ -148,7 +898,11 @@ def analyze_customer_churn(churn_params_x):
     print(f"Tasa de churn de clientes: {tasa_churn:.2%}")
 
     plt.figure(figsize=(12, 6))
-    sns.histplot(data=df, x='dias_desde_ultima_compra', bins=50, hue='churned')
+    if binned:
+        plot_binned_histogram(df['dias_desde_ultima_compra'].to_numpy(), df['churned'].to_numpy(), bins=50,
+                              labels={False: 'Activo', True: 'Churn'})
+    else:
+        sns.histplot(data=df, x='dias_desde_ultima_compra', bins=50, hue='churned')
     plt.title('Distribución de Días desde la Última Compra')
     plt.xlabel('Días desde la Última Compra')
     plt.ylabel('Número de Clientes')
@@ -156,10 +910,13 @@ def analyze_customer_churn(churn_params_x):
                 label=f'Umbral de Churn ({churn_params_x["dias_sin_compra"]} días)')
     plt.legend()
     plt.tight_layout()
-    plt.show()
+    show_figure('churn_dias_desde_ultima_compra')
 
     plt.figure(figsize=(12, 6))
-    sns.scatterplot(data=df, x='monto_promedio', y='num_transacciones', hue='churned')
+    if binned:
+        plot_density_grid(df['monto_promedio'].to_numpy(dtype=float), df['num_transacciones'].to_numpy(dtype=float))
+    else:
+        sns.scatterplot(data=df, x='monto_promedio', y='num_transacciones', hue='churned')
     plt.title('Relación entre Monto Promedio y Número de Transacciones')
     plt.xlabel('Monto Promedio')
     plt.ylabel('Número de Transacciones')
@@ -169,7 +926,7 @@ def analyze_customer_churn(churn_params_x):
                 label=f'Umbral de Monto (${churn_params_x["monto_minimo"]})')
     plt.legend()
     plt.tight_layout()
-    plt.show()
+    show_figure('churn_monto_vs_frecuencia')
 
     razones_churn = {
         'Tiempo': df['churn_por_tiempo'].sum(),
@@ -183,7 +940,7 @@ def analyze_customer_churn(churn_params_x):
     plt.xlabel('Razón')
     plt.ylabel('Número de Clientes')
     plt.tight_layout()
-    plt.show()
+    show_figure('churn_razones')
 
     columnas_nuevas = [column for column in df.columns if column not in columnas_originales]
 
@@ -199,36 +956,113 @@ def analyze_customer_churn(churn_params_x):
     return df
 
 
-def analyze_customer_profile():
-    query = """
-    SELECT *
-    FROM table_a
-    LIMIT 1000
-    """
-    df = run_query(query)
+def analyze_customer_churn(churn_params_x):
+    return plot_customer_churn(fetch_customer_churn(), churn_params_x)
+
+
+def sweep_churn_thresholds(df, dias_grid, monto_grid, frecuencia_grid):
+    # Tasa de churn y clientes por razón para todas las combinaciones de umbrales
+    # en una sola pasada. Para cada cliente se busca (searchsorted) a partir de qué
+    # umbral deja de caer en cada razón; con esos índices se arma un histograma 3D
+    # y sus sumas acumuladas dan los clientes retenidos en cada punto de la grilla.
+    dias_grid = np.sort(np.asarray(dias_grid))
+    monto_grid = np.sort(np.asarray(monto_grid, dtype=float))
+    frecuencia_grid = np.sort(np.asarray(frecuencia_grid))
+
+    ultima_compra = pd.to_datetime(df['ultima_compra'])
+    fecha_actual = ultima_compra.max() + timedelta(days=1)
+    dias = (fecha_actual - ultima_compra).dt.days.to_numpy()
+    monto = df['monto_promedio'].to_numpy(dtype=float)
+    frecuencia = df['num_transacciones'].to_numpy()
+    total = len(df)
+
+    # Retenido por tiempo si k >= idx_dias, por monto si j < idx_monto y por frecuencia si l < idx_frecuencia
+    idx_dias = np.searchsorted(dias_grid, dias, side='left')
+    idx_monto = np.searchsorted(monto_grid, monto, side='right')
+    idx_frecuencia = np.searchsorted(frecuencia_grid, frecuencia, side='right')
+
+    shape = (len(dias_grid) + 1, len(monto_grid) + 1, len(frecuencia_grid) + 1)
+    cells = np.ravel_multi_index((idx_dias, idx_monto, idx_frecuencia), shape)
+    histogram = np.bincount(cells, minlength=np.prod(shape)).reshape(shape)
+
+    retained = histogram.cumsum(axis=0)[:-1]
+    retained = retained[:, ::-1, :].cumsum(axis=1)[:, ::-1, :][:, 1:, :]
+    retained = retained[:, :, ::-1].cumsum(axis=2)[:, :, ::-1][:, :, 1:]
+    churned = total - retained
+
+    # Cada razón depende de un solo umbral; se expone con la forma de la grilla sin copiar
+    grid_shape = churned.shape
+    por_tiempo = total - np.bincount(idx_dias, minlength=shape[0]).cumsum()[:-1]
+    por_monto = np.bincount(idx_monto, minlength=shape[1]).cumsum()[:-1]
+    por_frecuencia = np.bincount(idx_frecuencia, minlength=shape[2]).cumsum()[:-1]
+
+    return {
+        'dias_sin_compra': dias_grid,
+        'monto_minimo': monto_grid,
+        'frecuencia_minima': frecuencia_grid,
+        'clientes': total,
+        'churned': churned,
+        'tasa_churn': churned / total if total else np.zeros(grid_shape),
+        'churn_por_tiempo': np.broadcast_to(por_tiempo[:, None, None], grid_shape),
+        'churn_por_monto': np.broadcast_to(por_monto[None, :, None], grid_shape),
+        'churn_por_frecuencia': np.broadcast_to(por_frecuencia[None, None, :], grid_shape),
+    }
+
+
+def sweep_results_frame(sweep):
+    # Una fila por combinación de umbrales, para ordenar o filtrar con pandas
+    dias, monto, frecuencia = np.meshgrid(sweep['dias_sin_compra'], sweep['monto_minimo'],
+                                          sweep['frecuencia_minima'], indexing='ij')
+    return pd.DataFrame({
+        'dias_sin_compra': dias.ravel(),
+        'monto_minimo': monto.ravel(),
+        'frecuencia_minima': frecuencia.ravel(),
+        'churned': sweep['churned'].ravel(),
+        'tasa_churn': sweep['tasa_churn'].ravel(),
+        'churn_por_tiempo': sweep['churn_por_tiempo'].ravel(),
+        'churn_por_monto': sweep['churn_por_monto'].ravel(),
+        'churn_por_frecuencia': sweep['churn_por_frecuencia'].ravel(),
+    })
+
+
+def fetch_customer_profile(binned=None):
+    # Agrupado, la base devuelve un conteo por día de registro en vez de filas de table_a
+    binned = binned_plots if binned is None else binned
+    return run_query(queries['customer_profile_binned' if binned else 'customer_profile'])
+
+
+def plot_customer_profile(df):
+    binned = 'clientes' in df.columns
+    dates = pd.to_datetime(df['dia'] if binned else df['col_a5'])
 
     print("\nAnálisis del perfil del cliente:")
-    print(f"Número total de clientes: {len(df)}")
-    print(f"Fecha de registro más antigua: {df['col_a5'].min()}")
-    print(f"Fecha de registro más reciente: {df['col_a5'].max()}")
+    print(f"Número total de clientes: {df['clientes'].sum() if binned else len(df)}")
+    print(f"Fecha de registro más antigua: {dates.min() if binned else df['col_a5'].min()}")
+    print(f"Fecha de registro más reciente: {dates.max() if binned else df['col_a5'].max()}")
 
     plt.figure(figsize=(12, 6))
-    df['col_a5'] = pd.to_datetime(df['col_a5'])
-    df['col_a5'].hist(bins=50)
+    if binned:
+        # Un peso por día: el histograma cuesta lo mismo con mil o con millones de clientes
+        plt.hist(dates, bins=50, weights=df['clientes'])
+        plt.grid(True)
+    else:
+        dates.hist(bins=50)
     plt.title('Distribución de Fechas de Registro de Clientes')
     plt.xlabel('Fecha de Registro')
     plt.ylabel('Número de Clientes')
     plt.tight_layout()
-    plt.show()
+    show_figure('fechas_registro_clientes')
 
 
-def analyze_service_points():
-    query = """
-    SELECT *
-    FROM table_c
-    """
-    df = run_query(query)
+def analyze_customer_profile():
+    plot_customer_profile(fetch_customer_profile())
+
+
+def fetch_service_points():
+    return run_query(queries['service_points'])
 
+
+def plot_service_points(df):
     print("\nAnálisis de puntos de servicio:")
     print(f"Número total de puntos de servicio: {len(df)}")
     print(f"Número de puntos de servicio activos: {df['col_c7'].sum()}")
@@ -241,19 +1075,18 @@ def analyze_service_points():
     plt.ylabel('Número de Puntos de Servicio')
     plt.xticks(rotation=45)
     plt.tight_layout()
-    plt.show()
+    show_figure('puntos_servicio_por_region')
 
 
-def analyze_asset_types():
-    query = """
-    SELECT f.col_f2 as asset_type, COUNT(*) as count
-    FROM table_f f
-    JOIN table_g g ON f.col_f1 = g.col_g10
-    GROUP BY f.col_f2
-    ORDER BY count DESC
-    """
-    df = run_query(query)
+def analyze_service_points():
+    plot_service_points(fetch_service_points())
 
+
+def fetch_asset_types():
+    return run_query(queries['asset_types'])
+
+
+def plot_asset_types(df):
     print("\nAnálisis de tipos de activos:")
     print(df)
 
@@ -263,22 +1096,18 @@ def analyze_asset_types():
     plt.xlabel('Número de Activos')
     plt.ylabel('Tipo de Activo')
     plt.tight_layout()
-    plt.show()
+    show_figure('tipos_de_activos')
 
 
-def analyze_transaction_details():
-    query = """
-    SELECT 
-        i.col_i8 as document_type,
-        i.col_i14 as payment_method,
-        AVG(i.col_i10) as avg_transaction_value,
-        COUNT(*) as transaction_count
-    FROM table_i i
-    GROUP BY i.col_i8, i.col_i14
-    ORDER BY transaction_count DESC
-    """
-    df = run_query(query)
+def analyze_asset_types():
+    plot_asset_types(fetch_asset_types())
+
+
+def fetch_transaction_details():
+    return run_rollup_query('transaction_details')
+
 
+def plot_transaction_details(df):
     print("\nAnálisis de detalles de transacciones:")
     print(df)
 
@@ -289,15 +1118,202 @@ def analyze_transaction_details():
     plt.xlabel('Valor Promedio de Transacción')
     plt.ylabel('Número de Transacciones')
     plt.tight_layout()
-    plt.show()
+    show_figure('valor_vs_numero_transacciones')
+
+
+def analyze_transaction_details():
+    plot_transaction_details(fetch_transaction_details())
+
+
+# Consultas del reporte completo, en el orden en que se grafican
+report_queries = {
+    'transactions_over_time': fetch_transactions_over_time,
+    'top_products': fetch_top_products,
+    'customer_frequency': fetch_customer_frequency,
+    'payment_methods': fetch_payment_methods,
+    'customer_churn': fetch_customer_churn,
+    'customer_profile': fetch_customer_profile,
+    'service_points': fetch_service_points,
+    'asset_types': fetch_asset_types,
+    'transaction_details': fetch_transaction_details,
+}
+
+
+def fetch_report_data(max_workers=eda_workers):
+    # Las consultas son independientes entre sí: con varios hilos el tiempo total
+    # queda cerca del de la consulta más lenta
+    timings = {}
+
+    def timed(name, fetch):
+        started = time.perf_counter()
+        df = fetch()
+        timings[name] = time.perf_counter() - started
+        instrumentation.registry.observe('eda_fetch', timings[name], analysis=name)
+        return df
+
+    started = time.perf_counter()
+    if max_workers <= 1:
+        results = {name: timed(name, fetch) for name, fetch in report_queries.items()}
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {name: executor.submit(timed, name, fetch) for name, fetch in report_queries.items()}
+            results = {name: future.result() for name, future in futures.items()}
+    elapsed = time.perf_counter() - started
+
+    for name in report_queries:
+        print(f"Query {name}: {timings[name]:.2f}s")
+    print(f"Fetched {len(results)} queries in {elapsed:.2f}s with {max(1, max_workers)} workers")
+    return results
+
+
+# Función de salida de cada consulta del reporte, en el orden en que se muestran
+report_plots = {
+    'transactions_over_time': plot_transactions_over_time,
+    'top_products': plot_top_products,
+    'customer_frequency': plot_customer_frequency,
+    'payment_methods': plot_payment_methods,
+    'customer_churn': plot_customer_churn,
+    'customer_profile': plot_customer_profile,
+    'service_points': plot_service_points,
+    'asset_types': plot_asset_types,
+    'transaction_details': plot_transaction_details,
+}
+
+
+def render_analysis(name, df, directory, formats, extra_args=()):
+    # Corre en un proceso del pool: guarda las figuras de un análisis y devuelve
+    # lo que imprimió, para mostrarlo en orden desde el proceso principal
+    set_report_output(directory, formats)
+    del figures_written[:]
+    output = io.StringIO()
+    started = time.perf_counter()
+    with redirect_stdout(output):
+        result = report_plots[name](df, *extra_args)
+    # El registro de instrumentación de un proceso del pool no vuelve solo: se
+    # devuelve el tiempo y lo registra el proceso principal
+    return {'name': name, 'figures': list(figures_written), 'output': output.getvalue(), 'result': result,
+            'seconds': time.perf_counter() - started}
+
+
+def write_report_index(directory, rendered):
+    lines = ['<!DOCTYPE html>', '<html><head><meta charset="utf-8"><title>Reporte EDA</title></head><body>',
+             '<h1>Reporte EDA</h1>']
+    for item in rendered:
+        lines.append(f'<h2>{html.escape(item["name"])}</h2>')
+        if item['output'].strip():
+            lines.append(f'<pre>{html.escape(item["output"])}</pre>')
+        # Una imagen por figura (PNG si existe, si no SVG) y enlaces a todos sus formatos
+        formats_by_figure = {}
+        for figure in item['figures']:
+            base, extension = os.path.splitext(figure)
+            formats_by_figure.setdefault(base, []).append(extension[1:])
+        for base, formats in formats_by_figure.items():
+            image = next((f'{base}.{file_format}' for file_format in ('png', 'svg') if file_format in formats), None)
+            if image:
+                lines.append(f'<p><img src="{html.escape(image)}" alt="{html.escape(base)}"></p>')
+            links = ' | '.join(f'<a href="{html.escape(base)}.{file_format}">{file_format}</a>' for file_format in formats)
+            lines.append(f'<p>{html.escape(base)}: {links}</p>')
+    lines.append('</body></html>')
+
+    path = os.path.join(directory, 'index.html')
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(lines) + '\n')
+    return path
+
+
+def render_report(results, churn_params_x, directory, formats=None, workers=None):
+    formats = formats or report_formats
+    workers = render_workers if workers is None else workers
+    started = time.perf_counter()
+    tasks = [(name, results[name], directory, formats,
+              (churn_params_x, binned_plots) if name == 'customer_churn' else ())
+             for name in report_plots]
+    if workers <= 1:
+        rendered = [render_analysis(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(render_analysis, *task) for task in tasks]
+            rendered = [future.result() for future in futures]
+
+    for item in rendered:
+        print(item['output'], end='')
+        instrumentation.registry.observe('eda_plot', item['seconds'], analysis=item['name'])
+    index_path = write_report_index(directory, rendered)
+    figures = sum(len(item['figures']) for item in rendered)
+    print(f"Rendered {figures} files in {time.perf_counter() - started:.2f}s with {max(1, workers)} workers; "
+          f"index at {index_path}")
+    return next(item['result'] for item in rendered if item['name'] == 'customer_churn')
+
+
+def run_report(churn_params_x, max_workers=eda_workers, output_dir=None):
+    results = fetch_report_data(max_workers)
+    if output_dir:
+        return render_report(results, churn_params_x, output_dir)
+
+    # matplotlib no es thread-safe: los gráficos se dibujan en el hilo principal
+    df_churn = None
+    for name, plot in report_plots.items():
+        with instrumentation.timer('eda_plot', analysis=name):
+            if name == 'customer_churn':
+                df_churn = plot(results[name], churn_params_x)
+            else:
+                plot(results[name])
+    return df_churn
 
 
 if __name__ == "__main__":
-    analyze_transactions_over_time()
-    analyze_top_products()
-    analyze_customer_frequency()
-    analyze_payment_methods()
-    df_churn = analyze_customer_churn(churn_params)
+    parser = argparse.ArgumentParser(description="Análisis exploratorio de datos")
+    parser.add_argument('--workers', type=int, default=eda_workers,
+                        help="hilos para ejecutar las consultas en paralelo (1 = secuencial)")
+    parser.add_argument('--no-cache', action='store_true', help="no usar la caché de resultados")
+    parser.add_argument('--clear-cache', action='store_true', help="vaciar la caché antes de empezar")
+    parser.add_argument('--rebuild-summary', action='store_true',
+                        help="recalcular customer_summary desde cero en lugar de incrementalmente")
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help="recalcular los cubos de rollup desde cero en lugar de incrementalmente")
+    parser.add_argument('--no-rollups', action='store_true',
+                        help="agregar las tablas crudas en lugar de leer los cubos de rollup")
+    parser.add_argument('--feature-store', action='store_true', default=use_feature_store,
+                        help="leer las métricas de churn de la matriz de features.py")
+    parser.add_argument('--report-dir', default=report_dir,
+                        help="guardar las figuras y un index.html en este directorio en vez de mostrarlas")
+    parser.add_argument('--formats', nargs='+', choices=['png', 'svg', 'html'], default=report_formats,
+                        help="formatos de las figuras del reporte")
+    parser.add_argument('--binned', action='store_true', default=binned_plots,
+                        help="histogramas y dispersiones agrupados en intervalos en vez de un punto por fila")
+    parser.add_argument('--render-workers', type=int, default=render_workers,
+                        help="procesos para dibujar las figuras del reporte (1 = en el proceso principal)")
+    parser.add_argument('--metrics-json', help="guardar las métricas de instrumentación en este archivo JSON")
+    parser.add_argument('--prometheus', help="escribir las métricas de instrumentación en este textfile de Prometheus")
+    parser.add_argument('--profile', help="perfilar por muestreo y guardar las pilas (formato folded) en este archivo")
+    args = parser.parse_args()
+
+    if args.clear_cache:
+        clear_query_cache()
+    if args.no_cache:
+        cache_dir = None
+    if args.rebuild_summary and not data_dir:
+        print(f"Rebuilt customer_summary for {refresh_customer_summary(rebuild=True)} customers")
+    use_feature_store = args.feature_store
+    if args.no_rollups:
+        use_rollups = False
+    elif args.rebuild_rollups and not data_dir:
+        print(f"Rebuilt rollup cubes up to col_i12 {refresh_rollups(rebuild=True)}")
+
+    report_formats = args.formats
+    binned_plots = args.binned
+    render_workers = args.render_workers
+    profiler = instrumentation.SamplingProfiler().start() if args.profile else None
+    df_churn = run_report(churn_params, args.workers, args.report_dir)
+    if profiler is not None:
+        profiler.stop()
+        print(f"Profile with {profiler.samples} samples written to {profiler.write_folded(args.profile)}")
+    if args.prometheus:
+        instrumentation.write_prometheus(args.prometheus, script='eda')
+    if args.metrics_json:
+        instrumentation.write_json(args.metrics_json, {'workers': args.workers, 'cache': bool(cache_dir),
+                                                       'rollups': use_rollups}, profiler)
+        print(f"Metrics written to {args.metrics_json}")
 
     print("\nSegmentación de clientes:")
     segmentos = df_churn.groupby('churned').agg({
@@ -307,12 +1323,6 @@ if __name__ == "__main__":
     })
     print(segmentos)
 
-    # Nuevos análisis
-    analyze_customer_profile()
-    analyze_service_points()
-    analyze_asset_types()
-    analyze_transaction_details()
-
     # Imprimir el mapeo de columnas para referencia
     print("\nMapeo de columnas:")
     for table, columns in column_mapping.items():
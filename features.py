@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import eda
+
+# Matriz de features por cliente (col_i2 / col_d1) guardada como un .npy por
+# columna, que se abre con np.load(mmap_mode='r') sin copiar ni repetir los joins.
+# Las filas están ordenadas por cuenta_id y agrupadas en bloques de block_size
+# clientes; el refresco incremental solo reescribe los bloques con clientes que
+# tuvieron transacciones nuevas (col_i12) o cambios de estado (col_d3).
+
+feature_store_dir = os.getenv('FEATURE_STORE_DIR', 'features')
+feature_block_size = int(os.getenv('FEATURE_BLOCK_SIZE', 65536))
+
+feature_queries = {
+    'customers': """
+    SELECT col_d1 as cuenta_id, col_d2 as estado_cuenta, col_d5 as estado_facturacion
+    FROM table_d
+    WHERE {range_d}
+    """,
+    'rfm': """
+    SELECT col_i2 as cuenta_id,
+           MIN(col_i11) as primera_compra,
+           MAX(col_i11) as ultima_compra,
+           COUNT(*) as frecuencia,
+           SUM(col_i10) as monto_total
+    FROM table_i
+    WHERE {range_i}
+    GROUP BY col_i2
+    """,
+    'products': """
+    SELECT i.col_i2 as cuenta_id, j.col_j6 as valor, SUM(j.col_j4) as cantidad
+    FROM table_j j
+    JOIN table_i i ON i.col_i1 = j.col_j1
+    WHERE {range_i}
+    GROUP BY i.col_i2, j.col_j6
+    """,
+    'loyalty': """
+    SELECT i.col_i2 as cuenta_id, j.col_j7 as valor, COUNT(*) as cantidad
+    FROM table_j j
+    JOIN table_i i ON i.col_i1 = j.col_j1
+    WHERE {range_i}
+    GROUP BY i.col_i2, j.col_j7
+    """,
+    'watermarks': """
+    SELECT (SELECT MAX(col_i12) FROM table_i) as transacciones,
+           (SELECT MAX(col_d3) FROM table_d) as estados
+    """,
+    'changed': """
+    SELECT DISTINCT col_i2 as cuenta_id FROM table_i WHERE col_i12 > {p}
+    UNION
+    SELECT col_d1 as cuenta_id FROM table_d WHERE col_d3 > {p}
+    """,
+    'customer_count': """
+    SELECT COUNT(*) as clientes FROM table_d
+    """,
+    # Solo las líneas posteriores a la marca (col_j12 repite el col_i12 de su transacción)
+    'new_vocabulary': """
+    SELECT 'producto' as tipo, col_j6 as valor FROM table_j WHERE col_j12 > {p} GROUP BY col_j6
+    UNION ALL
+    SELECT 'programa' as tipo, col_j7 as valor FROM table_j WHERE col_j12 > {p} GROUP BY col_j7
+    """,
+    'vocabulary': """
+    SELECT 'producto' as tipo, col_j6 as valor FROM table_j GROUP BY col_j6
+    UNION ALL
+    SELECT 'programa' as tipo, col_j7 as valor FROM table_j GROUP BY col_j7
+    """,
+}
+
+
+def feature_name(prefix, value):
+    return f"{prefix}_{re.sub(r'[^0-9a-z]+', '_', str(value).lower()).strip('_')}"
+
+
+def id_range(column, low=None, high=None):
+    # Los límites son IDs enteros del propio índice, se insertan en el SQL como literales
+    return '1 = 1' if low is None else f'{column} BETWEEN {int(low)} AND {int(high)}'
+
+
+def read(name, params=None, **fields):
+    # Las marcas de agua van como parámetros; sobre archivos la base es SQLite
+    placeholder = '?' if eda.data_dir else '%s'
+    return eda.run_query(feature_queries[name].format(p=placeholder, **fields), params, use_cache=False)
+
+
+def mix_shares(df, vocabulary, prefix, index):
+    # Proporción de la cantidad de cada valor (producto o programa) sobre el total del cliente
+    if df.empty:
+        return pd.DataFrame(np.zeros((len(index), len(vocabulary)), dtype=np.float32), index=index,
+                            columns=[feature_name(prefix, value) for value in vocabulary])
+    df = df.assign(valor=df['valor'].astype(str))
+    pivot = df.pivot_table(index='cuenta_id', columns='valor', values='cantidad', aggfunc='sum', fill_value=0)
+    pivot = pivot.reindex(index=index, columns=vocabulary, fill_value=0).astype(np.float64)
+    totals = pivot.sum(axis=1).replace(0, np.nan)
+    shares = pivot.div(totals, axis=0).fillna(0.0).astype(np.float32)
+    shares.columns = [feature_name(prefix, value) for value in vocabulary]
+    return shares
+
+
+def compute_features(vocabulary, low=None, high=None):
+    # Features de los clientes con cuenta_id en [low, high] (todos si no hay límites)
+    customers = read('customers', range_d=id_range('col_d1', low, high)).set_index('cuenta_id').sort_index()
+    index = customers.index
+    rfm = read('rfm', range_i=id_range('col_i2', low, high)).set_index('cuenta_id').reindex(index)
+    products = mix_shares(read('products', range_i=id_range('i.col_i2', low, high)), vocabulary['producto'],
+                          'producto', index)
+    loyalty = mix_shares(read('loyalty', range_i=id_range('i.col_i2', low, high)), vocabulary['programa'],
+                         'programa', index)
+
+    frecuencia = rfm['frecuencia'].fillna(0).astype(np.int32)
+    monto_total = rfm['monto_total'].astype(float).fillna(0.0)
+    features = pd.DataFrame({
+        'primera_compra': pd.to_datetime(rfm['primera_compra'], format='ISO8601').to_numpy(dtype='datetime64[s]'),
+        'ultima_compra': pd.to_datetime(rfm['ultima_compra'], format='ISO8601').to_numpy(dtype='datetime64[s]'),
+        'frecuencia': frecuencia,
+        'monto_total': monto_total.astype(np.int64),
+        'monto_promedio': (monto_total / frecuencia.replace(0, np.nan)).fillna(0.0),
+        'estado_cuenta': customers['estado_cuenta'].astype(np.int8),
+        'estado_facturacion': customers['estado_facturacion'].astype(np.int8),
+    }, index=index)
+    return pd.concat([features, products, loyalty], axis=1)
+
+
+def current_watermarks():
+    row = read('watermarks').iloc[0]
+    return {name: str(pd.Timestamp(value)) if pd.notna(value) else '1970-01-01 00:00:00'
+            for name, value in row.items()}
+
+
+def build_feature_store(path=feature_store_dir, block_size=feature_block_size):
+    started = time.perf_counter()
+    watermarks = current_watermarks()
+    vocabulary_rows = read('vocabulary')
+    vocabulary = {kind: sorted(group['valor'].astype(str)) for kind, group in vocabulary_rows.groupby('tipo')}
+    vocabulary.setdefault('producto', [])
+    vocabulary.setdefault('programa', [])
+    features = compute_features(vocabulary)
+
+    # Se escribe en un directorio temporal y se reemplaza el anterior al final
+    staging = f'{path}.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, 'cuenta_id.npy'), features.index.to_numpy(dtype=np.int64))
+    for column in features.columns:
+        np.save(os.path.join(staging, f'{column}.npy'), features[column].to_numpy())
+    meta = {'columns': list(features.columns), 'rows': len(features), 'block_size': block_size,
+            'vocabulary': vocabulary, 'watermarks': watermarks, 'built': time.time()}
+    with open(os.path.join(staging, 'meta.json'), 'w') as file:
+        json.dump(meta, file, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(f'{path}.old', ignore_errors=True)
+        os.rename(path, f'{path}.old')
+    os.rename(staging, path)
+    shutil.rmtree(f'{path}.old', ignore_errors=True)
+    print(f"Built feature store with {len(features)} customers and {len(features.columns)} features "
+          f"in {time.perf_counter() - started:.2f}s")
+    return meta
+
+
+def refresh_feature_store(path=feature_store_dir):
+    # Reescribe solo los bloques con clientes modificados desde las marcas de agua.
+    # Los clientes y valores nuevos se buscan solo en el delta, contra el índice y el
+    # vocabulario guardados; si aparecen, el índice cambia y se reconstruye todo.
+    started = time.perf_counter()
+    store = FeatureStore(path)
+    watermarks = current_watermarks()
+    since = store.meta['watermarks']
+    changed = read('changed', (since['transacciones'], since['estados']))['cuenta_id'].to_numpy(dtype=np.int64)
+
+    customers = int(read('customer_count')['clientes'].iloc[0])
+    new_values = read('new_vocabulary', (since['transacciones'], since['transacciones']))
+    unknown_values = any(set(group['valor'].astype(str)) - set(store.meta['vocabulary'].get(kind, []))
+                         for kind, group in new_values.groupby('tipo'))
+    if customers != len(store.ids) or not np.isin(changed, store.ids).all() or unknown_values:
+        print("New customers or mix values found; rebuilding the feature store")
+        store.close()
+        return build_feature_store(path, store.meta['block_size'])
+
+    block_size = store.meta['block_size']
+    blocks = np.unique(np.searchsorted(store.ids, changed) // block_size)
+    writable = {column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r+')
+                for column in store.meta['columns']}
+    for block in blocks:
+        start, end = block * block_size, min((block + 1) * block_size, len(store.ids))
+        features = compute_features(store.meta['vocabulary'], store.ids[start], store.ids[end - 1])
+        features = features.reindex(store.ids[start:end])
+        for column, values in writable.items():
+            values[start:end] = features[column].to_numpy()
+    for values in writable.values():
+        values.flush()
+    total_blocks = -(-len(store.ids) // block_size)
+    store.close()
+
+    store.meta['watermarks'] = watermarks
+    store.meta['refreshed'] = time.time()
+    with open(os.path.join(path, 'meta.json'), 'w') as file:
+        json.dump(store.meta, file, indent=2)
+    print(f"Refreshed {len(blocks)} of {total_blocks} blocks "
+          f"({len(changed)} changed customers) in {time.perf_counter() - started:.2f}s")
+    return store.meta
+
+
+class FeatureStore:
+    # Acceso de solo lectura y sin copia: cada columna es un np.memmap
+
+    def __init__(self, path=feature_store_dir):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as file:
+            self.meta = json.load(file)
+        self.ids = np.load(os.path.join(path, 'cuenta_id.npy'), mmap_mode='r')
+        self.columns = {column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r')
+                        for column in self.meta['columns']}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def positions(self, cuenta_ids):
+        cuenta_ids = np.asarray(cuenta_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, cuenta_ids)
+        found = (positions < len(self.ids)) & (self.ids[np.minimum(positions, len(self.ids) - 1)] == cuenta_ids)
+        if not found.all():
+            raise KeyError(f"Unknown customers: {cuenta_ids[~found][:10].tolist()}")
+        return positions
+
+    def rows(self, cuenta_ids, columns=None):
+        positions = self.positions(cuenta_ids)
+        return pd.DataFrame({column: self.columns[column][positions] for column in columns or self.columns},
+                            index=pd.Index(self.ids[positions], name='cuenta_id'))
+
+    def matrix(self, columns=None, dtype=np.float32):
+        # Matriz numérica (clientes x features) para entrenar modelos; esta sí es una copia
+        columns = columns or [column for column in self.columns if column not in ('primera_compra', 'ultima_compra')]
+        return np.column_stack([np.asarray(self.columns[column], dtype=dtype) for column in columns])
+
+    def recency_days(self, reference=None):
+        # Días desde la última compra (NaN si el cliente no tiene compras); por defecto
+        # respecto del día siguiente a la última compra registrada, como en eda.py
+        ultima_compra = np.asarray(self.columns['ultima_compra'])
+        missing = np.isnat(ultima_compra)
+        if reference is None:
+            reference = ultima_compra[~missing].max() + np.timedelta64(1, 'D')
+        days = (np.datetime64(reference, 's') - ultima_compra) // np.timedelta64(1, 'D')
+        return np.where(missing, np.nan, days.astype(np.float64))
+
+    def frame(self, columns=None):
+        return pd.DataFrame({column: self.columns[column] for column in columns or self.columns},
+                            index=pd.Index(self.ids, name='cuenta_id'))
+
+    def close(self):
+        # Los archivos se desmapean cuando no quedan referencias a las columnas
+        self.columns = {}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye o refresca la matriz de features por cliente")
+    parser.add_argument('--path', default=feature_store_dir)
+    parser.add_argument('--rebuild', action='store_true', help="reconstruir desde cero en lugar de refrescar")
+    parser.add_argument('--block-size', type=int, default=feature_block_size)
+    args = parser.parse_args()
+
+    if args.rebuild or not os.path.exists(os.path.join(args.path, 'meta.json')):
+        build_feature_store(args.path, args.block_size)
+    else:
+        refresh_feature_store(args.path)
@@ -0,0 +1,278 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# Instrumentación de data.py y eda.py: temporizadores y contadores con etiquetas
+# acumulados en un registro del proceso, que se exporta como JSON o como textfile
+# de Prometheus (para el textfile collector de node_exporter). Se mide por lote o
+# por consulta, no por fila, así que queda siempre activa. El perfilador por
+# muestreo es opcional y sirve para ver qué funciones se llevan el tiempo.
+
+metrics_prefix = os.getenv('METRICS_PREFIX', 'dinoco')
+profile_interval = float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000
+
+# Descripción de cada métrica en el textfile de Prometheus
+metric_help = {
+    'generate': 'Wall time of each table generator, including waits on its writer',
+    'generate_compute': 'Generator thread time outside its writer (Faker, random and row building)',
+    'writer_wait': 'Time the generator thread spent waiting on its writer or on parent keys',
+    'db_execute': 'Time in the database driver executing statements',
+    'db_fetch': 'Time in the database driver fetching result rows',
+    'db_commit': 'Time committing transactions',
+    'checkpoint_save': 'Time saving generation checkpoints inside chunk transactions',
+    'file_write': 'Time writing chunks to CSV/Parquet files',
+    'eda_query': 'Time of each eda.run_query call, including the result cache',
+    'eda_fetch': 'Time fetching the data of each EDA analysis',
+    'eda_plot': 'Time plotting or rendering each EDA analysis',
+    'db_round_trips': 'Statements sent to the database',
+    'db_rows': 'Rows written to or read from the database',
+    'file_rows': 'Rows written to files',
+    'eda_rows': 'Rows returned by eda.run_query',
+}
+
+
+class Registry:
+    # Temporizadores (llamadas, segundos acumulados y máximo) y contadores por
+    # nombre y etiquetas; se usa desde varios hilos a la vez
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            timer = self.timers.get(key)
+            if timer is None:
+                timer = self.timers[key] = {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+            timer['count'] += 1
+            timer['seconds'] += seconds
+            timer['max_seconds'] = max(timer['max_seconds'], seconds)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def seconds(self, name, **labels):
+        # Total de un temporizador sobre todas las combinaciones que incluyen `labels`
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(timer['seconds'] for (timer_name, key), timer in self.timers.items()
+                       if timer_name == name and wanted <= set(key))
+
+    def total(self, name, **labels):
+        wanted = set(labels.items())
+        with self.lock:
+            return sum(value for (counter_name, key), value in self.counters.items()
+                       if counter_name == name and wanted <= set(key))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'timers': [dict(name=name, labels=dict(key), count=timer['count'],
+                                seconds=round(timer['seconds'], 6), max_seconds=round(timer['max_seconds'], 6))
+                           for (name, key), timer in sorted(self.timers.items())],
+                'counters': [{'name': name, 'labels': dict(key), 'value': value}
+                             for (name, key), value in sorted(self.counters.items())],
+            }
+
+    def merge(self, snapshot):
+        # Suma las mediciones de otro proceso (por ejemplo, de un shard de data.py)
+        with self.lock:
+            for entry in snapshot['timers']:
+                key = (entry['name'], tuple(sorted(entry['labels'].items())))
+                timer = self.timers.setdefault(key, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+                timer['count'] += entry['count']
+                timer['seconds'] += entry['seconds']
+                timer['max_seconds'] = max(timer['max_seconds'], entry['max_seconds'])
+            for entry in snapshot['counters']:
+                key = (entry['name'], tuple(sorted(entry['labels'].items())))
+                self.counters[key] = self.counters.get(key, 0) + entry['value']
+
+    def reset(self):
+        with self.lock:
+            self.timers.clear()
+            self.counters.clear()
+
+
+registry = Registry()
+
+
+@contextmanager
+def timer(name, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - started, **labels)
+
+
+def count(name, value=1, **labels):
+    registry.count(name, value, **labels)
+
+
+def write_json(path, extra=None, profiler=None):
+    report = {'created': datetime.now().isoformat(timespec='seconds'), **(extra or {}), **registry.snapshot()}
+    if profiler is not None:
+        report['profile'] = profiler.summary()
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2, default=str)
+    return path
+
+
+def prometheus_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def prometheus_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', f'{metrics_prefix}_{name}')
+
+
+def write_prometheus(path, **labels):
+    # Formato de exposición de texto; `labels` se agregan a todas las series (por
+    # ejemplo script="data"). Se escribe en un archivo temporal y se renombra, para
+    # que el collector nunca lea un archivo a medio escribir.
+    snapshot = registry.snapshot()
+    lines = []
+    timers = {}
+    for entry in snapshot['timers']:
+        timers.setdefault(entry['name'], []).append(entry)
+    for name, entries in timers.items():
+        base = prometheus_name(name)
+        help_text = metric_help.get(name, name)
+        for suffix, field, kind, detail in (('_seconds_total', 'seconds', 'counter', 'seconds'),
+                                            ('_calls_total', 'count', 'counter', 'calls'),
+                                            ('_seconds_max', 'max_seconds', 'gauge', 'slowest call, seconds')):
+            lines.append(f'# HELP {base}{suffix} {help_text} ({detail})')
+            lines.append(f'# TYPE {base}{suffix} {kind}')
+            for entry in entries:
+                lines.append(f"{base}{suffix}{prometheus_labels({**labels, **entry['labels']})} {entry[field]}")
+
+    counters = {}
+    for entry in snapshot['counters']:
+        counters.setdefault(entry['name'], []).append(entry)
+    for name, entries in counters.items():
+        base = prometheus_name(name) + '_total'
+        lines.append(f'# HELP {base} {metric_help.get(name, name)}')
+        lines.append(f'# TYPE {base} counter')
+        for entry in entries:
+            lines.append(f"{base}{prometheus_labels({**labels, **entry['labels']})} {entry['value']}")
+
+    staging = f'{path}.{os.getpid()}.tmp'
+    with open(staging, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    os.replace(staging, path)
+    return path
+
+
+# Marcos más internos de un hilo que está esperando (una cola, un lock, un
+# proceso hijo o un socket); el resumen los separa del tiempo de trabajo
+idle_leaves = {
+    'threading.py:wait', 'threading.py:_wait_for_tstate_lock', 'threading.py:join', 'queue.py:get',
+    'queue.py:put', 'thread.py:_worker', 'selectors.py:select', 'popen_fork.py:poll', 'connection.py:_recv',
+    'connection.py:wait', '_base.py:wait', '_base.py:result',
+}
+
+
+def frame_label(code):
+    # 'paquete/archivo.py:función' para el código de paquetes instalados, y
+    # 'archivo.py:función' para la biblioteca estándar y los scripts del proyecto
+    parts = code.co_filename.replace('\\', '/').split('/')
+    if 'site-packages' in parts[:-1]:
+        return f"{parts[parts.index('site-packages') + 1]}/{parts[-1]}:{code.co_name}"
+    return f'{parts[-1]}:{code.co_name}'
+
+
+def label_package(label):
+    location = label.split(':', 1)[0]
+    return location.split('/', 1)[0] if '/' in location else os.path.splitext(location)[0]
+
+
+class SamplingProfiler:
+    # Cada `interval` segundos toma la pila de todos los hilos del proceso (salvo el
+    # propio) con sys._current_frames. Las pilas se guardan en formato "folded",
+    # que leen flamegraph.pl y speedscope; el resumen cuenta las muestras por
+    # función y por paquete del marco más interno (faker, random, numpy, mysql...).
+    # No ve los procesos hijos (shards de data.py, render del reporte de eda.py).
+
+    def __init__(self, interval=profile_interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = None
+        self.elapsed = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                # Las pilas de hilos en espera (cola, lock, select) también cuentan:
+                # muestran dónde se bloquea cada etapa
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_folded(self, path):
+        with open(path, 'w') as file:
+            for stack, samples in self.stacks.most_common():
+                file.write(f'{stack} {samples}\n')
+        return path
+
+    def summary(self, top=25):
+        # Las proporciones son sobre las muestras de hilos trabajando, sin las esperas
+        functions = Counter()
+        packages = Counter()
+        idle = 0
+        for stack, samples in self.stacks.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            if leaf in idle_leaves:
+                idle += samples
+                continue
+            functions[leaf] += samples
+            packages[label_package(leaf)] += samples
+        total = sum(functions.values())
+        return {
+            'interval_seconds': self.interval,
+            'sampling_rounds': self.samples,
+            'thread_samples': total + idle,
+            'idle_samples': idle,
+            'elapsed_seconds': round(self.elapsed, 4),
+            'top_functions': [{'function': name, 'samples': samples, 'share': round(samples / total, 4) if total else 0.0}
+                              for name, samples in functions.most_common(top)],
+            'top_packages': [{'package': name, 'samples': samples, 'share': round(samples / total, 4) if total else 0.0}
+                             for name, samples in packages.most_common(top)],
+        }
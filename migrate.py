@@ -0,0 +1,89 @@
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Database configuration
+db_config = {
+    'host': os.getenv('DB_HOST'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD'),
+    'database': os.getenv('DB_NAME'),
+    'charset': 'utf8mb4',
+    'collation': 'utf8mb4_unicode_ci'
+}
+
+# Migraciones versionadas: cada archivo migrations/NNN_nombre.sql se aplica una
+# sola vez, en orden, y queda registrado en schema_migrations
+migrations_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+def load_migrations(directory=migrations_dir):
+    migrations = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.sql'))):
+        version = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'r', encoding='utf-8') as file:
+            sql = re.sub(r'^\s*--.*$', '', file.read(), flags=re.M)
+        statements = [statement.strip() for statement in sql.split(';') if statement.strip()]
+        migrations.append((version, statements))
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(255) PRIMARY KEY,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(dry_run=False):
+    connection = mysql.connector.connect(**db_config)
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor)
+        pending = [(version, statements) for version, statements in load_migrations() if version not in applied]
+        if not pending:
+            print("Database is up to date.")
+            return []
+
+        for version, statements in pending:
+            if dry_run:
+                print(f"Pending migration {version} ({len(statements)} statements)")
+                continue
+
+            # Los ALTER TABLE de MySQL hacen commit implícito: si una migración falla
+            # a la mitad no queda registrada y hay que revisarla antes de reintentar
+            print(f"Applying migration {version}...")
+            started = time.perf_counter()
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            connection.commit()
+            print(f"Applied {version} in {time.perf_counter() - started:.2f}s")
+        return [version for version, _ in pending]
+    finally:
+        cursor.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica las migraciones pendientes de migrations/")
+    parser.add_argument('--dry-run', action='store_true', help="solo listar las migraciones pendientes")
+    args = parser.parse_args()
+
+    try:
+        migrate(args.dry_run)
+    except mysql.connector.Error as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,15 @@
+-- Tabla resumen por cliente y marca de agua para el análisis de churn incremental
+CREATE INDEX idx_table_i_col_i12 ON table_i (col_i12);
+
+CREATE TABLE IF NOT EXISTS customer_summary (
+    cuenta_id BIGINT PRIMARY KEY,
+    ultima_compra DATETIME,
+    num_transacciones BIGINT,
+    monto_total DECIMAL(20, 0),
+    actualizado DATETIME(6)
+);
+
+CREATE TABLE IF NOT EXISTS summary_watermark (
+    name VARCHAR(64) PRIMARY KEY,
+    watermark DATETIME
+);
@@ -0,0 +1,14 @@
+-- col_i11 pasa de VARCHAR a DATETIME, y col_i14/col_j6 de TEXT a VARCHAR para
+-- poder indexarlas. Un solo ALTER por tabla para reconstruirla una única vez.
+-- Falla si col_i11 tiene valores que no son fechas 'YYYY-MM-DD HH:MM:SS'.
+ALTER TABLE table_i
+    MODIFY col_i11 DATETIME,
+    MODIFY col_i14 VARCHAR(255),
+    ADD INDEX idx_table_i_col_i11 (col_i11, col_i10),
+    ADD INDEX idx_table_i_col_i2 (col_i2, col_i11, col_i10),
+    ADD INDEX idx_table_i_col_i14 (col_i14, col_i8, col_i10);
+
+ALTER TABLE table_j
+    MODIFY col_j6 VARCHAR(255),
+    ADD INDEX idx_table_j_col_j6 (col_j6, col_j4, col_j5);
+
@@ -0,0 +1,7 @@
+-- Probabilidad de churn por cliente, escrita por churn_model.py --score
+CREATE TABLE IF NOT EXISTS churn_scores (
+    cuenta_id BIGINT PRIMARY KEY,
+    probabilidad DOUBLE,
+    modelo VARCHAR(32),
+    puntuado DATETIME(6)
+);
@@ -0,0 +1,32 @@
+-- Cubos de rollup (por día, salvo el de formas de pago) para las consultas
+-- dimensionales de eda.py, que refresh_rollups mantiene incrementalmente con la
+-- marca de agua 'rollups'
+CREATE INDEX idx_table_j_col_j12 ON table_j (col_j12);
+
+CREATE TABLE IF NOT EXISTS rollup_daily_documents (
+    dia DATE,
+    tipo_documento VARCHAR(255),
+    num_transacciones BIGINT,
+    monto_total DECIMAL(20, 0),
+    actualizado DATETIME(6),
+    PRIMARY KEY (dia, tipo_documento)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_payments (
+    tipo_documento VARCHAR(255),
+    forma_pago VARCHAR(255),
+    num_transacciones BIGINT,
+    monto_total DECIMAL(20, 0),
+    actualizado DATETIME(6),
+    PRIMARY KEY (tipo_documento, forma_pago)
+);
+
+CREATE TABLE IF NOT EXISTS rollup_daily_products (
+    dia DATE,
+    producto VARCHAR(255),
+    num_lineas BIGINT,
+    cantidad_total DECIMAL(20, 0),
+    monto_total DECIMAL(20, 0),
+    actualizado DATETIME(6),
+    PRIMARY KEY (dia, producto)
+);
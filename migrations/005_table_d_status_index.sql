@@ -0,0 +1,3 @@
+-- Índice para que el refresco incremental de features.py lea solo los clientes
+-- con cambios de estado (col_d3) posteriores a su marca de agua
+CREATE INDEX idx_table_d_col_d3 ON table_d (col_d3);
@@ -0,0 +1,134 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import eda
+
+# Planes de ejecución (EXPLAIN) y tiempos de cada consulta de eda.py contra la
+# base MySQL del .env. Falla si alguna consulta recorre una tabla completa sin
+# estar permitido, o si el plan o el tiempo empeoran respecto de una corrida base.
+
+# Lecturas completas esperadas: tablas pequeñas o consultas que leen la tabla entera a propósito
+allowed_full_scans = {
+    'customer_churn': {'customer_summary'},
+    'customer_profile': {'table_a'},
+    'customer_profile_binned': {'table_a'},
+    'service_points': {'table_c'},
+    'asset_types': {'f'},
+    # Los cubos de rollup son chicos y se leen completos a propósito
+    'transactions_over_time_rollup': {'rollup_daily_documents'},
+    'top_products_rollup': {'rollup_daily_products'},
+    'payment_methods_rollup': {'rollup_payments'},
+    'transaction_details_rollup': {'rollup_payments'},
+}
+
+
+def all_queries():
+    # Las consultas crudas y, con el sufijo _rollup, las que responden desde los cubos
+    return {**eda.queries, **{f'{name}_rollup': query for name, query in eda.rollup_queries.items()}}
+
+
+def explain(cursor, query):
+    cursor.execute(f"EXPLAIN FORMAT=TRADITIONAL {query}")
+    columns = [column[0] for column in cursor.description]
+    plan = []
+    for row in cursor.fetchall():
+        step = dict(zip(columns, row))
+        plan.append({'table': step['table'], 'type': step['type'], 'key': step['key'],
+                     'rows': step['rows'], 'extra': step['Extra']})
+    return plan
+
+
+def time_query(cursor, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(query)
+        cursor.fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def full_scans(name, plan):
+    allowed = allowed_full_scans.get(name, set())
+    return [step['table'] for step in plan if step['type'] == 'ALL' and step['table'] not in allowed]
+
+
+def capture(repeat=3):
+    results = {}
+    conn = eda.get_connection_pool().get_connection()
+    cursor = conn.cursor()
+    try:
+        for name, query in all_queries().items():
+            plan = explain(cursor, query)
+            results[name] = {
+                'query': eda.normalize_query(query),
+                'plan': plan,
+                'median_seconds': round(time_query(cursor, query, repeat), 6),
+                'full_scans': full_scans(name, plan),
+            }
+    finally:
+        cursor.close()
+        conn.close()
+    return results
+
+
+def plan_signature(plan):
+    return [(step['table'], step['type'], step['key']) for step in plan]
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        reference = baseline['queries'].get(name)
+        if reference is None:
+            continue
+        if plan_signature(result['plan']) != plan_signature(reference['plan']):
+            regressions.append({'query': name, 'reason': 'plan changed',
+                                'baseline': plan_signature(reference['plan']),
+                                'current': plan_signature(result['plan'])})
+        if result['median_seconds'] > reference['median_seconds'] * (1 + tolerance):
+            regressions.append({'query': name, 'reason': 'slower',
+                                'baseline': reference['median_seconds'], 'current': result['median_seconds']})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN y tiempos de las consultas de eda.py")
+    parser.add_argument('--repeat', type=int, default=3, help="ejecuciones por consulta (se usa la mediana)")
+    parser.add_argument('--output', default='query_plans.json')
+    parser.add_argument('--baseline', help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="aumento de tiempo tolerado (0.5 = 50%%)")
+    args = parser.parse_args()
+
+    if eda.data_dir:
+        print("query_plans.py needs a MySQL database; unset EDA_DATA_DIR.")
+        sys.exit(2)
+
+    eda.refresh_customer_summary()
+    eda.refresh_rollups()
+    results = capture(args.repeat)
+    report = {'created': datetime.now().isoformat(timespec='seconds'), 'queries': results}
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            report['regressions'] = find_regressions(results, json.load(file), args.tolerance)
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2, default=str)
+
+    failed = False
+    for name, result in results.items():
+        keys = ', '.join(f"{step['table']}:{step['type']}/{step['key']}" for step in result['plan'])
+        print(f"{name}: {result['median_seconds']:.3f}s [{keys}]")
+        if result['full_scans']:
+            print(f"  Full table scan on {', '.join(result['full_scans'])}")
+            failed = True
+    for regression in report.get('regressions', []):
+        print(f"Regression in {regression['query']} ({regression['reason']}): "
+              f"{regression['baseline']} -> {regression['current']}")
+        failed = True
+    print(f"\nResults written to {args.output}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,101 @@
+import random
+import string
+import threading
+from array import array
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Registro en memoria de las claves primarias generadas, para que las tablas hijas
+# elijan sus claves foráneas sin volver a leer las tablas padre desde la base.
+# Cada clave ocupa 8 bytes (array('q')); las compuestas se guardan intercaladas
+# y se exponen como un arreglo int64 de dos columnas.
+
+epoch = datetime(1970, 1, 1)
+
+
+def encode_timestamp(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - epoch) // timedelta(microseconds=1)
+
+
+def decode_timestamp(value):
+    return epoch + timedelta(microseconds=value)
+
+
+def encode_asset_id(value):
+    # 'AB1234' -> entero: dos letras en base 26 seguidas de cuatro dígitos
+    letters = string.ascii_uppercase.index(value[0]) * 26 + string.ascii_uppercase.index(value[1])
+    return letters * 10000 + int(value[2:])
+
+
+def decode_asset_id(value):
+    letters, digits = divmod(int(value), 10000)
+    first, second = divmod(letters, 26)
+    return f"{string.ascii_uppercase[first]}{string.ascii_uppercase[second]}{digits:04d}"
+
+
+def decode_asset_ids(values):
+    letters, digits = np.divmod(np.asarray(values, dtype=np.int64), 10000)
+    alphabet = np.array(list(string.ascii_uppercase))
+    return np.char.add(np.char.add(alphabet[letters // 26], alphabet[letters % 26]),
+                       np.char.zfill(digits.astype(str), 4))
+
+
+class KeyRegistry:
+
+    def __init__(self):
+        self.keys = {}
+        self.widths = {}
+        self.lock = threading.Lock()
+
+    def __contains__(self, table):
+        return table in self.keys
+
+    def register(self, table, width=1):
+        with self.lock:
+            self.keys[table] = array('q')
+            self.widths[table] = width
+
+    def clear(self):
+        with self.lock:
+            self.keys.clear()
+            self.widths.clear()
+
+    def add(self, table, *key):
+        self.keys[table].extend(key)
+
+    def count(self, table):
+        return len(self.keys[table]) // self.widths[table]
+
+    def array(self, table):
+        # Vista sin copia; solo se usa cuando la tabla padre ya terminó de generarse
+        width = self.widths[table]
+        values = np.frombuffer(self.keys[table], dtype=np.int64) if self.keys[table] else np.empty(0, np.int64)
+        return values if width == 1 else values.reshape(-1, width)
+
+    def sort(self, table):
+        # Ordena las claves para que las tablas hijas las recorran en el mismo orden
+        # tanto si vienen de esta corrida como si se leyeron de la base
+        values = self.array(table)
+        ordered = np.sort(values) if values.ndim == 1 else values[np.lexsort(values.T[::-1])]
+        keys = array('q')
+        keys.frombytes(np.ascontiguousarray(ordered).tobytes())
+        with self.lock:
+            self.keys[table] = keys
+
+    def rows(self, table):
+        keys = self.keys[table]
+        width = self.widths[table]
+        if width == 1:
+            return iter(keys)
+        return zip(*(keys[offset::width] for offset in range(width)))
+
+    def choice(self, table, rng=random):
+        keys = self.keys[table]
+        width = self.widths[table]
+        index = rng.randrange(len(keys) // width)
+        if width == 1:
+            return keys[index]
+        return tuple(keys[index * width:(index + 1) * width])
@@ -0,0 +1,352 @@
+import argparse
+import heapq
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import data
+from allocator import IdAllocator
+from checkpoint import run_entry
+
+# Repetición de transacciones en orden de col_i12 para pruebas de carga de la
+# ingesta: cada cliente (col_e2) tiene su propio proceso de Poisson, con una tasa
+# que varía entre clientes, y los procesos se mezclan con un heap por próxima
+# llegada. Un hilo productor emite cada transacción (table_i y sus líneas de
+# table_j) a la tasa pedida y la deja en una cola acotada; si los escritores no
+# dan abasto la cola se llena y el productor espera (backpressure), y el retraso
+# respecto del momento programado queda medido como lag.
+
+replay_entry = '_replay'
+
+# Intervalos logarítmicos de lag (segundos) para estimar percentiles sin guardar cada valor
+lag_edges = np.geomspace(1e-4, 1e4, 161)
+col_i12_index = data.table_columns['table_i'].index('col_i12')
+
+
+class ReplayMetrics:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = 0
+        self.line_items = 0
+        self.batches = 0
+        self.write_seconds = 0.0
+        self.lag_counts = np.zeros(len(lag_edges) + 1, dtype=np.int64)
+        self.max_lag = 0.0
+        self.max_queue_depth = 0
+        self.blocked_seconds = 0.0
+        self.behind_schedule = 0
+        # Posición segura: el col_i12 hasta el que todas las transacciones emitidas ya
+        # están confirmadas, aunque los escritores confirmen sus lotes en otro orden.
+        # Se sigue el prefijo contiguo de números de secuencia confirmados.
+        self.committed = []
+        self.next_sequence = 0
+        self.safe_col_i12 = None
+
+    def record_batch(self, due, positions, line_items, committed, write_seconds):
+        # positions: (secuencia, col_i12) de cada transacción del lote
+        lags = committed - np.asarray(due)
+        counts = np.bincount(np.searchsorted(lag_edges, lags), minlength=len(self.lag_counts))
+        with self.lock:
+            self.events += len(due)
+            self.line_items += line_items
+            self.batches += 1
+            self.write_seconds += write_seconds
+            self.lag_counts += counts
+            self.max_lag = max(self.max_lag, float(lags.max()))
+            for position in positions:
+                heapq.heappush(self.committed, position)
+            while self.committed and self.committed[0][0] == self.next_sequence:
+                _, self.safe_col_i12 = heapq.heappop(self.committed)
+                self.next_sequence += 1
+
+    def lag_quantile(self, quantile):
+        with self.lock:
+            counts = self.lag_counts.copy()
+        if not counts.sum():
+            return None
+        index = int(np.searchsorted(np.cumsum(counts), quantile * counts.sum()))
+        # Borde superior del intervalo, acotado por el máximo observado
+        return min(float(lag_edges[min(index, len(lag_edges) - 1)]), self.max_lag)
+
+    def summary(self, elapsed):
+        return {
+            'events': self.events,
+            'line_items': self.line_items,
+            'batches': self.batches,
+            'wall_seconds': round(elapsed, 3),
+            'events_per_second': round(self.events / elapsed, 1) if elapsed > 0 else None,
+            'write_seconds': round(self.write_seconds, 3),
+            'lag_p50_seconds': self.lag_quantile(0.5),
+            'lag_p95_seconds': self.lag_quantile(0.95),
+            'lag_p99_seconds': self.lag_quantile(0.99),
+            'lag_max_seconds': round(self.max_lag, 4),
+            'max_queue_depth': self.max_queue_depth,
+            'producer_blocked_seconds': round(self.blocked_seconds, 3),
+            'events_behind_schedule': self.behind_schedule,
+        }
+
+
+def replay_id_allocator(entries, seed):
+    # IDs de col_i1 que no chocan con los de data.py: se recrea su asignador con la
+    # semilla de la corrida guardada en el checkpoint y se saltan las posiciones que
+    # usó. Cada repetición guarda dónde quedó para que la siguiente siga desde ahí.
+    previous = entries.get(replay_entry)
+    if previous and previous['state']:
+        return IdAllocator.from_state(previous['state']['ids'])
+
+    run = entries.get(run_entry)
+    if run is None:
+        print("No data.py checkpoint found; transaction IDs may collide with existing table_i rows.")
+        return IdAllocator(*data.id_space, data.derive_seed(seed, 'replay'))
+
+    config = run['state']
+    volumes = data.scaled_volumes(config['scale_factor'])
+    if config['shards'] > 1:
+        allocator = IdAllocator(*data.id_space, data.derive_seed(config['master_seed'], 'table_i'))
+        allocator.reserve(volumes['num_transactions'])
+    else:
+        data.reset_id_allocators(config['master_seed'])
+        allocator = data.id_allocator
+        allocator.reserve(volumes['num_accounts'] * (1 + volumes['num_users_per_account'] + 3)
+                          + volumes['num_stations'] + volumes['num_transactions'])
+    return allocator
+
+
+def customer_processes(users, daily_transactions, rng, shape=2.0):
+    # Agrupa los usuarios de table_e por cliente y asigna a cada cliente una tasa de
+    # llegadas (por segundo) Gamma(shape) alrededor de la tasa media
+    users = users[np.argsort(users[:, 1], kind='stable')]
+    _, starts, counts = np.unique(users[:, 1], return_index=True, return_counts=True)
+    mean_rate = daily_transactions / len(starts) / 86400
+    rates = np.random.default_rng(rng.getrandbits(64)).gamma(shape, mean_rate / shape, len(starts))
+    return users, starts, counts, rates
+
+
+def produce(events, streams, users, assets, start, days, daily_transactions, rate, speedup, max_events,
+            metrics, stop):
+    # Mezcla los procesos de todos los clientes con un heap de (próxima llegada, cliente)
+    rng, faker = streams.random, streams.fake
+    users, starts, counts, rates = customer_processes(users, daily_transactions, rng)
+    horizon = days * 86400
+    heap = [(rng.expovariate(customer_rate), customer) for customer, customer_rate in enumerate(rates)]
+    heapq.heapify(heap)
+    columns = data.table_columns['table_i']
+    col_i11_index, col_i12_index, col_i13_index = (columns.index(name) for name in ('col_i11', 'col_i12', 'col_i13'))
+
+    wall_start = time.perf_counter()
+    emitted = 0
+    while heap and not stop.is_set() and (not max_events or emitted < max_events):
+        offset, customer = heapq.heappop(heap)
+        if offset >= horizon:
+            break
+        heapq.heappush(heap, (offset + rng.expovariate(rates[customer]), customer))
+
+        # Fila con las mismas distribuciones de data.py, con las fechas fijadas por la llegada
+        customer_users = users[starts[customer]:starts[customer] + counts[customer]]
+        row = list(data.build_table_i_row(streams.ids.next(), customer_users, assets, start, rng, faker))
+        col_i12 = start + timedelta(seconds=offset)
+        row[col_i11_index] = col_i12 - timedelta(minutes=rng.randint(0, 60))
+        row[col_i12_index] = col_i12
+        row[col_i13_index] = col_i12 + timedelta(minutes=rng.randint(1, 30))
+        line_items = list(data.iter_table_j_rows([(row[0], col_i12)], rng))
+
+        # Momento programado: por tasa fija, por factor de aceleración o lo antes posible
+        if rate:
+            due = wall_start + emitted / rate
+        elif speedup:
+            due = wall_start + offset / speedup
+        else:
+            due = time.perf_counter()
+        delay = due - time.perf_counter()
+        if delay > 0.001:
+            time.sleep(delay)
+        elif delay < -1:
+            metrics.behind_schedule += 1
+
+        put_started = time.perf_counter()
+        events.put((due, emitted, tuple(row), line_items))
+        metrics.blocked_seconds += time.perf_counter() - put_started
+        metrics.max_queue_depth = max(metrics.max_queue_depth, events.qsize())
+        emitted += 1
+    return emitted
+
+
+def drain(events, writer, batch_size, flush_interval, metrics):
+    # Junta hasta batch_size transacciones o lo que llegue en flush_interval y las
+    # escribe en un lote (table_i y después table_j)
+    finished = False
+    while not finished:
+        item = events.get()
+        if item is None:
+            break
+        batch = [item]
+        deadline = time.perf_counter() + flush_interval
+        while len(batch) < batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = events.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+                break
+            batch.append(item)
+
+        started = time.perf_counter()
+        line_items = 0
+        for _, _, row, rows_j in batch:
+            writer.add('table_i', row)
+            writer.add_many('table_j', rows_j)
+            line_items += len(rows_j)
+        writer.flush()
+        committed = time.perf_counter()
+        metrics.record_batch([due for due, _, _, _ in batch],
+                             [(sequence, row[col_i12_index]) for _, sequence, row, _ in batch],
+                             line_items, committed, committed - started)
+
+
+def publish_progress(checkpoint, metrics, streams, writers, start):
+    # Mientras corre, la entrada '_replay' queda en 'running' con la posición segura;
+    # eda.py no avanza sus marcas de agua de col_i12 más allá de ella
+    checkpoint.save(replay_entry, 'running', metrics.events, metrics.events,
+                    {'ids': streams.ids.state(), 'writers': writers, 'safe_col_i12': metrics.safe_col_i12 or start})
+
+
+def print_progress(metrics, events, elapsed):
+    p95 = metrics.lag_quantile(0.95) or 0.0
+    print(f"  {elapsed:8.1f}s  {metrics.events} events  {metrics.events / elapsed:,.0f} events/s  "
+          f"queue {events.qsize()}  lag p95 {p95:.3f}s")
+
+
+def replay(days=365, start=None, daily_transactions=None, rate=None, speedup=None, writers=2,
+           batch_size=data.chunk_size, flush_interval=0.2, queue_size=10000, max_events=None, seed=None,
+           output=None, report_interval=10.0):
+    checkpoint = data.open_checkpoint(output)
+    entries = checkpoint.load()
+    seed = random.getrandbits(32) if seed is None else seed
+    run = entries.get(run_entry)
+    if daily_transactions is None:
+        scale_factor = run['state']['scale_factor'] if run else 1.0
+        daily_transactions = data.scaled_volumes(scale_factor)['num_transactions'] / 730
+
+    # Con archivos, cada escritor agrega sus propias partes después de las que ya existen
+    first_part = len(data.table_files(*output, 'table_i')) if output else 0
+    writer_list = [data.open_writer(output, batch_size, part=first_part + index) for index in range(writers)]
+    if start is None:
+        # Por defecto la repetición sigue donde termina el historial: data.py reparte
+        # col_i12 hasta unos 730 días después de su fecha de referencia, y las filas
+        # anteriores a las marcas de agua de col_i12 no las verían customer_summary,
+        # los cubos de rollup ni features.py. El segundo extra evita que MySQL
+        # redondee las primeras llegadas al mismo segundo de la marca.
+        latest = writer_list[0].read_max('table_i', 'col_i12')
+        if latest is not None:
+            start = latest.replace(microsecond=0) + timedelta(seconds=1)
+        elif run:
+            start = datetime.fromisoformat(run['state']['reference_date'])
+        else:
+            start = datetime.now().replace(microsecond=0)
+
+    streams = data.TableStreams(seed, 'replay', replay_id_allocator(entries, seed), start)
+    for writer in writer_list:
+        # Los lotes los cierra drain, no el tamaño de lote del writer
+        writer.auto_flush = False
+    data.parent_keys(writer_list[0], 'table_e')
+    data.parent_keys(writer_list[0], 'table_f')
+    users = data.key_registry.array('table_e')
+    assets = data.key_registry.array('table_f')
+    if not len(users) or not len(assets):
+        raise ValueError("table_e and table_f must have rows; run data.py first")
+
+    pace = f"{rate} events/s" if rate else f"speed-up x{speedup}" if speedup else "as fast as possible"
+    print(f"Replaying {days} days from {start} (~{daily_transactions:,.0f} transactions/day over "
+          f"{len(np.unique(users[:, 1]))} customers) at {pace} with {writers} writers, seed {seed}")
+
+    events = queue.Queue(maxsize=queue_size)
+    metrics = ReplayMetrics()
+    stop = threading.Event()
+    threads = [threading.Thread(target=drain, args=(events, writer, batch_size, flush_interval, metrics), daemon=True)
+               for writer in writer_list]
+    for thread in threads:
+        thread.start()
+
+    result = {}
+    publish_progress(checkpoint, metrics, streams, writers, start)
+    started = time.perf_counter()
+    producer = threading.Thread(target=lambda: result.update(emitted=produce(
+        events, streams, users, assets, start, days, daily_transactions, rate, speedup, max_events, metrics, stop)),
+        daemon=True)
+    producer.start()
+    try:
+        previous_report = started
+        while producer.is_alive():
+            producer.join(timeout=0.5)
+            publish_progress(checkpoint, metrics, streams, writers, start)
+            if report_interval and time.perf_counter() - previous_report >= report_interval:
+                print_progress(metrics, events, time.perf_counter() - started)
+                previous_report = time.perf_counter()
+    except KeyboardInterrupt:
+        print("Stopping: draining queued events...")
+        stop.set()
+        producer.join()
+    for _ in threads:
+        events.put(None)
+    for thread in threads:
+        thread.join()
+    for writer in writer_list:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    summary = metrics.summary(elapsed)
+    summary.update({'seed': seed, 'start': start.isoformat(), 'days': days, 'rate': rate, 'speedup': speedup,
+                    'writers': writers})
+    checkpoint.save(replay_entry, 'done', metrics.events, metrics.events, {'ids': streams.ids.state()})
+
+    print(f"Replayed {summary['events']} transactions ({summary['line_items']} line items) in {elapsed:.2f}s: "
+          f"{summary['events_per_second'] or 0:,.0f} events/s sustained")
+    print(f"Lag p50 {summary['lag_p50_seconds'] or 0:.4f}s, p95 {summary['lag_p95_seconds'] or 0:.4f}s, "
+          f"p99 {summary['lag_p99_seconds'] or 0:.4f}s, max {summary['lag_max_seconds']:.4f}s; "
+          f"max queue depth {summary['max_queue_depth']}, producer blocked {summary['producer_blocked_seconds']:.2f}s")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repite transacciones en orden de col_i12 para pruebas de carga")
+    parser.add_argument('--days', type=float, default=365, help="días de actividad simulada")
+    parser.add_argument('--start', type=datetime.fromisoformat,
+                        help="inicio del tiempo simulado (por defecto, justo después del último col_i12 de table_i)")
+    parser.add_argument('--daily-transactions', type=float,
+                        help="transacciones por día simulado (por defecto, la densidad de data.py)")
+    pace = parser.add_mutually_exclusive_group()
+    pace.add_argument('--rate', type=float, help="transacciones por segundo de reloj")
+    pace.add_argument('--speedup', type=float, help="segundos simulados por segundo de reloj")
+    parser.add_argument('--writers', type=int, default=2, help="conexiones que escriben en paralelo")
+    parser.add_argument('--batch-size', type=int, default=data.chunk_size, help="transacciones por lote")
+    parser.add_argument('--flush-interval', type=float, default=0.2, help="espera máxima para llenar un lote (s)")
+    parser.add_argument('--queue-size', type=int, default=10000, help="transacciones en espera antes de frenar")
+    parser.add_argument('--max-events', type=int, help="terminar después de esta cantidad de transacciones")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--output-dir', help="escribir archivos en este directorio en vez de en la base")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--report-interval', type=float, default=10.0, help="segundos entre reportes de avance")
+    parser.add_argument('--metrics-json', help="guardar throughput y lag en este JSON")
+    args = parser.parse_args()
+
+    try:
+        summary = replay(args.days, args.start, args.daily_transactions, args.rate, args.speedup, args.writers,
+                         args.batch_size, args.flush_interval, args.queue_size, args.max_events, args.seed,
+                         (args.output_dir, args.format) if args.output_dir else None, args.report_interval)
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    if args.metrics_json:
+        with open(args.metrics_json, 'w') as file:
+            json.dump(summary, file, indent=2)
@@ -107,10 +107,10 @@ CREATE TABLE table_i (
     col_i8 VARCHAR(255),
     col_i9 BIGINT,
     col_i10 BIGINT,
-    col_i11 VARCHAR(255),
+    col_i11 DATETIME,
     col_i12 DATETIME,
     col_i13 DATETIME,
-    col_i14 TEXT,
+    col_i14 VARCHAR(255),
     col_i15 TEXT,
     col_i16 VARCHAR(255),
     FOREIGN KEY (col_i2) REFERENCES table_d(col_d1),
@@ -125,7 +125,7 @@ CREATE TABLE table_j (
     col_j3 BIGINT,
     col_j4 BIGINT,
     col_j5 BIGINT,
-    col_j6 TEXT,
+    col_j6 VARCHAR(255),
     col_j7 TEXT,
     col_j8 DATETIME,
     col_j9 BIGINT,
@@ -134,4 +134,93 @@ CREATE TABLE table_j (
     col_j12 DATETIME,
     PRIMARY KEY (col_j1, col_j2),
     FOREIGN KEY (col_j1) REFERENCES table_i(col_i1)
-);
\ No newline at end of file
+);
+
+-- Índices para leer incrementalmente las transacciones nuevas por fecha de creación
+-- y los cambios de estado de las cuentas
+CREATE INDEX idx_table_i_col_i12 ON table_i (col_i12);
+CREATE INDEX idx_table_d_col_d3 ON table_d (col_d3);
+
+-- Índices de cobertura para las consultas de eda.py
+CREATE INDEX idx_table_i_col_i11 ON table_i (col_i11, col_i10);
+CREATE INDEX idx_table_i_col_i2 ON table_i (col_i2, col_i11, col_i10);
+CREATE INDEX idx_table_i_col_i14 ON table_i (col_i14, col_i8, col_i10);
+CREATE INDEX idx_table_j_col_j6 ON table_j (col_j6, col_j4, col_j5);
+CREATE INDEX idx_table_j_col_j12 ON table_j (col_j12);
+
+-- Resumen por cliente de table_i, mantenido incrementalmente por eda.py
+CREATE TABLE customer_summary (
+    cuenta_id BIGINT PRIMARY KEY,
+    ultima_compra DATETIME,
+    num_transacciones BIGINT,
+    monto_total DECIMAL(20, 0),
+    actualizado DATETIME(6)
+);
+
+-- Marcas de agua (último col_i12 incorporado) de las tablas resumen
+CREATE TABLE summary_watermark (
+    name VARCHAR(64) PRIMARY KEY,
+    watermark DATETIME
+);
+
+-- Cubos de rollup (por día de transacción, salvo el de formas de pago), mantenidos
+-- incrementalmente por eda.py
+CREATE TABLE rollup_daily_documents (
+    dia DATE,
+    tipo_documento VARCHAR(255),
+    num_transacciones BIGINT,
+    monto_total DECIMAL(20, 0),
+    actualizado DATETIME(6),
+    PRIMARY KEY (dia, tipo_documento)
+);
+
+CREATE TABLE rollup_payments (
+    tipo_documento VARCHAR(255),
+    forma_pago VARCHAR(255),
+    num_transacciones BIGINT,
+    monto_total DECIMAL(20, 0),
+    actualizado DATETIME(6),
+    PRIMARY KEY (tipo_documento, forma_pago)
+);
+
+CREATE TABLE rollup_daily_products (
+    dia DATE,
+    producto VARCHAR(255),
+    num_lineas BIGINT,
+    cantidad_total DECIMAL(20, 0),
+    monto_total DECIMAL(20, 0),
+    actualizado DATETIME(6),
+    PRIMARY KEY (dia, producto)
+);
+
+-- Probabilidad de churn por cliente, escrita por churn_model.py --score
+CREATE TABLE churn_scores (
+    cuenta_id BIGINT PRIMARY KEY,
+    probabilidad DOUBLE,
+    modelo VARCHAR(32),
+    puntuado DATETIME(6)
+);
+
+-- Avance de data.py por tabla y por lote, para reanudar con `data.py --resume`
+-- (data.py la crea si no existe)
+CREATE TABLE generation_checkpoint (
+    name VARCHAR(64) PRIMARY KEY,
+    status VARCHAR(16),
+    units BIGINT,
+    rows_written BIGINT,
+    state MEDIUMTEXT,
+    updated DATETIME
+);
+
+-- Migraciones aplicadas (migrate.py); este esquema ya incluye las de migrations/
+CREATE TABLE schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version) VALUES
+    ('001_customer_summary'),
+    ('002_typed_transaction_date'),
+    ('003_churn_scores'),
+    ('004_rollups'),
+    ('005_table_d_status_index');
\ No newline at end of file
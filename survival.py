@@ -0,0 +1,163 @@
+import argparse
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import eda
+
+# Curvas de supervivencia (Kaplan-Meier) y riesgo acumulado (Nelson-Aalen) de la
+# permanencia de los clientes, para miles de cohortes en una sola pasada vectorizada.
+# La permanencia va desde la creación de la cuenta (table_d.col_d4, o el registro
+# table_a.col_a5 si falta) hasta la última compra si el cliente está en churn, o
+# hasta la fecha de referencia si sigue activo (observación censurada).
+
+tenure_queries = {
+    'customers': """
+    SELECT a.col_a1 as cuenta_id,
+           a.col_a4 as sucursal,
+           a.col_a5 as registro,
+           d.col_d4 as creacion_cuenta
+    FROM table_a a
+    LEFT JOIN table_d d ON d.col_d1 = a.col_a1
+    """,
+    'locations': """
+    SELECT col_b2 as cuenta_id, MIN(col_b5) as ubicacion
+    FROM table_b
+    GROUP BY col_b2
+    """,
+    'product_mix': """
+    SELECT i.col_i2 as cuenta_id, j.col_j6 as producto, SUM(j.col_j4) as cantidad
+    FROM table_j j
+    JOIN table_i i ON i.col_i1 = j.col_j1
+    GROUP BY i.col_i2, j.col_j6
+    """,
+}
+
+cohort_columns = ['sucursal', 'ubicacion', 'producto_principal']
+
+
+def fetch_tenure(churn_params_x=eda.churn_params):
+    customers = eda.run_query(tenure_queries['customers'])
+    locations = eda.run_query(tenure_queries['locations'])
+    purchases = eda.fetch_customer_churn()[['cuenta_id', 'ultima_compra']]
+
+    # Producto principal: el de mayor cantidad comprada por cliente
+    mix = eda.run_query(tenure_queries['product_mix'])
+    mix['producto'] = mix['producto'].astype(str)
+    top = mix.sort_values('cantidad', ascending=False).drop_duplicates('cuenta_id')
+    top = top.rename(columns={'producto': 'producto_principal'})[['cuenta_id', 'producto_principal']]
+
+    df = (customers.merge(locations, on='cuenta_id', how='left')
+          .merge(purchases, on='cuenta_id', how='inner')
+          .merge(top, on='cuenta_id', how='left'))
+
+    inicio = pd.to_datetime(df['creacion_cuenta']).fillna(pd.to_datetime(df['registro']))
+    ultima_compra = pd.to_datetime(df['ultima_compra'])
+    fecha_referencia = ultima_compra.max() + timedelta(days=1)
+
+    df['churned'] = (fecha_referencia - ultima_compra).dt.days > churn_params_x['dias_sin_compra']
+    fin = ultima_compra.where(df['churned'], fecha_referencia)
+    df['permanencia_dias'] = (fin - inicio).dt.days.clip(lower=0)
+    df[['ubicacion', 'producto_principal']] = df[['ubicacion', 'producto_principal']].fillna('Sin dato')
+    return df
+
+
+def grouped_cumsum(values, group_starts):
+    # Suma acumulada que se reinicia al comienzo de cada cohorte (filas ya ordenadas por cohorte)
+    total = np.cumsum(values)
+    offsets = total[group_starts] - values[group_starts]
+    return total - np.repeat(offsets, np.diff(np.append(group_starts, len(values))))
+
+
+def grouped_kaplan_meier(durations, events, groups=None):
+    # Una fila por (cohorte, tiempo con eventos o censuras): en riesgo, eventos,
+    # censurados, supervivencia S(t) y riesgo acumulado H(t). Todas las cohortes se
+    # calculan juntas: un solo ordenamiento y sumas acumuladas por tramo.
+    durations = np.asarray(durations, dtype=float)
+    events = np.asarray(events, dtype=bool)
+    if groups is None:
+        codes, labels = np.zeros(len(durations), dtype=np.int64), pd.Index(['todos'], name='cohorte')
+    else:
+        codes, labels = pd.factorize(groups, sort=True)
+        if isinstance(labels, pd.MultiIndex):
+            labels = labels.set_names(groups.names)
+        else:
+            labels = pd.Index(labels, name=getattr(groups, 'name', None) or 'cohorte')
+
+    if len(durations) == 0:
+        return pd.DataFrame(columns=['tiempo', 'en_riesgo', 'eventos', 'censurados', 'supervivencia',
+                                     'riesgo_acumulado'])
+
+    order = np.lexsort((durations, codes))
+    codes, durations, events = codes[order], durations[order], events[order]
+
+    # Tramos de filas con la misma cohorte y el mismo tiempo
+    new_step = np.ones(len(order), dtype=bool)
+    new_step[1:] = (codes[1:] != codes[:-1]) | (durations[1:] != durations[:-1])
+    step_starts = np.flatnonzero(new_step)
+    removed = np.diff(np.append(step_starts, len(order)))
+    deaths = np.add.reduceat(events.astype(np.int64), step_starts)
+    group = codes[step_starts]
+
+    new_group = np.ones(len(step_starts), dtype=bool)
+    new_group[1:] = group[1:] != group[:-1]
+    group_starts = np.flatnonzero(new_group)
+
+    group_sizes = np.bincount(codes, minlength=len(labels))
+    at_risk = group_sizes[group] - (grouped_cumsum(removed, group_starts) - removed)
+    hazard = deaths / at_risk
+
+    # S(t) = prod(1 - d/n) como suma de logaritmos; cuando d == n la curva cae a 0
+    extinct = deaths == at_risk
+    survival = np.exp(grouped_cumsum(np.log1p(-np.where(extinct, 0.0, hazard)), group_starts))
+    survival[grouped_cumsum(extinct.astype(np.int64), group_starts) > 0] = 0.0
+
+    curves = labels.take(group).to_frame(index=False)
+    curves['tiempo'] = durations[step_starts]
+    curves['en_riesgo'] = at_risk
+    curves['eventos'] = deaths
+    curves['censurados'] = removed - deaths
+    curves['supervivencia'] = survival
+    # Nelson-Aalen sin suavizar: H(t) = suma de d/n, también con empates
+    curves['riesgo_acumulado'] = grouped_cumsum(hazard, group_starts)
+    return curves
+
+
+def cohort_curves(df, by=None):
+    groups = pd.MultiIndex.from_frame(df[by]) if by else None
+    return grouped_kaplan_meier(df['permanencia_dias'], df['churned'], groups)
+
+
+def survival_summary(curves, by=None):
+    # Clientes, eventos y mediana de permanencia (primer tiempo con S(t) <= 0.5) por cohorte
+    keys = by or ['cohorte']
+    grouped = curves.groupby(keys, sort=False)
+    summary = pd.DataFrame({'clientes': grouped['en_riesgo'].first(), 'eventos': grouped['eventos'].sum()})
+    below_half = curves[curves['supervivencia'] <= 0.5].groupby(keys, sort=False)['tiempo'].first()
+    summary['mediana_dias'] = below_half.reindex(summary.index)
+    return summary.reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Curvas de supervivencia de clientes por cohorte")
+    parser.add_argument('--by', nargs='*', choices=cohort_columns, default=['sucursal'],
+                        help="columnas que definen las cohortes (sin columnas, una sola curva)")
+    parser.add_argument('--output', help="guardar las curvas en este archivo CSV o Parquet")
+    args = parser.parse_args()
+
+    tenure = fetch_tenure()
+    started = time.perf_counter()
+    curves = cohort_curves(tenure, args.by)
+    summary = survival_summary(curves, args.by)
+    print(f"Computed {len(summary)} survival curves over {len(tenure)} customers "
+          f"in {time.perf_counter() - started:.3f}s")
+    print(summary.sort_values('clientes', ascending=False).head(20).to_string(index=False))
+
+    if args.output:
+        if args.output.endswith('.parquet'):
+            curves.to_parquet(args.output, index=False)
+        else:
+            curves.to_csv(args.output, index=False)
+        print(f"Curves written to {args.output}")
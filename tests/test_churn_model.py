@@ -0,0 +1,83 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+start = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def modules(tmp_path, monkeypatch):
+    # eda.py lee column_mapping.yaml del directorio actual al importarse
+    shutil.copy(os.path.join(repo_dir, 'column_mapping-example.yaml'), tmp_path / 'column_mapping.yaml')
+    monkeypatch.chdir(tmp_path)
+    import churn_model
+    import eda
+    import features
+    monkeypatch.setattr(eda, 'cache_dir', None)
+    return eda, features, churn_model
+
+
+def write_tables(directory, transactions):
+    # transactions: (col_i1, cuenta_id, día, producto, programa); una línea por transacción
+    os.makedirs(directory)
+    pd.DataFrame({
+        'col_d1': [1, 2, 3],
+        'col_d2': [1, 1, 0],
+        'col_d3': [start] * 3,
+        'col_d5': [1, 0, 1],
+    }).to_parquet(os.path.join(directory, 'table_d.parquet'))
+    dates = [start + timedelta(days=day) for _, _, day, _, _ in transactions]
+    pd.DataFrame({
+        'col_i1': [transaction for transaction, *_ in transactions],
+        'col_i2': [cuenta_id for _, cuenta_id, *_ in transactions],
+        'col_i10': [1000 * (transaction + 1) for transaction, *_ in transactions],
+        'col_i11': dates,
+        'col_i12': dates,
+    }).to_parquet(os.path.join(directory, 'table_i.parquet'))
+    pd.DataFrame({
+        'col_j1': [transaction for transaction, *_ in transactions],
+        'col_j2': [1] * len(transactions),
+        'col_j4': [2] * len(transactions),
+        'col_j6': [product for *_, product, _ in transactions],
+        'col_j7': [program for *_, program in transactions],
+        'col_j12': dates,
+    }).to_parquet(os.path.join(directory, 'table_j.parquet'))
+
+
+def training_set(modules, monkeypatch, tmp_path, name, transactions):
+    eda, features, churn_model = modules
+    data_dir = str(tmp_path / name)
+    write_tables(data_dir, transactions)
+    monkeypatch.setattr(eda, 'data_dir', data_dir)
+    features.build_feature_store(str(tmp_path / f'{name}_features'), block_size=2)
+    store = features.FeatureStore(str(tmp_path / f'{name}_features'))
+    X, y, cutoff = churn_model.fetch_training_set(store, horizon_days=10)
+    return store, X, y, cutoff
+
+
+def test_post_cutoff_activity_does_not_change_training_features(modules, tmp_path, monkeypatch):
+    # Última compra el día 30 y horizonte de 10 días: el corte es el día 20
+    history = [
+        (1, 1, 1, 'Producto A', 'Normal'),
+        (2, 1, 5, 'Producto A', 'Normal'),
+        (3, 2, 3, 'Producto B', 'Oro'),
+        (4, 2, 25, 'Producto A', 'Normal'),
+        (5, 3, 30, 'Producto B', 'Oro'),
+    ]
+    store_before, X_before, y_before, cutoff_before = training_set(modules, monkeypatch, tmp_path, 'before', history)
+    # El cliente 1 vuelve a comprar después del corte, con otro producto y programa
+    store_after, X_after, y_after, cutoff_after = training_set(
+        modules, monkeypatch, tmp_path, 'after', history + [(6, 1, 22, 'Producto B', 'Oro')])
+
+    assert cutoff_before == cutoff_after
+    # La compra posterior cambia la matriz del almacén y la etiqueta...
+    assert store_before.rows([1], ['producto_producto_b']).iloc[0, 0] == 0
+    assert store_after.rows([1], ['producto_producto_b']).iloc[0, 0] > 0
+    assert y_before.tolist() == [1, 0] and y_after.tolist() == [0, 0]
+    # ...pero no las features de entrenamiento, que solo ven las compras hasta el corte
+    np.testing.assert_array_equal(X_before, X_after)
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+from lifelines import KaplanMeierFitter, NelsonAalenFitter
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def survival(tmp_path, monkeypatch):
+    # eda.py lee column_mapping.yaml del directorio actual al importarse
+    shutil.copy(os.path.join(repo_dir, 'column_mapping-example.yaml'), tmp_path / 'column_mapping.yaml')
+    monkeypatch.chdir(tmp_path)
+    import survival
+    return survival
+
+
+def tenure_sample(seed=0, customers=2000):
+    # Permanencias enteras (muchos empates), censuras y una cohorte que termina con
+    # todos sus clientes en churn, donde la curva cae a 0
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'sucursal': rng.choice(['norte', 'sur', 'centro'], customers),
+        'producto': rng.choice(['A', 'B'], customers),
+        'permanencia_dias': rng.integers(0, 60, customers).astype(float),
+        'churned': rng.random(customers) < 0.4,
+    })
+    extinct = pd.DataFrame({'sucursal': 'oeste', 'producto': 'A', 'permanencia_dias': [3.0, 5.0, 5.0],
+                            'churned': True})
+    return pd.concat([df, extinct], ignore_index=True)
+
+
+def test_grouped_curves_match_lifelines_per_cohort(survival):
+    df = tenure_sample()
+    by = ['sucursal', 'producto']
+    curves = survival.grouped_kaplan_meier(df['permanencia_dias'], df['churned'], pd.MultiIndex.from_frame(df[by]))
+
+    cohorts = df.groupby(by)
+    assert len(curves.groupby(by)) == cohorts.ngroups
+    for key, cohort in cohorts:
+        curve = curves[(curves['sucursal'] == key[0]) & (curves['producto'] == key[1])]
+        times = curve['tiempo'].to_numpy()
+
+        kmf = KaplanMeierFitter().fit(cohort['permanencia_dias'], cohort['churned'])
+        np.testing.assert_allclose(curve['supervivencia'], kmf.survival_function_at_times(times), atol=1e-10)
+
+        # El riesgo acumulado es el estimador de Nelson-Aalen sin suavizar (suma de d/n)
+        naf = NelsonAalenFitter(nelson_aalen_smoothing=False).fit(cohort['permanencia_dias'], cohort['churned'])
+        np.testing.assert_allclose(curve['riesgo_acumulado'], naf.cumulative_hazard_at_times(times), atol=1e-10)
+
+
+def test_single_curve_without_cohorts(survival):
+    df = tenure_sample(seed=1, customers=500)
+    curves = survival.grouped_kaplan_meier(df['permanencia_dias'], df['churned'])
+
+    kmf = KaplanMeierFitter().fit(df['permanencia_dias'], df['churned'])
+    np.testing.assert_allclose(curves['supervivencia'], kmf.survival_function_at_times(curves['tiempo']), atol=1e-10)
+    assert curves['en_riesgo'].iloc[0] == len(df)